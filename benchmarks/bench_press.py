@@ -0,0 +1,302 @@
+"""
+Press engine benchmarks - throughput, interval jitter and start/stop latency
+
+Runs PressEngine against the simulated backend, which records every posted
+message with a timestamp instead of delivering it.
+
+Usage:
+    python -m benchmarks.bench_press
+    python -m benchmarks.bench_press --quick --output before.json
+    python -m benchmarks.bench_press --compare before.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from keypresser.backend import SimulatedBackend
+from keypresser.engine import PressEngine, WM_KEYDOWN
+from keypresser.metrics import MetricsRegistry
+
+GAME_NAME = "DunDefGame.exe"
+VK_1 = 0x31
+
+WINDOW_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+INTERVALS_MS = [1, 5, 10, 50, 100, 500]
+QUICK_WINDOW_COUNTS = [1, 8, 64]
+QUICK_INTERVALS_MS = [1, 10, 100]
+
+MIN_TICKS = 10
+LATENCY_TRIALS = 20
+
+
+# =============================================================================
+# Helpers
+# =============================================================================
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def make_desktop(windows, slow_windows=0, slow_ms=0, saturated_windows=0):
+    """Create a simulated desktop with N game clients: first the slow ones,
+    then the ones whose message queue is full"""
+    backend = SimulatedBackend()
+    pids = [backend.launch(GAME_NAME) for _ in range(windows)]
+    for pid in pids[:slow_windows]:
+        for hwnd in backend.windows_for_pid(pid):
+            backend.post_delay[hwnd] = slow_ms / 1000.0
+    for pid in pids[slow_windows:slow_windows + saturated_windows]:
+        backend.saturated.update(backend.windows_for_pid(pid))
+    return backend, pids
+
+
+def wait_for_exit(engine, timeout=1.0):
+    """Wait for a stopped engine's worker to leave its press loop, then give
+    parallel dispatch workers time to finish their last sends"""
+    engine.wait_idle(timeout)
+    if engine.dispatcher is not None:
+        time.sleep(0.01)
+
+
+# =============================================================================
+# Benchmarks
+# =============================================================================
+
+def bench_throughput(windows, interval_ms, duration, dispatch='serial',
+                     slow_windows=0, slow_ms=0, saturated_windows=0, rate_control=True):
+    """Run the press loop and measure achieved rate and interval jitter"""
+    duration = max(duration, MIN_TICKS * interval_ms / 1000.0)
+    backend, pids = make_desktop(windows, slow_windows, slow_ms, saturated_windows)
+    metrics = MetricsRegistry()
+    engine = PressEngine(backend, dispatch_mode=dispatch, rate_control=rate_control,
+                         metrics=metrics)
+    engine.set_pids(pids)
+
+    started = time.perf_counter()
+    engine.start(VK_1, interval_ms)
+    time.sleep(duration)
+    engine.stop()
+    elapsed = time.perf_counter() - started
+    wait_for_exit(engine)
+    engine.close()
+
+    per_window = {}
+    for ts, hwnd, msg, _, _ in backend.take_messages():
+        if msg == WM_KEYDOWN:
+            per_window.setdefault(hwnd, []).append(ts)
+
+    interval = interval_ms / 1000.0
+    jitter = []
+    spreads = []
+    rates = []
+    for stamps in per_window.values():
+        jitter.extend(abs((b - a) - interval) * 1000.0 for a, b in zip(stamps, stamps[1:]))
+        if len(stamps) > 1 and stamps[-1] > stamps[0]:
+            rates.append((len(stamps) - 1) / (stamps[-1] - stamps[0]))
+
+    # Spread between first and last healthy window within the same tick, and
+    # lateness of healthy windows against the ideal start + n * interval grid
+    healthy = [
+        stamps for hwnd, stamps in per_window.items()
+        if hwnd not in backend.post_delay and hwnd not in backend.saturated
+    ]
+    columns = zip(*healthy) if len(healthy) > 1 else ()
+    for tick in columns:
+        spreads.append((max(tick) - min(tick)) * 1000.0)
+
+    lateness = []
+    if per_window:
+        origin = min(stamps[0] for stamps in per_window.values())
+        for stamps in healthy:
+            lateness.extend(
+                (ts - origin - n * interval) * 1000.0 for n, ts in enumerate(stamps)
+            )
+
+    presses = sum(len(stamps) for stamps in per_window.values())
+    sched = engine.scheduler.stats() if engine.scheduler else {}
+    rate = engine.rate.stats() if engine.rate else {}
+    batch = metrics.histogram('press.batch_ms')
+
+    return {
+        'windows': windows,
+        'interval_ms': interval_ms,
+        'dispatch': dispatch,
+        'slow_windows': min(slow_windows, windows),
+        'saturated_windows': min(saturated_windows, max(windows - slow_windows, 0)),
+        'rate_control': rate_control,
+        'duration_s': round(elapsed, 3),
+        'presses': presses,
+        'presses_per_sec': round(presses / elapsed, 1),
+        'target_rate_hz': round(1000.0 / interval_ms, 2),
+        'achieved_rate_hz': round(sum(rates) / len(rates), 2) if rates else 0.0,
+        'jitter_p50_ms': round(percentile(jitter, 50), 4),
+        'jitter_p99_ms': round(percentile(jitter, 99), 4),
+        'spread_p99_ms': round(percentile(spreads, 99), 4),
+        'lateness_p99_ms': round(percentile(lateness, 99), 4),
+        'overruns': sched.get('overruns', 0),
+        'skipped': sched.get('skipped', 0),
+        'post_failures': backend.failed_posts,
+        'batch_avg_ms': round(batch.total / batch.count, 4) if batch.count else 0.0,
+        'deferred': rate.get('deferred', 0),
+        'dropped': rate.get('dropped', 0),
+    }
+
+
+def bench_latency(windows=1, interval_ms=100, trials=LATENCY_TRIALS):
+    """Measure start() -> first WM_KEYDOWN and stop() -> last message.
+
+    Trials reuse one engine, as the app does between hotkey presses, so
+    they measure a warm worker and window index.
+    """
+    start_latency = []
+    stop_latency = []
+    engine_latency = []
+
+    backend, pids = make_desktop(windows)
+    engine = PressEngine(backend)
+    engine.set_pids(pids)
+    engine.get_plan(VK_1)
+    engine.wait_idle(1.0)
+
+    for _ in range(trials):
+        backend.take_messages()
+        t_start = time.perf_counter()
+        engine.start(VK_1, interval_ms, t_start)
+        timeout = t_start + 1.0
+        while not backend.messages and time.perf_counter() < timeout:
+            time.sleep(0)
+        if not backend.messages:
+            engine.stop()
+            wait_for_exit(engine)
+            continue
+        start_latency.append((backend.messages[0][0] - t_start) * 1000.0)
+
+        time.sleep(interval_ms / 2000.0)
+        t_stop = time.perf_counter()
+        engine.stop(t_stop)
+        wait_for_exit(engine)
+        after = [ts for ts, *_ in backend.take_messages() if ts > t_stop]
+        stop_latency.append((max(after) - t_stop) * 1000.0 if after else 0.0)
+        if engine.last_start_latency is not None:
+            engine_latency.append(engine.last_start_latency * 1000.0)
+
+    engine.close()
+    return {
+        'windows': windows,
+        'interval_ms': interval_ms,
+        'trials': trials,
+        'start_p50_ms': round(percentile(start_latency, 50), 4),
+        'start_p99_ms': round(percentile(start_latency, 99), 4),
+        'stop_p50_ms': round(percentile(stop_latency, 50), 4),
+        'stop_p99_ms': round(percentile(stop_latency, 99), 4),
+        'engine_start_p50_ms': round(percentile(engine_latency, 50), 4),
+    }
+
+
+# =============================================================================
+# Reporting
+# =============================================================================
+
+def print_throughput(row):
+    """Print one throughput row"""
+    print(f"  {row['windows']:>3} win  {row['interval_ms']:>4} ms  "
+          f"rate {row['achieved_rate_hz']:>8.2f}/{row['target_rate_hz']:<8.2f} Hz  "
+          f"{row['presses_per_sec']:>9.1f} presses/s  "
+          f"jitter p50 {row['jitter_p50_ms']:.3f} p99 {row['jitter_p99_ms']:.3f} ms  "
+          f"spread p99 {row['spread_p99_ms']:.3f} ms  "
+          f"lateness p99 {row['lateness_p99_ms']:.3f} ms  "
+          f"batch avg {row.get('batch_avg_ms', 0.0):.3f} ms")
+    if row.get('deferred') or row.get('dropped') or row.get('post_failures'):
+        print(f"      rate control: {row['deferred']} deferred, {row['dropped']} dropped, "
+              f"{row['post_failures']} post failures")
+
+
+def compare(current, baseline_path):
+    """Print achieved rate and p99 jitter deltas against an earlier run"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    old = {(r['windows'], r['interval_ms']): r for r in baseline.get('throughput', [])}
+    print(f"\nCompared with {baseline_path}:")
+    for row in current['throughput']:
+        prev = old.get((row['windows'], row['interval_ms']))
+        if not prev:
+            continue
+        print(f"  {row['windows']:>3} win  {row['interval_ms']:>4} ms  "
+              f"rate {prev['achieved_rate_hz']:.2f} -> {row['achieved_rate_hz']:.2f} Hz  "
+              f"jitter p99 {prev['jitter_p99_ms']:.3f} -> {row['jitter_p99_ms']:.3f} ms")
+
+    prev = baseline.get('latency')
+    if prev:
+        row = current['latency']
+        print(f"  start p99 {prev['start_p99_ms']:.3f} -> {row['start_p99_ms']:.3f} ms  "
+              f"stop p99 {prev['stop_p99_ms']:.3f} -> {row['stop_p99_ms']:.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DD2 KeyPresser press engine")
+    parser.add_argument('--quick', action='store_true', help="run a reduced sweep")
+    parser.add_argument('--duration', type=float, default=2.0,
+                        help="seconds per throughput run (default: 2.0)")
+    parser.add_argument('--windows', type=int, nargs='+', help="window counts to sweep")
+    parser.add_argument('--intervals', type=int, nargs='+', help="intervals (ms) to sweep")
+    parser.add_argument('--dispatch', choices=PressEngine.DISPATCH_MODES, default='serial',
+                        help="press engine dispatch mode (default: serial)")
+    parser.add_argument('--slow-windows', type=int, default=0,
+                        help="number of simulated clients with a slow message queue")
+    parser.add_argument('--slow-ms', type=float, default=20.0,
+                        help="post delay of each slow client in ms (default: 20)")
+    parser.add_argument('--saturated-windows', type=int, default=0,
+                        help="number of simulated clients whose posts fail (queue full)")
+    parser.add_argument('--no-rate-control', action='store_true',
+                        help="disable per-window adaptive rate control")
+    parser.add_argument('--output', default='bench-results.json',
+                        help="where to write results (default: bench-results.json)")
+    parser.add_argument('--compare', metavar='FILE', help="earlier results file to compare with")
+    args = parser.parse_args(argv)
+
+    windows = args.windows or (QUICK_WINDOW_COUNTS if args.quick else WINDOW_COUNTS)
+    intervals = args.intervals or (QUICK_INTERVALS_MS if args.quick else INTERVALS_MS)
+    duration = 0.5 if args.quick and args.duration == 2.0 else args.duration
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'dispatch': args.dispatch,
+        'throughput': [],
+    }
+
+    print("Throughput / jitter:")
+    for count in windows:
+        for interval_ms in intervals:
+            row = bench_throughput(count, interval_ms, duration, args.dispatch,
+                                   args.slow_windows, args.slow_ms, args.saturated_windows,
+                                   not args.no_rate_control)
+            results['throughput'].append(row)
+            print_throughput(row)
+
+    print("\nStart/stop latency:")
+    results['latency'] = bench_latency(trials=5 if args.quick else LATENCY_TRIALS)
+    row = results['latency']
+    print(f"  start p50 {row['start_p50_ms']:.3f} p99 {row['start_p99_ms']:.3f} ms  "
+          f"stop p50 {row['stop_p50_ms']:.3f} p99 {row['stop_p99_ms']:.3f} ms  "
+          f"engine-measured start p50 {row.get('engine_start_p50_ms', 0.0):.3f} ms")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
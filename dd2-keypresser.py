@@ -1,106 +1,55 @@
 """
 DD2 Auto KeyPresser - Automatic key pressing tool for Dungeon Defenders 2
 """
-import os
 import sys
-import configparser
 import threading
 import time
 import ctypes
+from bisect import bisect_left
 
-import psutil
-import win32gui
-import win32process
-import win32api
-import win32con
-from pystray import Icon, Menu as TrayMenu, MenuItem as TrayMenuItem
-from PIL import Image, ImageDraw
+if __name__ == "__main__" and '--headless' in sys.argv:
+    # Headless mode never imports Qt
+    from keypresser.headless import main as headless_main
+    sys.exit(headless_main(sys.argv[1:]))
+
+from keypresser.startup import StartupProfiler
+
+# Created before the heavy imports so --startup-profile can time them
+startup = StartupProfiler(enabled='--startup-profile' in sys.argv)
+startup.install_import_hook()
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QListWidget, QFrame
+    QLabel, QLineEdit, QPushButton, QListView, QFrame,
+    QMenu, QInputDialog
+)
+from PyQt5.QtCore import (
+    Qt, QTimer, QRectF, pyqtSignal, QObject, QAbstractListModel, QModelIndex
+)
+from PyQt5.QtGui import (
+    QColor, QLinearGradient, QPainter, QBrush, QPen, QIcon, QFont, QPalette, QPixmap
 )
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject
-from PyQt5.QtGui import QColor, QLinearGradient, QPainter, QBrush, QPen, QIcon
-
-
-# =============================================================================
-# Configuration
-# =============================================================================
-
-def resource_path(relative_path):
-    """Get absolute path to resource, works for dev and for PyInstaller"""
-    try:
-        base_path = sys._MEIPASS
-    except AttributeError:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-
-def load_config():
-    """Load configuration from config.ini"""
-    config = configparser.ConfigParser()
-    encodings = ['utf-8-sig', 'utf-8', 'cp1251', 'cp1252', 'latin-1']
-
-    try:
-        cfg_path = resource_path('config.ini')
-        if not os.path.exists(cfg_path):
-            return config
-
-        with open(cfg_path, 'rb') as f:
-            raw = f.read()
-
-        for enc in encodings:
-            try:
-                config.read_string(raw.decode(enc))
-                return config
-            except (UnicodeDecodeError, configparser.Error):
-                continue
-    except Exception:
-        pass
-
-    return config
 
+from keypresser.backend import create_backend
+from keypresser.config import resource_path, ConfigWatcher
+from keypresser.discovery import ProcessDiscovery, ProcessMonitor
+from keypresser.engine import PressEngine, find_main_windows
+from keypresser.hotkeys import HotkeyListener
+from keypresser.keys import parse_hotkey, hotkey_keys, vk_to_display_name
+from keypresser.metrics import registry, MetricsServer, MetricsFileWriter, ProcessUsage
+from keypresser.power import power
+from keypresser.profiles import ProfileTable, parse_profile, press_target
+from keypresser.recording import KeyboardCapture, RecordingWriter
 
-config = load_config()
-START_HOTKEY = config.get('settings', 'start_hotkey', fallback='F8')
-STOP_HOTKEY = config.get('settings', 'stop_hotkey', fallback='F9')
-GAME_NAME = config.get('settings', 'game_name', fallback='DunDefGame.exe')
+startup.mark("imports")
 
 
 # =============================================================================
-# Virtual Key Codes
+# Configuration
 # =============================================================================
 
-VK_CODE = {
-    'backspace': 0x08, 'tab': 0x09, 'clear': 0x0C, 'enter': 0x0D,
-    'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12, 'pause': 0x13,
-    'caps_lock': 0x14, 'esc': 0x1B, 'space': 0x20,
-    'page_up': 0x21, 'page_down': 0x22, 'end': 0x23, 'home': 0x24,
-    'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
-    'print_screen': 0x2C, 'insert': 0x2D, 'delete': 0x2E,
-    '0': 0x30, '1': 0x31, '2': 0x32, '3': 0x33, '4': 0x34,
-    '5': 0x35, '6': 0x36, '7': 0x37, '8': 0x38, '9': 0x39,
-    'a': 0x41, 'b': 0x42, 'c': 0x43, 'd': 0x44, 'e': 0x45,
-    'f': 0x46, 'g': 0x47, 'h': 0x48, 'i': 0x49, 'j': 0x4A,
-    'k': 0x4B, 'l': 0x4C, 'm': 0x4D, 'n': 0x4E, 'o': 0x4F,
-    'p': 0x50, 'q': 0x51, 'r': 0x52, 's': 0x53, 't': 0x54,
-    'u': 0x55, 'v': 0x56, 'w': 0x57, 'x': 0x58, 'y': 0x59, 'z': 0x5A,
-    'numpad_0': 0x60, 'numpad_1': 0x61, 'numpad_2': 0x62,
-    'numpad_3': 0x63, 'numpad_4': 0x64, 'numpad_5': 0x65,
-    'numpad_6': 0x66, 'numpad_7': 0x67, 'numpad_8': 0x68, 'numpad_9': 0x69,
-    'multiply': 0x6A, 'add': 0x6B, 'separator': 0x6C,
-    'subtract': 0x6D, 'decimal': 0x6E, 'divide': 0x6F,
-    'f1': 0x70, 'f2': 0x71, 'f3': 0x72, 'f4': 0x73, 'f5': 0x74,
-    'f6': 0x75, 'f7': 0x76, 'f8': 0x77, 'f9': 0x78, 'f10': 0x79,
-    'f11': 0x7A, 'f12': 0x7B,
-    'num_lock': 0x90, 'scroll_lock': 0x91,
-    'left_shift': 0xA0, 'right_shift': 0xA1,
-    'left_control': 0xA2, 'right_control': 0xA3,
-    'left_menu': 0xA4, 'right_menu': 0xA5,
-}
-
-VK_TO_NAME = {v: k.upper() for k, v in VK_CODE.items()}
+config_watcher = ConfigWatcher()
+startup.mark("config")
 
 QT_KEY_TO_VK = {
     Qt.Key_Backspace: 0x08, Qt.Key_Tab: 0x09, Qt.Key_Return: 0x0D, Qt.Key_Enter: 0x0D,
@@ -231,7 +180,7 @@ QPushButton#stop:enabled:hover {
     background-color: #ff6b5b;
 }
 
-QListWidget {
+QListView {
     background-color: #1e2333;
     border: 1px solid #3d5166;
     border-radius: 14px;
@@ -241,11 +190,11 @@ QListWidget {
     font-size: 11px;
 }
 
-QListWidget::item {
+QListView::item {
     padding: 4px;
 }
 
-QListWidget::item:selected {
+QListView::item:selected {
     background-color: #3d5166;
     border-radius: 6px;
 }
@@ -273,6 +222,86 @@ class SignalEmitter(QObject):
     update_ui = pyqtSignal()
     update_processes = pyqtSignal()
     update_status = pyqtSignal(bool)
+    config_changed = pyqtSignal(object)
+    hotkey_started = pyqtSignal(object)
+    hotkey_stopped = pyqtSignal()
+    replay_finished = pyqtSignal()
+    exit_requested = pyqtSignal()
+
+
+# =============================================================================
+# Process List Model
+# =============================================================================
+
+class ProcessListModel(QAbstractListModel):
+    """Game processes shown in the main window, one row per PID.
+
+    update() applies the difference to a new PID set as row inserts and
+    removals, and only signals label changes for rows whose text changed,
+    so the view never rebuilds its items. While there are no processes a
+    single placeholder row is shown instead.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pids = []  # Sorted
+        self._labels = {}  # PID -> row text
+        self.placeholder = ""
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._pids) or 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if not self._pids:
+            return self.placeholder if role == Qt.DisplayRole else None
+        pid = self._pids[index.row()]
+        if role == Qt.DisplayRole:
+            return self._labels[pid]
+        if role == Qt.UserRole:
+            return pid
+        return None
+
+    def update(self, pids, label, placeholder=""):
+        """Show pids, labelling each row with label(pid)"""
+        pids = set(pids)
+        current = set(self._pids)
+
+        if not pids or not current:
+            # Switching to or from the placeholder row
+            if pids != current or placeholder != self.placeholder:
+                self.beginResetModel()
+                self._pids = sorted(pids)
+                self._labels = {pid: label(pid) for pid in pids}
+                self.placeholder = placeholder
+                self.endResetModel()
+            return
+
+        self.placeholder = placeholder
+        root = QModelIndex()
+        for pid in current - pids:
+            row = bisect_left(self._pids, pid)
+            self.beginRemoveRows(root, row, row)
+            del self._pids[row]
+            del self._labels[pid]
+            self.endRemoveRows()
+
+        for row, pid in enumerate(self._pids):
+            text = label(pid)
+            if text != self._labels[pid]:
+                self._labels[pid] = text
+                changed = self.index(row)
+                self.dataChanged.emit(changed, changed, [Qt.DisplayRole])
+
+        for pid in sorted(pids - current):
+            row = bisect_left(self._pids, pid)
+            self.beginInsertRows(root, row, row)
+            self._pids.insert(row, pid)
+            self._labels[pid] = label(pid)
+            self.endInsertRows()
 
 
 # =============================================================================
@@ -286,16 +315,32 @@ class GameOverlay(QWidget):
     OVERLAY_HEIGHT = 72
     MARGIN = 12
 
-    def __init__(self):
+    # Label fonts, palettes and background pixmaps are built once and shared
+    # by all overlays, so a state change only swaps references
+    FONTS = {
+        'title': ("Segoe UI", 9, True),
+        'status': ("Segoe UI", 14, True),
+        'info': ("Consolas", 12, False),
+    }
+    STATUS_ALPHA = {True: 255, False: 200}
+    INFO_ALPHA = {True: 220, False: 150}
+
+    _font_cache = {}
+    _palette_cache = {}
+    _background_cache = {}
+
+    def __init__(self, backend):
         super().__init__(None)
+        self.backend = backend
         self.game_hwnd = None
         self.is_active = False
         self.key_name = ""
         self.interval = 0
 
+        self._last_pos = None
+
         self._setup_window()
         self._setup_ui()
-        self._setup_timer()
         self.hide()
 
     def _setup_window(self):
@@ -318,67 +363,63 @@ class GameOverlay(QWidget):
 
         # Title
         self.title_label = QLabel("DD2 KeyPresser")
-        self.title_label.setStyleSheet("""
-            QLabel {
-                color: rgba(255, 255, 255, 140);
-                font-size: 9px;
-                font-weight: bold;
-                font-family: Segoe UI;
-                background: transparent;
-            }
-        """)
+        self.title_label.setFont(self._font('title'))
+        self.title_label.setPalette(self._palette(140))
         layout.addWidget(self.title_label)
 
         # Status
-        self.status_label = QLabel("Stopped")
-        self.status_label.setStyleSheet(self._get_status_style(False))
+        self.status_label = QLabel("○ Stopped")
+        self.status_label.setFont(self._font('status'))
+        self.status_label.setPalette(self._palette(self.STATUS_ALPHA[False]))
         layout.addWidget(self.status_label)
 
         # Key info
         self.info_label = QLabel("No key set")
-        self.info_label.setStyleSheet(self._get_info_style(False))
+        self.info_label.setFont(self._font('info'))
+        self.info_label.setPalette(self._palette(self.INFO_ALPHA[False]))
         layout.addWidget(self.info_label)
 
-    def _setup_timer(self):
-        """Setup position tracking timer"""
-        self.position_timer = QTimer(self)
-        self.position_timer.timeout.connect(self.update_position)
-        self.position_timer.start(50)
-
-    @staticmethod
-    def _get_status_style(active):
-        opacity = 255 if active else 200
-        return f"""
-            QLabel {{
-                color: rgba(255, 255, 255, {opacity});
-                font-size: 14px;
-                font-weight: bold;
-                font-family: Segoe UI;
-                background: transparent;
-            }}
-        """
-
-    @staticmethod
-    def _get_info_style(active):
-        opacity = 220 if active else 150
-        return f"""
-            QLabel {{
-                color: rgba(255, 255, 255, {opacity});
-                font-size: 12px;
-                font-family: Consolas;
-                background: transparent;
-            }}
-        """
-
-    def paintEvent(self, event):
-        """Draw semi-transparent rounded background with border"""
-        painter = QPainter(self)
+    @classmethod
+    def _font(cls, kind):
+        """Return the shared font for a label kind"""
+        font = cls._font_cache.get(kind)
+        if font is None:
+            family, pixel_size, bold = cls.FONTS[kind]
+            font = QFont(family)
+            font.setPixelSize(pixel_size)
+            font.setBold(bold)
+            cls._font_cache[kind] = font
+        return font
+
+    @classmethod
+    def _palette(cls, alpha):
+        """Return the shared white-text palette with the given opacity"""
+        palette = cls._palette_cache.get(alpha)
+        if palette is None:
+            palette = QPalette()
+            palette.setColor(QPalette.WindowText, QColor(255, 255, 255, alpha))
+            cls._palette_cache[alpha] = palette
+        return palette
+
+    @classmethod
+    def _background(cls, active, ratio):
+        """Return the pre-rendered background for a state and pixel ratio"""
+        key = (active, ratio)
+        pixmap = cls._background_cache.get(key)
+        if pixmap is not None:
+            return pixmap
+
+        pixmap = QPixmap(int(cls.OVERLAY_WIDTH * ratio), int(cls.OVERLAY_HEIGHT * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
 
-        rect = self.rect().adjusted(1, 1, -1, -1)
+        rect = QRectF(0, 0, cls.OVERLAY_WIDTH, cls.OVERLAY_HEIGHT).adjusted(1, 1, -1, -1)
         gradient = QLinearGradient(0, 0, 0, rect.height())
 
-        if self.is_active:
+        if active:
             gradient.setColorAt(0, QColor(16, 185, 129, 240))
             gradient.setColorAt(1, QColor(5, 150, 105, 240))
             border_color = QColor(52, 211, 153, 200)
@@ -394,63 +435,190 @@ class GameOverlay(QWidget):
         painter.setBrush(Qt.NoBrush)
         painter.setPen(QPen(border_color, 1.5))
         painter.drawRoundedRect(rect, 12, 12)
+        painter.end()
+
+        cls._background_cache[key] = pixmap
+        return pixmap
+
+    def paintEvent(self, event):
+        """Draw the cached semi-transparent rounded background"""
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._background(self.is_active, self.devicePixelRatioF()))
 
     def set_status(self, active, key_name="", interval=0):
         """Update overlay status"""
+        info = f"{key_name}  ·  {interval}ms" if key_name else "No key set"
+        state_changed = active != self.is_active
+
         self.is_active = active
         self.key_name = key_name
         self.interval = interval
 
-        self.status_label.setText("● ACTIVE" if active else "○ Stopped")
-        self.status_label.setStyleSheet(self._get_status_style(active))
-        self.info_label.setStyleSheet(self._get_info_style(active))
-        self.info_label.setText(f"{key_name}  ·  {interval}ms" if key_name else "No key set")
-        self.update()
+        if info != self.info_label.text():
+            self.info_label.setText(info)
+
+        if state_changed:
+            self.status_label.setText("● ACTIVE" if active else "○ Stopped")
+            self.status_label.setPalette(self._palette(self.STATUS_ALPHA[active]))
+            self.info_label.setPalette(self._palette(self.INFO_ALPHA[active]))
+            self.update()
 
     def set_game_hwnd(self, hwnd):
         """Set the game window handle to track"""
+        if hwnd != self.game_hwnd:
+            self._last_pos = None
         self.game_hwnd = hwnd
-        if hwnd:
-            self.update_position()
-            self.show()
-            self.raise_()
-        else:
+        if not hwnd:
             self.hide()
 
-    def update_position(self):
-        """Update overlay position to follow game window"""
-        if not self.game_hwnd:
+    def update_position(self, foreground):
+        """Follow the game window. Returns True while it is in the foreground"""
+        # Only show when game is in focus
+        if not self.game_hwnd or foreground != self.game_hwnd:
             if self.isVisible():
                 self.hide()
-            return
+            return False
 
         try:
-            if not win32gui.IsWindow(self.game_hwnd):
-                self.game_hwnd = None
+            if not self.backend.is_window_visible(self.game_hwnd):
                 self.hide()
-                return
-
-            if not win32gui.IsWindowVisible(self.game_hwnd):
-                self.hide()
-                return
-
-            # Only show when game is in focus
-            if win32gui.GetForegroundWindow() != self.game_hwnd:
-                if self.isVisible():
-                    self.hide()
-                return
+                return False
 
             # Position at top-left of game client area
-            point = win32gui.ClientToScreen(self.game_hwnd, (0, 0))
-            self.move(point[0] + self.MARGIN, point[1] + self.MARGIN)
-
-            if not self.isVisible():
-                self.show()
-                self.raise_()
-
+            point = self.backend.client_to_screen(self.game_hwnd, (0, 0))
         except Exception:
             self.game_hwnd = None
             self.hide()
+            return False
+
+        pos = (point[0] + self.MARGIN, point[1] + self.MARGIN)
+        if pos != self._last_pos:
+            self.move(*pos)
+            self._last_pos = pos
+
+        if not self.isVisible():
+            self.show()
+            self.raise_()
+        return True
+
+
+class OverlayPool:
+    """Reuses overlay windows across game client restarts.
+
+    Each overlay owns a native window, labels and fonts. Creating one per
+    client and closing it when the client exits grows the process over a
+    long session of restarts, so released overlays are reset, hidden and
+    handed out again. At most MAX_FREE are kept; the rest are deleted.
+    """
+
+    MAX_FREE = 4
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._free = []
+        self.created = 0
+        self.reused = 0
+        self.deleted = 0
+
+    def acquire(self):
+        """Return a hidden overlay with no game window"""
+        if self._free:
+            self.reused += 1
+            return self._free.pop()
+        self.created += 1
+        return GameOverlay(self.backend)
+
+    def release(self, overlay):
+        """Hide an overlay and keep it for the next acquire()"""
+        overlay.set_game_hwnd(None)
+        overlay.hide()
+        if len(self._free) < self.MAX_FREE:
+            self._free.append(overlay)
+        else:
+            self._delete(overlay)
+
+    def clear(self):
+        """Delete every pooled overlay"""
+        while self._free:
+            self._delete(self._free.pop())
+
+    def stats(self):
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'deleted': self.deleted,
+            'free': len(self._free),
+        }
+
+    def _delete(self, overlay):
+        overlay.close()
+        overlay.deleteLater()
+        self.deleted += 1
+
+
+class OverlayTracker(QObject):
+    """Single timer that keeps every overlay on top of its game window.
+
+    The foreground window is queried once per tick for all overlays, and
+    only the overlay of the focused game window does any further native
+    calls. The timer only runs fast while a game window is in the
+    foreground. Otherwise, if the backend reports foreground changes, it
+    stops and the next change restarts it; if not, it polls slowly. It
+    stops entirely when there are no overlays.
+    """
+
+    FAST_INTERVAL = 50
+    SLOW_INTERVAL = 250
+
+    foreground_changed = pyqtSignal()
+
+    def __init__(self, backend, overlays, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.overlays = overlays  # Shared dict of PID -> GameOverlay
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self._ticks = registry.counter('overlay.ticks')
+        self._tick_time = registry.histogram('overlay.tick_ms')
+        self._meter = power.meter('overlay')
+        # The signal hands the backend callback to the GUI thread
+        self.foreground_changed.connect(self.tick)
+        self._hooked = backend.watch_foreground(self.foreground_changed.emit)
+
+    def refresh(self):
+        """Reposition overlays now and (re)start tracking if needed"""
+        self.tick()
+
+    def tick(self):
+        """Update all overlays against the current foreground window"""
+        if not self.overlays:
+            self.timer.stop()
+            power.update(foreground=False)
+            return
+
+        started = time.perf_counter()
+        self._ticks.inc()
+        self._meter.tick()
+        try:
+            foreground = self.backend.get_foreground_window()
+        except Exception:
+            foreground = None
+
+        active = False
+        for overlay in self.overlays.values():
+            if overlay.update_position(foreground):
+                active = True
+
+        power.update(foreground=active)
+        if active or not self._hooked:
+            interval = self.FAST_INTERVAL if active else self.SLOW_INTERVAL
+            if self.timer.interval() != interval:
+                self.timer.setInterval(interval)
+            if not self.timer.isActive():
+                self.timer.start()
+        else:
+            self.timer.stop()
+        self._tick_time.observe((time.perf_counter() - started) * 1000.0)
 
 
 # =============================================================================
@@ -461,22 +629,44 @@ class GameKeyPresserApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self._init_state()
+        startup.mark("init state")
         self._setup_window()
         self._setup_ui()
+        startup.mark("build ui")
         self._setup_signals()
         self._start_services()
+        startup.mark("start services")
 
     def _init_state(self):
         """Initialize state variables"""
+        self.settings = settings = config_watcher.settings
         self.selected_processes = {}
-        self.key_to_press = ""
-        self.key_vk_code = None
-        self.press_interval = 100
+        self.key_vk_code = settings.key_vk
+        self.key_to_press = vk_to_display_name(settings.key_vk) if settings.key_vk else ""
+        self.press_interval = settings.interval
+        self.profiles = ProfileTable(settings.profiles)
+        self._assignments = []  # Resolved (pid, vk_code, interval_ms) while pressing
+        self._armed = None  # ((vk_code, interval_ms, entries), assignments) for the start hotkey
         self.is_pressing = False
-        self.stop_event = threading.Event()
+        self.is_replaying = False
         self.is_capturing = False
+        self.recorder = None  # (KeyboardCapture, RecordingWriter) while recording keys
         self._hotkeys_registered = False
         self.overlays = {}  # Dict of PID -> GameOverlay
+        self.memory_monitor = None
+        self.tray_icon = None
+        self._first_paint_done = False
+        self.metrics_exporters = []
+        self.backend = create_backend()
+        self.discovery = ProcessDiscovery(self.backend, settings.game_name)
+        self.overlay_pool = OverlayPool(self.backend)
+        self.overlay_tracker = OverlayTracker(self.backend, self.overlays, self)
+        self.engine = PressEngine(
+            self.backend, settings.overrun_policy, settings.dispatch_mode,
+            settings.window_timeout_ms, settings.rate_control,
+            settings.journal_size, settings.journal_dir
+        )
+        self.engine.get_plan(self.key_vk_code)
 
     def _setup_window(self):
         """Configure main window"""
@@ -495,13 +685,33 @@ class GameKeyPresserApp(QMainWindow):
         self.signals.update_ui.connect(self._on_stop_ui_update)
         self.signals.update_processes.connect(self._update_process_list)
         self.signals.update_status.connect(self._update_status)
+        self.signals.config_changed.connect(self._apply_settings)
+        self.signals.hotkey_started.connect(self._on_hotkey_started)
+        self.signals.hotkey_stopped.connect(self._on_hotkey_stopped)
+        self.signals.replay_finished.connect(self._on_replay_finished)
+        # Queued from the tray thread, so shutdown runs on the Qt thread
+        self.signals.exit_requested.connect(self._exit_app)
+        self.engine.on_finished = self.signals.replay_finished.emit
 
     def _start_services(self):
-        """Start background services"""
+        """Start background services needed before the window is usable"""
         self._setup_hotkeys()
         self._start_process_monitor()
+        self._start_metrics()
+        config_watcher.start(lambda old, new: self.signals.config_changed.emit(new))
+
+    def _start_deferred_services(self):
+        """Start non-critical services once the window has been painted"""
         self._setup_tray()
 
+    def paintEvent(self, event):
+        """Start deferred services after the first paint"""
+        super().paintEvent(event)
+        if not self._first_paint_done:
+            self._first_paint_done = True
+            startup.mark("first paint")
+            QTimer.singleShot(0, self._start_deferred_services)
+
     def _setup_ui(self):
         """Build the user interface"""
         central = QWidget()
@@ -558,7 +768,7 @@ class GameKeyPresserApp(QMainWindow):
         key_layout = QHBoxLayout(key_frame)
         key_layout.setContentsMargins(10, 0, 10, 0)
 
-        self.key_display = QLabel("—")
+        self.key_display = QLabel(self.key_to_press or "—")
         self.key_display.setObjectName("keyText")
         self.key_display.setAlignment(Qt.AlignCenter)
         key_layout.addWidget(self.key_display)
@@ -574,9 +784,10 @@ class GameKeyPresserApp(QMainWindow):
 
         row = QHBoxLayout()
 
-        self.interval_input = QLineEdit("100")
+        self.interval_input = QLineEdit(str(self.press_interval))
         self.interval_input.setFixedSize(75, 34)
         self.interval_input.setAlignment(Qt.AlignCenter)
+        self.interval_input.textChanged.connect(lambda _text: self._arm())
         row.addWidget(self.interval_input)
 
         for ms in [50, 100, 250, 500]:
@@ -594,20 +805,20 @@ class GameKeyPresserApp(QMainWindow):
         """Build start/stop control buttons"""
         row = QHBoxLayout()
 
-        self.start_btn = QPushButton(f"START  [{START_HOTKEY}]")
+        self.start_btn = QPushButton(f"START  [{self.settings.start_hotkey}]")
         self.start_btn.setObjectName("start")
         self.start_btn.setFixedHeight(42)
         self.start_btn.setCursor(Qt.PointingHandCursor)
         self.start_btn.setEnabled(False)
-        self.start_btn.clicked.connect(self.start_pressing)
+        self.start_btn.clicked.connect(lambda: self.start_pressing())
         row.addWidget(self.start_btn)
 
-        self.stop_btn = QPushButton(f"STOP  [{STOP_HOTKEY}]")
+        self.stop_btn = QPushButton(f"STOP  [{self.settings.stop_hotkey}]")
         self.stop_btn.setObjectName("stop")
         self.stop_btn.setFixedHeight(42)
         self.stop_btn.setCursor(Qt.PointingHandCursor)
         self.stop_btn.setEnabled(False)
-        self.stop_btn.clicked.connect(self.stop_pressing)
+        self.stop_btn.clicked.connect(lambda: self.stop_pressing())
         row.addWidget(self.stop_btn)
 
         layout.addLayout(row)
@@ -627,18 +838,36 @@ class GameKeyPresserApp(QMainWindow):
 
         layout.addLayout(header)
 
-        self.process_list = QListWidget()
+        self.process_model = ProcessListModel(self)
+        self.process_list = QListView()
+        self.process_list.setModel(self.process_model)
+        self.process_list.setUniformItemSizes(True)
+        self.process_list.setEditTriggers(QListView.NoEditTriggers)
         self.process_list.setFixedHeight(100)
+        self.process_list.setToolTip("Right-click or double-click a process to give it its own key")
+        self.process_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.process_list.customContextMenuRequested.connect(self._show_process_menu)
+        self.process_list.doubleClicked.connect(
+            lambda index: self._edit_profile(index.data(Qt.UserRole))
+        )
         layout.addWidget(self.process_list)
 
     def _build_footer(self, layout):
         """Build footer with hotkey info"""
         layout.addStretch()
 
-        footer = QLabel(f"Hotkeys: {START_HOTKEY} = start, {STOP_HOTKEY} = stop")
-        footer.setObjectName("footer")
-        footer.setAlignment(Qt.AlignCenter)
-        layout.addWidget(footer)
+        self.footer = QLabel(self._footer_text())
+        self.footer.setObjectName("footer")
+        self.footer.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.footer)
+
+    def _footer_text(self):
+        """Hotkey and timeline summary shown in the footer"""
+        settings = self.settings
+        text = f"Hotkeys: {settings.start_hotkey} = start, {settings.stop_hotkey} = stop"
+        if settings.timeline:
+            text += f"  ·  Timeline: {len(settings.timeline)} keys"
+        return text
 
     # -------------------------------------------------------------------------
     # Key Capture
@@ -648,16 +877,7 @@ class GameKeyPresserApp(QMainWindow):
         """Set the press interval"""
         self.interval_input.setText(str(ms))
         self.press_interval = ms
-        for overlay in self.overlays.values():
-            overlay.set_status(self.is_pressing, self.key_to_press, ms)
-
-    def _vk_to_display_name(self, vk_code):
-        """Get display name for a VK code"""
-        if vk_code in VK_TO_NAME:
-            return VK_TO_NAME[vk_code]
-        if 0x30 <= vk_code <= 0x39 or 0x41 <= vk_code <= 0x5A:
-            return chr(vk_code)
-        return f"KEY_{vk_code}"
+        self._refresh_overlays()
 
     def _start_capture_key(self):
         """Start key capture mode"""
@@ -682,12 +902,13 @@ class GameKeyPresserApp(QMainWindow):
         vk_code = QT_KEY_TO_VK.get(qt_key) or event.nativeVirtualKey()
 
         if vk_code:
-            start_vk = VK_CODE.get(START_HOTKEY.lower())
-            stop_vk = VK_CODE.get(STOP_HOTKEY.lower())
+            settings = self.settings
+            hotkeys = hotkey_keys(settings.start_hotkey) | hotkey_keys(settings.stop_hotkey)
 
-            if vk_code not in [start_vk, stop_vk]:
+            if vk_code not in hotkeys:
                 self.key_vk_code = vk_code
-                display_name = self._vk_to_display_name(vk_code)
+                self.engine.get_plan(vk_code)  # Compile now rather than on start
+                display_name = vk_to_display_name(vk_code)
                 self.key_to_press = display_name
                 self._finish_capture(display_name)
 
@@ -702,8 +923,8 @@ class GameKeyPresserApp(QMainWindow):
         except ValueError:
             self.press_interval = 100
 
-        for overlay in self.overlays.values():
-            overlay.set_status(self.is_pressing, display_name, self.press_interval)
+        self._refresh_overlays()
+        self._arm()
 
     # -------------------------------------------------------------------------
     # Hotkeys
@@ -713,73 +934,89 @@ class GameKeyPresserApp(QMainWindow):
         """Register global hotkeys"""
         if self._hotkeys_registered:
             return
+        self._hotkeys_registered = True
 
-        def hotkey_thread():
-            try:
-                user32 = ctypes.windll.user32
-                import ctypes.wintypes as wintypes
-
-                vk_start = VK_CODE.get(START_HOTKEY.lower())
-                vk_stop = VK_CODE.get(STOP_HOTKEY.lower())
-
-                if vk_start and vk_stop:
-                    user32.RegisterHotKey(None, 1, 0, vk_start)
-                    user32.RegisterHotKey(None, 2, 0, vk_stop)
-                    self._hotkeys_registered = True
-
-                    msg = wintypes.MSG()
-                    while user32.GetMessageW(ctypes.byref(msg), None, 0, 0):
-                        if msg.message == 0x0312:  # WM_HOTKEY
-                            if msg.wParam == 1:
-                                QTimer.singleShot(0, self.start_pressing)
-                            elif msg.wParam == 2:
-                                QTimer.singleShot(0, self.stop_pressing)
-            except Exception:
-                pass
+        self.hotkeys = HotkeyListener()
+        self._start_hotkey_id = self.hotkeys.add(
+            parse_hotkey(self.settings.start_hotkey), self._on_start_hotkey
+        )
+        self._stop_hotkey_id = self.hotkeys.add(
+            parse_hotkey(self.settings.stop_hotkey), self._on_stop_hotkey
+        )
+        self.hotkeys.start()
 
-        threading.Thread(target=hotkey_thread, daemon=True).start()
+    def _arm(self):
+        """Resolve what the start hotkey presses ahead of time (Qt thread).
+
+        The hotkey thread starts the engine from this snapshot itself, so a
+        start never waits for the Qt event loop. Re-armed whenever the key,
+        interval, clients or config change.
+        """
+        self._armed = None
+        if self.is_pressing or not self.selected_processes:
+            return
+        if not self.key_vk_code and not self.settings.timeline and not self.profiles:
+            return
+        try:
+            interval = max(int(self.interval_input.text()), 10)
+        except ValueError:
+            return
+        # Same as start_pressing, so overlays, profile defaults and later
+        # retargets use the interval the hotkey starts with
+        self.press_interval = interval
+        assignments = self._resolve_profiles()
+        target = press_target(self.key_vk_code, interval, self.settings.timeline, assignments)
+        self._armed = (target, assignments)
+
+    def _on_start_hotkey(self, pressed_at):
+        """Start hotkey callback (runs in hotkey thread).
+
+        Queues the start on the engine directly; the Qt thread only catches
+        up with the UI afterwards.
+        """
+        armed = self._armed
+        if armed is None or self.engine.running:
+            return
+        (vk_code, interval, entries), assignments = armed
+        if entries:
+            started = self.engine.start_timeline(entries, pressed_at)
+        else:
+            started = self.engine.start(vk_code, interval, pressed_at)
+        if started:
+            self.signals.hotkey_started.emit(assignments)
+
+    def _on_stop_hotkey(self, pressed_at):
+        """Stop hotkey callback (runs in hotkey thread)"""
+        if self.engine.running:
+            self.engine.stop(pressed_at)
+            self.signals.hotkey_stopped.emit()
+
+    def _on_hotkey_started(self, assignments):
+        """UI side of a hotkey start (Qt thread)"""
+        if self.is_pressing or not self.engine.running:
+            return
+        self._assignments = assignments
+        self.is_pressing = True
+        self._armed = None
+        self._on_start_ui_update()
+
+    def _on_hotkey_stopped(self):
+        """UI side of a hotkey stop (Qt thread)"""
+        self.is_pressing = False
+        self.is_replaying = False
+        self._on_stop_ui_update()
+        self._arm()
 
     # -------------------------------------------------------------------------
     # Key Pressing
     # -------------------------------------------------------------------------
 
-    def _find_game_windows(self):
-        """Find all windows belonging to monitored processes"""
-        pid_to_hwnd = {}
-
-        def enum_callback(hwnd, _):
-            try:
-                if win32gui.IsWindow(hwnd):
-                    _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                    if pid in self.selected_processes and pid not in pid_to_hwnd:
-                        pid_to_hwnd[pid] = hwnd
-            except Exception:
-                pass
-            return True
-
-        try:
-            win32gui.EnumWindows(enum_callback, None)
-        except Exception:
-            pass
-
-        return list(pid_to_hwnd.values())
-
-    def _send_key_to_window(self, hwnd, vk_code):
-        """Send key press to a window"""
-        if not vk_code:
+    def start_pressing(self, requested_at=None):
+        """Start the key pressing loop"""
+        if self.is_pressing or not self.selected_processes:
             return
-        try:
-            scan_code = win32api.MapVirtualKey(vk_code, 0)
-            lparam_down = (scan_code << 16) | 1
-            lparam_up = (scan_code << 16) | 0xC0000001
-            win32api.PostMessage(hwnd, win32con.WM_KEYDOWN, vk_code, lparam_down)
-            win32api.PostMessage(hwnd, win32con.WM_KEYUP, vk_code, lparam_up)
-        except Exception:
-            pass
 
-    def start_pressing(self):
-        """Start the key pressing loop"""
-        if self.is_pressing or not self.key_vk_code or not self.selected_processes:
+        if not self.key_vk_code and not self.settings.timeline and not self.profiles:
             return
 
         try:
@@ -789,48 +1026,123 @@ class GameKeyPresserApp(QMainWindow):
         except ValueError:
             return
 
+        vk_code, interval, entries = self._press_target()
+        if entries:
+            started = self.engine.start_timeline(entries, requested_at)
+        else:
+            started = self.engine.start(vk_code, interval, requested_at)
+
+        if not started:
+            return
         self.is_pressing = True
-        self.stop_event.clear()
+        self._armed = None
+        self._on_start_ui_update()
 
-        self.start_btn.setEnabled(False)
-        self.stop_btn.setEnabled(True)
-        self.capture_btn.setEnabled(False)
-        self.interval_input.setEnabled(False)
-        self.signals.update_status.emit(True)
+    def start_replay(self, requested_at=None):
+        """Replay the [settings] recording file to the selected clients"""
+        if self.is_pressing or self.recorder is not None or not self.selected_processes:
+            return
 
-        threading.Thread(target=self._press_loop, daemon=True).start()
+        settings = self.settings
+        try:
+            started = self.engine.start_replay(
+                settings.recording, settings.replay_loop, requested_at
+            )
+        except (OSError, ValueError) as exc:
+            self._notify(f"Cannot replay {settings.recording}: {exc}")
+            return
 
-    def stop_pressing(self):
-        """Stop the key pressing loop"""
-        if not self.is_pressing:
+        if not started:
             return
+        self.is_pressing = True
+        self.is_replaying = True
+        self._on_start_ui_update()
 
-        self.stop_event.set()
+    def _on_replay_finished(self):
+        """A non-looping replay reached its end (Qt thread)"""
+        if not self.is_replaying or self.engine.running:
+            return
         self.is_pressing = False
-        self.signals.update_ui.emit()
+        self.is_replaying = False
+        self._on_stop_ui_update()
+        self._arm()
+        self._notify(f"Replay of {self.settings.recording} finished")
+
+    def toggle_recording(self):
+        """Start recording keys to the [settings] recording file, or finish it"""
+        if self.recorder is not None:
+            capture, writer = self.recorder
+            self.recorder = None
+            capture.stop()
+            writer.close()
+            self._notify(f"Recorded {writer.count} keys to {writer.path}")
+            return
+        if self.is_pressing:
+            return
 
-    def _press_loop(self):
-        """Main key pressing loop (runs in thread)"""
-        vk_code = self.key_vk_code
-        interval = self.press_interval / 1000.0
+        settings = self.settings
+        try:
+            writer = RecordingWriter(settings.recording)
+        except OSError as exc:
+            self._notify(f"Cannot write {settings.recording}: {exc}")
+            return
 
-        while not self.stop_event.is_set():
-            windows = self._find_game_windows()
-            if not windows:
-                self.stop_event.wait(0.5)
-                continue
+        ignore = hotkey_keys(settings.start_hotkey) | hotkey_keys(settings.stop_hotkey)
+        capture = KeyboardCapture(writer.add, ignore)
+        capture.start()
+        capture.ready.wait(1.0)
+        if capture.error is not None:
+            writer.close()
+            self._notify(f"Keyboard capture unavailable: {capture.error}")
+            return
+        self.recorder = (capture, writer)
+        self._notify("Recording keys - choose Finish recording in the tray menu")
+
+    def _press_target(self):
+        """Return (vk_code, interval_ms, timeline entries) to press"""
+        self._assignments = self._resolve_profiles()
+        return press_target(
+            self.key_vk_code, self.press_interval, self.settings.timeline, self._assignments
+        )
+
+    def _resolve_profiles(self):
+        """Return per-client (pid, vk_code, interval_ms), or [] without profiles"""
+        if not self.profiles:
+            return []
+        return self.profiles.resolve(
+            self.selected_processes, self.engine.window_titles(),
+            self.key_vk_code, self.press_interval
+        )
 
-            for hwnd in windows:
-                if self.stop_event.is_set():
-                    break
-                self._send_key_to_window(hwnd, vk_code)
+    def _retarget_profiles(self):
+        """Re-resolve profiles and retarget a running loop if they changed"""
+        if (self.is_pressing and not self.is_replaying
+                and self._resolve_profiles() != self._assignments):
+            self.engine.retarget(*self._press_target())
 
-            self.stop_event.wait(interval)
+    def stop_pressing(self, requested_at=None):
+        """Stop the key pressing loop"""
+        if not self.is_pressing:
+            return
+
+        self.engine.stop(requested_at)
+        self.is_pressing = False
+        self.is_replaying = False
+        self.signals.update_ui.emit()
+        self._arm()
 
     # -------------------------------------------------------------------------
     # UI Updates
     # -------------------------------------------------------------------------
 
+    def _on_start_ui_update(self):
+        """Update UI when starting"""
+        self.start_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.capture_btn.setEnabled(False)
+        self.interval_input.setEnabled(False)
+        self.signals.update_status.emit(True)
+
     def _on_stop_ui_update(self):
         """Update UI when stopping"""
         self.start_btn.setEnabled(True)
@@ -850,8 +1162,7 @@ class GameKeyPresserApp(QMainWindow):
             self.status_label.setText("Stopped")
             self.status_label.setStyleSheet("color: #8892a0;")
 
-        for overlay in self.overlays.values():
-            overlay.set_status(active, self.key_to_press, self.press_interval)
+        self._refresh_overlays(active)
 
     # -------------------------------------------------------------------------
     # Process Monitoring
@@ -859,57 +1170,115 @@ class GameKeyPresserApp(QMainWindow):
 
     def _start_process_monitor(self):
         """Start process monitoring thread"""
-        threading.Thread(target=self._monitor_processes, daemon=True).start()
-
-    def _monitor_processes(self):
-        """Monitor for game processes (runs in thread)"""
-        previous_pids = set()
-
-        while True:
-            try:
-                current_pids = set()
-                for proc in psutil.process_iter(['pid', 'name']):
-                    try:
-                        if proc.info['name'] and proc.info['name'].lower() == GAME_NAME.lower():
-                            current_pids.add(proc.info['pid'])
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-
-                if current_pids != previous_pids:
-                    self.selected_processes = {
-                        pid: f"{GAME_NAME} (PID: {pid})" for pid in current_pids
-                    }
-                    self.signals.update_processes.emit()
-                    previous_pids = current_pids.copy()
-            except Exception:
-                pass
+        self.process_monitor = ProcessMonitor(self.discovery, self._on_processes_changed)
+        self.process_monitor.start()
 
-            time.sleep(2)
+    def _on_processes_changed(self, current_pids):
+        """Process monitor callback (runs in thread)"""
+        self.selected_processes = {
+            pid: f"{self.settings.game_name} (PID: {pid})" for pid in current_pids
+        }
+        self.engine.set_pids(current_pids)
+        self.signals.update_processes.emit()
 
     def _update_process_list(self):
         """Update the process list UI"""
-        self.process_list.clear()
+        processes = self.selected_processes
+        self.profiles.retain(processes)
+        titles = self.engine.window_titles() if processes and self.profiles else {}
+        self.process_model.update(
+            processes,
+            lambda pid: f"  > {processes[pid]}{self._profile_suffix(pid, titles)}",
+            f"  Waiting for {self.settings.game_name}..."
+        )
 
-        if self.selected_processes:
-            for info in self.selected_processes.values():
-                self.process_list.addItem(f"  > {info}")
-            self.process_count.setText(f"Found: {len(self.selected_processes)}")
+        if processes:
+            self.process_count.setText(f"Found: {len(processes)}")
 
             if not self.is_pressing:
                 self.start_btn.setEnabled(True)
             self._update_game_hwnds()
+            self._retarget_profiles()
         else:
-            self.process_list.addItem(f"  Waiting for {GAME_NAME}...")
             self.process_count.setText("Found: 0")
 
             if not self.is_pressing:
                 self.start_btn.setEnabled(False)
             self._cleanup_all_overlays()
+        self._arm()
+
+    # -------------------------------------------------------------------------
+    # Profiles
+    # -------------------------------------------------------------------------
+
+    def _profile_suffix(self, pid, titles):
+        """Process list annotation for a client's profile"""
+        profile = self.profiles.get(pid, titles.get(pid)) if self.profiles else None
+        if profile is None:
+            return ""
+        return f"  ·  {vk_to_display_name(profile.vk_code)} / {profile.interval} ms"
+
+    def _client_key(self, pid, titles):
+        """Return (key name, interval) a client is pressed with"""
+        profile = self.profiles.get(pid, titles.get(pid)) if self.profiles else None
+        if profile is None:
+            return self.key_to_press, self.press_interval
+        return vk_to_display_name(profile.vk_code), profile.interval
+
+    def _refresh_overlays(self, active=None):
+        """Show each client's own key and interval on its overlay"""
+        if active is None:
+            active = self.is_pressing
+        titles = self.engine.window_titles() if self.profiles else {}
+        for pid, overlay in self.overlays.items():
+            overlay.set_status(active, *self._client_key(pid, titles))
+
+    def _show_process_menu(self, pos):
+        """Context menu for assigning a profile to a process"""
+        index = self.process_list.indexAt(pos)
+        pid = index.data(Qt.UserRole) if index.isValid() else None
+        if pid is None:
+            return
+
+        menu = QMenu(self)
+        menu.addAction("Set key / interval...", lambda: self._edit_profile(pid))
+        if self.profiles.assigned(pid):
+            menu.addAction("Use default", lambda: self._set_profile(pid, None))
+        menu.exec_(self.process_list.mapToGlobal(pos))
+
+    def _edit_profile(self, pid):
+        """Ask for a process's key and interval"""
+        if pid is None:
+            return
+        current = self.profiles.assigned(pid)
+        text = f"{vk_to_display_name(current.vk_code)}, {current.interval}" if current else ""
+        value, ok = QInputDialog.getText(
+            self, "Client profile",
+            f"Key and interval (ms) for PID {pid}, e.g. \"1, 100\".\n"
+            "Leave empty to use the default:",
+            text=text
+        )
+        if not ok:
+            return
+        if not value.strip():
+            self._set_profile(pid, None)
+            return
+        profile = parse_profile(value)
+        if profile is not None:
+            self._set_profile(pid, profile)
+
+    def _set_profile(self, pid, profile):
+        """Assign (or clear) a process's profile and apply it"""
+        if profile is None:
+            self.profiles.unassign(pid)
+        else:
+            self.profiles.assign(pid, profile)
+        self._update_process_list()
 
     def _cleanup_all_overlays(self):
-        """Close and remove all overlays"""
+        """Return all overlays to the pool"""
         for overlay in self.overlays.values():
-            overlay.close()
+            self.overlay_pool.release(overlay)
         self.overlays.clear()
 
     def _update_game_hwnds(self):
@@ -924,73 +1293,168 @@ class GameKeyPresserApp(QMainWindow):
         # Remove overlays for processes that no longer exist
         for pid in existing_pids - current_pids:
             if pid in self.overlays:
-                self.overlays[pid].close()
-                del self.overlays[pid]
+                self.overlay_pool.release(self.overlays.pop(pid))
 
-        # Create/update overlays for each process
+        # Create/update overlays for each process, from one window walk
+        windows = find_main_windows(self.backend, current_pids)
         for pid in current_pids:
-            hwnd = self._find_window_for_pid(pid)
+            hwnd = windows.get(pid)
             if hwnd:
                 # Create overlay if doesn't exist
                 if pid not in self.overlays:
-                    self.overlays[pid] = GameOverlay()
+                    self.overlays[pid] = self.overlay_pool.acquire()
 
                 self.overlays[pid].set_game_hwnd(hwnd)
-                self.overlays[pid].set_status(
-                    self.is_pressing,
-                    self.key_to_press,
-                    self.press_interval
-                )
             else:
                 # No window found - remove overlay if exists
                 if pid in self.overlays:
-                    self.overlays[pid].close()
-                    del self.overlays[pid]
+                    self.overlay_pool.release(self.overlays.pop(pid))
+
+        self._refresh_overlays()
+        self.overlay_tracker.refresh()
+
+    # -------------------------------------------------------------------------
+    # Config Reload
+    # -------------------------------------------------------------------------
 
-    def _find_window_for_pid(self, pid):
-        """Find the main window handle for a given process ID"""
-        result = []
+    def _apply_settings(self, settings):
+        """Apply a reloaded config.ini to the running app (Qt thread).
 
-        def enum_callback(hwnd, result):
+        Hotkeys, game name, key, interval and timeline take effect
+        immediately, and a running press loop is retargeted in place.
+        Dispatch mode applies from the next start, and metrics exporters
+        from the next launch.
+        """
+        changed = settings.changed(self.settings)
+        self.settings = settings
+        engine = self.engine
+        engine.overrun_policy = settings.overrun_policy
+        engine.dispatch_mode = settings.dispatch_mode
+        engine.window_timeout = settings.window_timeout_ms / 1000.0
+        engine.set_rate_control(settings.rate_control)
+        engine.journal_dir = settings.journal_dir
+
+        if 'start_hotkey' in changed:
+            self.hotkeys.update(self._start_hotkey_id, parse_hotkey(settings.start_hotkey))
+            self.start_btn.setText(f"START  [{settings.start_hotkey}]")
+        if 'stop_hotkey' in changed:
+            self.hotkeys.update(self._stop_hotkey_id, parse_hotkey(settings.stop_hotkey))
+            self.stop_btn.setText(f"STOP  [{settings.stop_hotkey}]")
+        if 'game_name' in changed:
+            self.discovery.game_name = settings.game_name
+        if 'profiles' in changed:
+            self.profiles.set_title_profiles(settings.profiles)
+        if 'key_vk' in changed and settings.key_vk and not self.is_capturing:
+            self.key_vk_code = settings.key_vk
+            self.key_to_press = vk_to_display_name(settings.key_vk)
+            self.key_display.setText(self.key_to_press)
+            self.engine.get_plan(settings.key_vk)
+        if 'interval' in changed:
+            self.press_interval = settings.interval
+            self.interval_input.setText(str(settings.interval))
+        self.footer.setText(self._footer_text())
+
+        if self.is_pressing and not self.is_replaying and changed & {
+                'key_vk', 'interval', 'timeline', 'profiles', 'overrun_policy'}:
+            self.engine.retarget(*self._press_target())
+        if 'profiles' in changed:
+            self._update_process_list()
+        self._refresh_overlays()
+        self._arm()
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def _start_metrics(self):
+        """Register component stats and start the configured exporters"""
+        registry.register_collector('engine', self.engine.stats)
+        registry.register_collector('discovery', self.discovery.stats)
+        registry.register_collector('process', ProcessUsage().snapshot)
+        registry.register_collector('config', config_watcher.stats)
+        registry.register_collector('power', power.stats)
+        registry.register_collector('overlays', self.overlay_pool.stats)
+
+        settings = self.settings
+        if settings.memory_interval:
+            self._start_memory_monitor(settings.memory_interval)
+
+        if settings.metrics_port:
+            exporter = MetricsServer(registry, settings.metrics_port)
             try:
-                if win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd):
-                    _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                    if window_pid == pid and win32gui.GetWindowText(hwnd):
-                        result.append(hwnd)
-            except Exception:
+                exporter.start()
+                self.metrics_exporters.append(exporter)
+            except OSError:
                 pass
-            return True
 
-        try:
-            win32gui.EnumWindows(enum_callback, result)
-            return result[0] if result else None
-        except Exception:
-            return None
+        if settings.metrics_file:
+            exporter = MetricsFileWriter(registry, settings.metrics_file, settings.metrics_interval)
+            exporter.start()
+            self.metrics_exporters.append(exporter)
+
+    def _start_memory_monitor(self, interval):
+        """Sample memory, widget, timer and overlay counts on the GUI thread"""
+        from keypresser.memory import MemoryMonitor
+
+        monitor = self.memory_monitor = MemoryMonitor(interval)
+        monitor.add_gauge('widgets', lambda: len(QApplication.allWidgets()))
+        monitor.add_gauge('timers', lambda: len(self.findChildren(QTimer)))
+        monitor.add_gauge('overlays', lambda: len(self.overlays))
+        monitor.add_gauge('overlays_pooled', lambda: self.overlay_pool.stats()['free'])
+        monitor.begin()
+        registry.register_collector('memory', monitor.stats)
+
+        self.memory_timer = QTimer(self)
+        self.memory_timer.timeout.connect(monitor.sample)
+        self.memory_timer.start(int(interval * 1000))
 
     # -------------------------------------------------------------------------
     # System Tray
     # -------------------------------------------------------------------------
 
     def _setup_tray(self):
-        """Setup system tray icon"""
+        """Setup system tray icon (pystray and PIL are loaded in its thread)"""
+        threading.Thread(target=self._run_tray, daemon=True).start()
+
+    def _run_tray(self):
+        """Load tray dependencies, create the icon and run it (runs in thread)"""
         try:
-            image = Image.open(resource_path("app_icon.ico"))
+            from pystray import Icon, Menu as TrayMenu, MenuItem as TrayMenuItem
+            from PIL import Image, ImageDraw
+            startup.mark("tray imports")
+
+            try:
+                image = Image.open(resource_path("app_icon.ico"))
+            except Exception:
+                image = Image.new('RGB', (64, 64), (45, 62, 80))
+                draw = ImageDraw.Draw(image)
+                draw.ellipse((8, 8, 56, 56), fill=(52, 152, 219))
+                draw.text((22, 20), "K", fill=(255, 255, 255))
+
+            menu = TrayMenu(
+                TrayMenuItem('Show', self._show_from_tray, default=True),
+                TrayMenuItem('Start', lambda: QTimer.singleShot(0, self.start_pressing)),
+                TrayMenuItem('Stop', lambda: QTimer.singleShot(0, self.stop_pressing)),
+                TrayMenu.SEPARATOR,
+                TrayMenuItem(
+                    lambda item: 'Finish recording' if self.recorder else 'Record keys',
+                    lambda: QTimer.singleShot(0, self.toggle_recording)
+                ),
+                TrayMenuItem('Replay recording', lambda: QTimer.singleShot(0, self.start_replay)),
+                TrayMenu.SEPARATOR,
+                TrayMenuItem('Dump press journal', self._dump_journal),
+                TrayMenu.SEPARATOR,
+                TrayMenuItem('Exit', lambda: self.signals.exit_requested.emit())
+            )
+
+            self.tray_icon = Icon("DD2 KeyPresser", image, "DD2 KeyPresser", menu)
         except Exception:
-            image = Image.new('RGB', (64, 64), (45, 62, 80))
-            draw = ImageDraw.Draw(image)
-            draw.ellipse((8, 8, 56, 56), fill=(52, 152, 219))
-            draw.text((22, 20), "K", fill=(255, 255, 255))
-
-        menu = TrayMenu(
-            TrayMenuItem('Show', self._show_from_tray, default=True),
-            TrayMenuItem('Start', lambda: QTimer.singleShot(0, self.start_pressing)),
-            TrayMenuItem('Stop', lambda: QTimer.singleShot(0, self.stop_pressing)),
-            TrayMenu.SEPARATOR,
-            TrayMenuItem('Exit', self._exit_app)
-        )
+            return
+        finally:
+            startup.mark("tray ready")
+            startup.report()
 
-        self.tray_icon = Icon("DD2 KeyPresser", image, "DD2 KeyPresser", menu)
-        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+        self.tray_icon.run()
 
     def _show_from_tray(self, icon=None, item=None):
         """Show window from tray"""
@@ -1002,20 +1466,60 @@ class GameKeyPresserApp(QMainWindow):
         self.activateWindow()
         self.raise_()
 
+    def _dump_journal(self, icon=None, item=None):
+        """Write the press journal to a file (runs in tray thread)"""
+        path = self.engine.dump_journal()
+        if path:
+            self._notify(f"Press journal saved to {path}")
+        else:
+            self._notify("Press journal could not be saved")
+
+    def _notify(self, message):
+        """Show a tray notification (if the tray is up)"""
+        if self.tray_icon:
+            try:
+                self.tray_icon.notify("DD2 KeyPresser", message)
+            except Exception:
+                pass
+
     def closeEvent(self, event):
         """Handle window close - minimize to tray"""
         event.ignore()
         self.hide()
-        if hasattr(self, 'tray_icon') and self.tray_icon:
+        if self.tray_icon:
             self.tray_icon.notify("DD2 KeyPresser", "Minimized to tray")
 
-    def _exit_app(self, icon=None, item=None):
-        """Exit application"""
-        self.stop_event.set()
+    def _exit_app(self):
+        """Exit application (Qt thread)"""
+        self.engine.close()
+        if self.recorder is not None:
+            capture, writer = self.recorder
+            self.recorder = None
+            capture.stop()
+            writer.close()
+        config_watcher.stop()
+        self.process_monitor.stop()
+        self.hotkeys.stop()
 
         self._cleanup_all_overlays()
+        self.overlay_pool.clear()
+
+        if self.memory_monitor is not None:
+            self.memory_timer.stop()
+            try:
+                self.memory_monitor.sample()
+                self.memory_monitor.dump(self.settings.memory_file)
+            except OSError:
+                pass
+            self.memory_monitor.stop()
+
+        for exporter in self.metrics_exporters:
+            try:
+                exporter.stop()
+            except Exception:
+                pass
 
-        if hasattr(self, 'tray_icon') and self.tray_icon:
+        if self.tray_icon:
             try:
                 self.tray_icon.stop()
             except Exception:
@@ -1040,9 +1544,11 @@ def main():
 
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
+    startup.mark("qapplication")
 
     window = GameKeyPresserApp()
     window.show()
+    startup.mark("show")
 
     sys.exit(app.exec_())
 
@@ -0,0 +1,6 @@
+"""
+DD2 Auto KeyPresser - press engine and platform layer
+
+Everything in this package is importable without PyQt5 or pywin32, so the
+press engine can be driven by the simulated backend on any platform.
+"""
@@ -0,0 +1,507 @@
+"""
+Platform backends - window enumeration, process discovery, message posting
+and foreground queries behind one interface
+"""
+import itertools
+import threading
+import time
+
+from keypresser.clock import clock as default_clock
+
+WM_KEYDOWN = 0x0100
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+
+
+# =============================================================================
+# Backend Interface
+# =============================================================================
+
+class PlatformBackend:
+    """Interface between the press engine and the operating system"""
+
+    name = "base"
+
+    def list_processes(self):
+        """Return (pid, name) pairs for all running processes"""
+        return [(pid, self.get_process_name(pid)) for pid in self.list_pids()]
+
+    def list_pids(self):
+        """Return the PIDs of all running processes"""
+        raise NotImplementedError
+
+    def get_process_name(self, pid):
+        """Return a process's executable name, or None if unavailable"""
+        raise NotImplementedError
+
+    def get_process_create_time(self, pid):
+        """Return a process's start time (epoch seconds), or None"""
+        raise NotImplementedError
+
+    def enum_windows(self):
+        """Return handles of all top-level windows"""
+        raise NotImplementedError
+
+    def get_window_pid(self, hwnd):
+        """Return the PID owning a window"""
+        raise NotImplementedError
+
+    def is_window(self, hwnd):
+        """Check whether a window handle is still valid"""
+        raise NotImplementedError
+
+    def is_window_visible(self, hwnd):
+        """Check whether a window is visible"""
+        raise NotImplementedError
+
+    def get_window_text(self, hwnd):
+        """Return a window's title"""
+        raise NotImplementedError
+
+    def is_window_hung(self, hwnd):
+        """Check whether a window has stopped processing messages"""
+        return False
+
+    def get_foreground_window(self):
+        """Return the handle of the foreground window"""
+        raise NotImplementedError
+
+    def watch_foreground(self, callback):
+        """Call callback() whenever the foreground window changes.
+
+        Returns False if the backend cannot report changes, in which case
+        the caller has to poll get_foreground_window().
+        """
+        return False
+
+    def client_to_screen(self, hwnd, point):
+        """Convert a client-area point of a window to screen coordinates"""
+        raise NotImplementedError
+
+    def map_virtual_key(self, vk_code):
+        """Translate a virtual key code to its scan code"""
+        raise NotImplementedError
+
+    def post_message(self, hwnd, msg, wparam, lparam):
+        """Post a message to a window. Returns False on failure"""
+        raise NotImplementedError
+
+    def post_batch(self, batch, stamps=None):
+        """Post a whole tick in one call.
+
+        batch is a sequence of (hwnd, events) pairs, events being
+        (msg, wParam, lParam) tuples. A window's remaining events are
+        skipped after its first failed post. If given, stamps[i] is set to
+        time.perf_counter() once window i is done. Returns the indices of
+        the windows whose posts failed.
+        """
+        post = self.post_message
+        clock = time.perf_counter
+        failed = []
+        for index, (hwnd, events) in enumerate(batch):
+            for msg, wparam, lparam in events:
+                if not post(hwnd, msg, wparam, lparam):
+                    failed.append(index)
+                    break
+            if stamps is not None:
+                stamps[index] = clock()
+        return failed
+
+
+# =============================================================================
+# Win32 Backend
+# =============================================================================
+
+class Win32Backend(PlatformBackend):
+    """Backend for a real Windows desktop (pywin32 + psutil)"""
+
+    name = "win32"
+
+    def __init__(self):
+        import psutil
+        import win32api
+        import win32gui
+        import win32process
+
+        self._psutil = psutil
+        self._win32api = win32api
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self._is_hung_app_window = None
+        self._post_message_w = None
+        self._foreground_hooks = []
+
+    def list_processes(self):
+        result = []
+        for proc in self._psutil.process_iter(['pid', 'name']):
+            try:
+                result.append((proc.info['pid'], proc.info['name']))
+            except (self._psutil.NoSuchProcess, self._psutil.AccessDenied):
+                continue
+        return result
+
+    def list_pids(self):
+        return self._psutil.pids()
+
+    def get_process_name(self, pid):
+        try:
+            return self._psutil.Process(pid).name()
+        except (self._psutil.NoSuchProcess, self._psutil.AccessDenied, ValueError):
+            return None
+
+    def get_process_create_time(self, pid):
+        try:
+            return self._psutil.Process(pid).create_time()
+        except (self._psutil.NoSuchProcess, self._psutil.AccessDenied, ValueError):
+            return None
+
+    def enum_windows(self):
+        hwnds = []
+
+        def enum_callback(hwnd, _):
+            hwnds.append(hwnd)
+            return True
+
+        try:
+            self._win32gui.EnumWindows(enum_callback, None)
+        except Exception:
+            pass
+        return hwnds
+
+    def get_window_pid(self, hwnd):
+        try:
+            return self._win32process.GetWindowThreadProcessId(hwnd)[1]
+        except Exception:
+            return None
+
+    def is_window(self, hwnd):
+        return bool(self._win32gui.IsWindow(hwnd))
+
+    def is_window_visible(self, hwnd):
+        return bool(self._win32gui.IsWindowVisible(hwnd))
+
+    def get_window_text(self, hwnd):
+        return self._win32gui.GetWindowText(hwnd)
+
+    def is_window_hung(self, hwnd):
+        # Not wrapped by pywin32; true when the window hasn't pumped its
+        # message queue for about five seconds
+        if self._is_hung_app_window is None:
+            import ctypes
+            self._is_hung_app_window = ctypes.windll.user32.IsHungAppWindow
+        return bool(self._is_hung_app_window(hwnd))
+
+    def get_foreground_window(self):
+        return self._win32gui.GetForegroundWindow()
+
+    def watch_foreground(self, callback):
+        # An out-of-context WinEvent hook is delivered through the message
+        # loop of the thread that installs it, so call this from the GUI
+        # thread and the callback runs there too
+        try:
+            import ctypes
+            import ctypes.wintypes as wintypes
+
+            user32 = ctypes.WinDLL('user32')
+            WINEVENTPROC = ctypes.WINFUNCTYPE(
+                None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+            )
+            user32.SetWinEventHook.argtypes = (
+                wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WINEVENTPROC,
+                wintypes.DWORD, wintypes.DWORD, wintypes.DWORD
+            )
+            user32.SetWinEventHook.restype = wintypes.HANDLE
+
+            def on_event(hook, event, hwnd, id_object, id_child, thread, time_ms):
+                try:
+                    callback()
+                except Exception:
+                    pass
+
+            proc = WINEVENTPROC(on_event)
+            hook = user32.SetWinEventHook(
+                EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, None, proc, 0, 0,
+                WINEVENT_OUTOFCONTEXT
+            )
+        except Exception:
+            return False
+        if not hook:
+            return False
+        self._foreground_hooks.append((hook, proc))  # Keep the callback alive
+        return True
+
+    def client_to_screen(self, hwnd, point):
+        return self._win32gui.ClientToScreen(hwnd, point)
+
+    def map_virtual_key(self, vk_code):
+        return self._win32api.MapVirtualKey(vk_code, 0)
+
+    def post_message(self, hwnd, msg, wparam, lparam):
+        try:
+            self._win32api.PostMessage(hwnd, msg, wparam, lparam)
+            return True
+        except Exception:
+            return False
+
+    def post_batch(self, batch, stamps=None):
+        # PostMessageW bound once through ctypes: a failed post is a False
+        # return instead of a pywin32 exception to unwind
+        post = self._post_message_w
+        if post is None:
+            post = self._post_message_w = self._bind_post_message()
+        clock = time.perf_counter
+        failed = []
+        for index, (hwnd, events) in enumerate(batch):
+            for msg, wparam, lparam in events:
+                if not post(hwnd, msg, wparam, lparam):
+                    failed.append(index)
+                    break
+            if stamps is not None:
+                stamps[index] = clock()
+        return failed
+
+    @staticmethod
+    def _bind_post_message():
+        """Return user32!PostMessageW with its argument types declared.
+
+        A private WinDLL instance keeps these declarations from affecting
+        other users of ctypes.windll.user32.
+        """
+        import ctypes
+        import ctypes.wintypes as wintypes
+
+        post = ctypes.WinDLL('user32').PostMessageW
+        post.argtypes = (wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+        post.restype = wintypes.BOOL
+        return post
+
+
+# =============================================================================
+# Simulated Backend
+# =============================================================================
+
+class SimWindow:
+    """A fake top-level window owned by a simulated process"""
+
+    __slots__ = ('hwnd', 'pid', 'title', 'visible', 'x', 'y')
+
+    def __init__(self, hwnd, pid, title, visible=True, x=0, y=0):
+        self.hwnd = hwnd
+        self.pid = pid
+        self.title = title
+        self.visible = visible
+        self.x = x
+        self.y = y
+
+
+class SimulatedBackend(PlatformBackend):
+    """In-memory desktop with fake processes and windows.
+
+    Every posted message is recorded as (timestamp, hwnd, msg, wParam,
+    lParam) using the clock's perf_counter(), so press throughput and
+    timing can be measured without Windows or the game. With record off,
+    only key_downs (hwnd -> WM_KEYDOWN count) is kept, which stays small
+    for any run length. post_delay maps hwnd -> seconds
+    to simulate a client whose message queue is slow to accept posts.
+    Posts to hwnds in saturated fail as if the queue were full, and hwnds
+    in hung are reported as not responding.
+    """
+
+    name = "sim"
+
+    def __init__(self, record=True, clock=None):
+        self.record = record
+        self.clock = clock or default_clock
+        self._lock = threading.Lock()
+        self._pids = itertools.count(1000, 4)
+        self._hwnds = itertools.count(0x10000, 2)
+        self.processes = {}  # Dict of PID -> process name
+        self.started = {}    # Dict of PID -> launch time (epoch seconds)
+        self.windows = {}    # Dict of hwnd -> SimWindow
+        self.foreground = None
+        self.messages = []
+        self.key_downs = {}  # Dict of hwnd -> WM_KEYDOWN messages delivered
+        self.failed_posts = 0
+        self.post_delay = {}  # Dict of hwnd -> seconds
+        self.saturated = set()
+        self.hung = set()
+        self.foreground_callbacks = []
+
+    # -------------------------------------------------------------------------
+    # Desktop scripting
+    # -------------------------------------------------------------------------
+
+    def launch(self, name, title=None, with_window=True):
+        """Start a fake process (and its main window). Returns the PID"""
+        with self._lock:
+            pid = next(self._pids)
+            self.processes[pid] = name
+            self.started[pid] = self.clock.time()
+        if with_window:
+            self.create_window(pid, title or name)
+        return pid
+
+    def create_window(self, pid, title="", visible=True):
+        """Create a top-level window for a process. Returns the hwnd"""
+        with self._lock:
+            hwnd = next(self._hwnds)
+            self.windows[hwnd] = SimWindow(hwnd, pid, title, visible)
+        return hwnd
+
+    def destroy_window(self, hwnd):
+        """Destroy a window"""
+        with self._lock:
+            self.windows.pop(hwnd, None)
+            if self.foreground == hwnd:
+                self.foreground = None
+
+    def kill(self, pid):
+        """Terminate a process along with its windows"""
+        with self._lock:
+            self.processes.pop(pid, None)
+            self.started.pop(pid, None)
+            for hwnd in [h for h, w in self.windows.items() if w.pid == pid]:
+                del self.windows[hwnd]
+                if self.foreground == hwnd:
+                    self.foreground = None
+
+    def set_foreground(self, hwnd):
+        """Bring a window to the foreground (None for a non-game window)"""
+        with self._lock:
+            self.foreground = hwnd
+        for callback in list(self.foreground_callbacks):
+            callback()
+
+    def windows_for_pid(self, pid):
+        """Return the hwnds owned by a process"""
+        with self._lock:
+            return [h for h, w in self.windows.items() if w.pid == pid]
+
+    def take_messages(self):
+        """Return and clear the recorded message log"""
+        with self._lock:
+            messages, self.messages = self.messages, []
+        return messages
+
+    # -------------------------------------------------------------------------
+    # PlatformBackend
+    # -------------------------------------------------------------------------
+
+    def list_processes(self):
+        with self._lock:
+            return list(self.processes.items())
+
+    def list_pids(self):
+        with self._lock:
+            return list(self.processes)
+
+    def get_process_name(self, pid):
+        return self.processes.get(pid)
+
+    def get_process_create_time(self, pid):
+        return self.started.get(pid)
+
+    def enum_windows(self):
+        with self._lock:
+            return list(self.windows)
+
+    def get_window_pid(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window.pid if window else None
+
+    def is_window(self, hwnd):
+        return hwnd in self.windows
+
+    def is_window_visible(self, hwnd):
+        window = self.windows.get(hwnd)
+        return bool(window and window.visible)
+
+    def get_window_text(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window.title if window else ""
+
+    def is_window_hung(self, hwnd):
+        return hwnd in self.hung
+
+    def get_foreground_window(self):
+        return self.foreground
+
+    def watch_foreground(self, callback):
+        self.foreground_callbacks.append(callback)
+        return True
+
+    def client_to_screen(self, hwnd, point):
+        window = self.windows.get(hwnd)
+        if window is None:
+            raise OSError(f"invalid window handle {hwnd:#x}")
+        return window.x + point[0], window.y + point[1]
+
+    def map_virtual_key(self, vk_code):
+        return vk_code
+
+    def post_message(self, hwnd, msg, wparam, lparam):
+        if hwnd not in self.windows or hwnd in self.saturated:
+            self.failed_posts += 1
+            return False
+        delay = self.post_delay.get(hwnd)
+        if delay:
+            self.clock.sleep(delay)
+        if msg == WM_KEYDOWN:
+            self.key_downs[hwnd] = self.key_downs.get(hwnd, 0) + 1
+        if self.record:
+            entry = (self.clock.perf_counter(), hwnd, msg, wparam, lparam)
+            with self._lock:
+                self.messages.append(entry)
+        return True
+
+    def post_batch(self, batch, stamps=None):
+        # Same outcome as post_message per event, with one lock per batch
+        windows = self.windows
+        saturated = self.saturated
+        clock = self.clock.perf_counter
+        sleep = self.clock.sleep
+        key_downs = self.key_downs
+        record = self.record
+        entries = []
+        failed = []
+        for index, (hwnd, events) in enumerate(batch):
+            if hwnd not in windows or hwnd in saturated:
+                self.failed_posts += 1
+                failed.append(index)
+            else:
+                delay = self.post_delay.get(hwnd)
+                for msg, wparam, lparam in events:
+                    if delay:
+                        sleep(delay)
+                    if msg == WM_KEYDOWN:
+                        key_downs[hwnd] = key_downs.get(hwnd, 0) + 1
+                    if record:
+                        entries.append((clock(), hwnd, msg, wparam, lparam))
+            if stamps is not None:
+                stamps[index] = clock()
+        if entries:
+            with self._lock:
+                self.messages.extend(entries)
+        return failed
+
+
+BACKENDS = {
+    Win32Backend.name: Win32Backend,
+    SimulatedBackend.name: SimulatedBackend,
+}
+
+
+def create_backend(name="win32"):
+    """Create a platform backend by name.
+
+    The simulated backend is created without its message log, which would
+    otherwise grow for as long as the app runs.
+    """
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown backend: {name}") from None
+    if backend_class is SimulatedBackend:
+        return backend_class(record=False)
+    return backend_class()
@@ -0,0 +1,109 @@
+"""
+Time sources - the real clock, and a virtual clock that lets a simulation
+run hours of press engine activity in seconds
+"""
+import heapq
+import itertools
+import threading
+import time
+
+
+# =============================================================================
+# Clock
+# =============================================================================
+
+class Clock:
+    """Real time, as used by the engine, schedulers and monitors.
+
+    monotonic() drives deadlines, perf_counter() latencies and timestamps,
+    time() is wall-clock epoch seconds. wait(event, timeout) sleeps until
+    the event is set or the timeout passes and returns the event's state,
+    like event.wait(timeout).
+    """
+
+    virtual = False
+
+    monotonic = staticmethod(time.monotonic)
+    perf_counter = staticmethod(time.perf_counter)
+    time = staticmethod(time.time)
+
+    @staticmethod
+    def wait(event, timeout=None):
+        return event.wait(timeout)
+
+    @staticmethod
+    def sleep(seconds):
+        time.sleep(seconds)
+
+
+clock = Clock()
+
+
+# =============================================================================
+# Virtual Clock
+# =============================================================================
+
+class VirtualClock(Clock):
+    """Simulated time that only moves when something waits.
+
+    Scripted callbacks are queued with call_at()/call_later(). A wait()
+    runs the callbacks due before its timeout in time order, jumping the
+    clock straight to each one, and returns as soon as a callback sets the
+    event; otherwise the clock jumps to the end of the timeout. Work done
+    between waits takes no simulated time.
+
+    Everything must run on one thread at a time: the thread that waits is
+    the one that runs the callbacks.
+    """
+
+    virtual = True
+
+    def __init__(self, start=0.0, epoch=1700000000.0):
+        self.now = start
+        self.epoch = epoch
+        self._queue = []  # Heap of (when, seq, callback)
+        self._seq = itertools.count()
+        self._never = threading.Event()
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = monotonic
+
+    def time(self):
+        return self.epoch + self.now
+
+    def call_at(self, when, callback):
+        """Run callback() once the clock reaches when"""
+        heapq.heappush(self._queue, (when, next(self._seq), callback))
+
+    def call_later(self, delay, callback):
+        """Run callback() delay seconds from now"""
+        self.call_at(self.now + delay, callback)
+
+    def wait(self, event, timeout=None):
+        """Run due callbacks until event is set or timeout has passed.
+
+        Raises RuntimeError for a wait without a timeout when nothing is
+        left that could ever set the event.
+        """
+        deadline = None if timeout is None else self.now + timeout
+        queue = self._queue
+        while not event.is_set():
+            if not queue or (deadline is not None and queue[0][0] > deadline):
+                if deadline is None:
+                    raise RuntimeError("virtual clock: wait with nothing left to run")
+                self.now = max(self.now, deadline)
+                break
+            when, _, callback = heapq.heappop(queue)
+            self.now = max(self.now, when)
+            callback()
+        return event.is_set()
+
+    def sleep(self, seconds):
+        self.wait(self._never, seconds)
+
+    @property
+    def pending(self):
+        """Number of callbacks still queued"""
+        return len(self._queue)
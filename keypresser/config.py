@@ -0,0 +1,278 @@
+"""
+Configuration - config.ini loading, parsed settings and a cheap
+change watcher for hot reload
+"""
+import configparser
+import os
+import sys
+import threading
+
+from keypresser.keys import parse_key
+from keypresser.power import power as default_power
+from keypresser.profiles import load_profiles
+
+ENCODINGS = ('utf-8-sig', 'utf-8', 'cp1251', 'cp1252', 'latin-1')
+
+
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        base_path = sys._MEIPASS
+    except AttributeError:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+def config_path():
+    """Path of the config.ini to use.
+
+    A frozen build unpacks its bundled copy into a temporary directory, so a
+    config.ini next to the exe (which the user can edit) takes precedence.
+    """
+    if getattr(sys, 'frozen', False):
+        local = os.path.join(os.path.dirname(sys.executable), 'config.ini')
+        if os.path.exists(local):
+            return local
+    return resource_path('config.ini')
+
+
+def load_config(path=None):
+    """Load configuration from config.ini (or the given path)"""
+    return _read_config(path or config_path())[0]
+
+
+def _read_config(path, preferred=None):
+    """Parse a config file. Returns (ConfigParser, encoding that worked)"""
+    encodings = ENCODINGS
+    if preferred:
+        encodings = (preferred,) + tuple(enc for enc in ENCODINGS if enc != preferred)
+
+    try:
+        if not os.path.exists(path):
+            return configparser.ConfigParser(), None
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        for enc in encodings:
+            config = configparser.ConfigParser()
+            try:
+                config.read_string(raw.decode(enc))
+                return config, enc
+            except (UnicodeDecodeError, configparser.Error):
+                continue
+    except Exception:
+        pass
+
+    return configparser.ConfigParser(), None
+
+
+def load_timeline(config):
+    """Parse the [timeline] section: key = interval_ms[, offset_ms]"""
+    entries = []
+    if not config.has_section('timeline'):
+        return entries
+
+    for key, value in config.items('timeline'):
+        vk_code = parse_key(key)
+        if not vk_code:
+            continue
+        try:
+            parts = [int(part) for part in value.split(',')]
+        except ValueError:
+            continue
+        interval = max(parts[0], 10)
+        offset = parts[1] if len(parts) > 1 else 0
+        entries.append((vk_code, interval, offset))
+
+    return entries
+
+
+# =============================================================================
+# Settings
+# =============================================================================
+
+class Settings:
+    """Parsed config.ini values.
+
+    Instances are never modified. A reload builds a new one, and consumers
+    swap their reference in one assignment, so no reader ever sees half of
+    an update.
+    """
+
+    FIELDS = (
+        'start_hotkey', 'stop_hotkey', 'game_name', 'key_vk', 'interval', 'timeline', 'profiles',
+        'overrun_policy', 'dispatch_mode', 'window_timeout_ms', 'rate_control',
+        'recording', 'replay_loop', 'journal_size', 'journal_dir',
+        'metrics_port', 'metrics_file', 'metrics_interval', 'memory_interval', 'memory_file',
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, **values):
+        for name in self.FIELDS:
+            object.__setattr__(self, name, values[name])
+
+    @classmethod
+    def from_config(cls, config):
+        """Build settings from a ConfigParser, applying defaults"""
+        get = config.get
+        return cls(
+            start_hotkey=get('settings', 'start_hotkey', fallback='F8'),
+            stop_hotkey=get('settings', 'stop_hotkey', fallback='F9'),
+            game_name=get('settings', 'game_name', fallback='DunDefGame.exe'),
+            key_vk=parse_key(get('settings', 'key', fallback='')),
+            interval=max(_getint(config, 'settings', 'interval', 100), 10),
+            timeline=tuple(load_timeline(config)),
+            profiles=tuple(load_profiles(config)),
+            overrun_policy=get('settings', 'overrun_policy', fallback='skip').lower(),
+            dispatch_mode=get('settings', 'dispatch_mode', fallback='serial').lower(),
+            window_timeout_ms=_getint(config, 'settings', 'window_timeout_ms', 250),
+            rate_control=_getboolean(config, 'settings', 'rate_control', True),
+            recording=get('settings', 'recording', fallback='routine.dd2rec'),
+            replay_loop=_getboolean(config, 'settings', 'replay_loop', False),
+            journal_size=max(_getint(config, 'journal', 'size', 65536), 0),
+            journal_dir=get('journal', 'dir', fallback=''),
+            metrics_port=_getint(config, 'metrics', 'port', 0),
+            metrics_file=get('metrics', 'file', fallback=''),
+            metrics_interval=_getfloat(config, 'metrics', 'interval', 10.0),
+            memory_interval=max(_getfloat(config, 'memory', 'interval', 0.0), 0.0),
+            memory_file=get('memory', 'file', fallback='memory-report.json'),
+        )
+
+    def replace(self, **changes):
+        """Return a copy with some fields changed (None values are ignored)"""
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values.update((name, value) for name, value in changes.items() if value is not None)
+        return Settings(**values)
+
+    def changed(self, other):
+        """Return the names of fields that differ from other"""
+        return {name for name in self.FIELDS if getattr(self, name) != getattr(other, name)}
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings are read-only; use replace()")
+
+    def __eq__(self, other):
+        return isinstance(other, Settings) and not self.changed(other)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.FIELDS))
+
+
+def _getint(config, section, option, fallback):
+    try:
+        return config.getint(section, option, fallback=fallback)
+    except ValueError:
+        return fallback
+
+
+def _getboolean(config, section, option, fallback):
+    try:
+        return config.getboolean(section, option, fallback=fallback)
+    except ValueError:
+        return fallback
+
+
+def _getfloat(config, section, option, fallback):
+    try:
+        return config.getfloat(section, option, fallback=fallback)
+    except ValueError:
+        return fallback
+
+
+# =============================================================================
+# Config Watcher
+# =============================================================================
+
+class ConfigWatcher:
+    """Reloads config.ini when it changes.
+
+    Each check is one os.stat(). The file is only re-read when its mtime or
+    size differs from the last read, and the encoding that decoded it last
+    time is tried first. on_change(old, new) is called from the watcher
+    thread only when the parsed settings actually differ. interval is the
+    poll period while active; the power state stretches it when idle.
+    """
+
+    def __init__(self, path=None, interval=1.0, power=None):
+        self.path = path or config_path()
+        self.interval = interval
+        self.power = power or default_power
+        self.encoding = None
+        self._stamp = None
+        self._stop = threading.Event()
+        self.checks = 0
+        self.reloads = 0
+        self.settings = self._load()
+
+    def check(self):
+        """Return new settings if the file changed, otherwise None"""
+        self.checks += 1
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return None
+
+        self._stamp = stamp
+        config = self._read()
+        if not config.has_section('settings'):
+            # Missing, half-written or unparsable: keep the current settings
+            # until the file changes again
+            return None
+        settings = Settings.from_config(config)
+        if settings == self.settings:
+            return None
+        self.settings = settings
+        return settings
+
+    def start(self, on_change):
+        """Poll for changes in a background thread"""
+        self._stop.clear()
+        threading.Thread(target=self._run, args=(on_change,), daemon=True).start()
+
+    def stop(self):
+        """Stop polling"""
+        self._stop.set()
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'encoding': self.encoding,
+            'checks': self.checks,
+            'reloads': self.reloads,
+        }
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self):
+        """Initial read. A missing file gives the defaults"""
+        self._stamp = self._stat()
+        return Settings.from_config(self._read())
+
+    def _read(self):
+        """Re-read and parse the file, trying the last good encoding first"""
+        config, encoding = _read_config(self.path, self.encoding)
+        if encoding:
+            self.encoding = encoding
+        self.reloads += 1
+        return config
+
+    def _run(self, on_change):
+        """Watch loop (runs in thread)"""
+        meter = self.power.meter('config')
+        while not self._stop.wait(self.power.interval('config', self.interval)):
+            meter.tick()
+            old = self.settings
+            try:
+                new = self.check()
+            except Exception:
+                continue
+            if new is not None:
+                try:
+                    on_change(old, new)
+                except Exception:
+                    pass
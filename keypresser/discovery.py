@@ -0,0 +1,231 @@
+"""
+Incremental process discovery - only processes that are new since the last
+scan are looked up, and the polling cadence adapts to how recently the set
+of game processes changed
+"""
+import threading
+
+from keypresser.clock import clock as default_clock
+from keypresser.metrics import registry
+from keypresser.power import IDLE, power as default_power
+
+
+# =============================================================================
+# Process Discovery
+# =============================================================================
+
+class ProcessDiscovery:
+    """Tracks running game processes without rescanning the whole table.
+
+    Each scan lists PIDs and their create times (cheap), and resolves names
+    only for processes it has not seen before. Names are cached per
+    (pid, create time), so a PID reused by a new process - a game client
+    taking over another program's PID, or the reverse - is looked up again
+    on the next scan. A name that could not be read (access denied, or the
+    process was still starting) is retried on every scan. The whole cache
+    is dropped every FULL_RESCAN_INTERVAL seconds as a safety net.
+
+    After the game set changes the poll interval drops to fast_interval and
+    then doubles on every quiet scan up to slow_interval.
+    """
+
+    FULL_RESCAN_INTERVAL = 60.0
+
+    def __init__(self, backend, game_name, fast_interval=0.25, slow_interval=2.0,
+                 metrics=None, clock=None):
+        metrics = metrics or registry
+        self.backend = backend
+        self.clock = clock or default_clock
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.interval = fast_interval
+        self._game_name = ""
+        self._names = {}  # Dict of PID -> (create time, lower-cased name or None)
+        self._game_pids = set()
+        self._last_full_scan = 0.0
+        self.game_name = game_name
+
+        self.scans = 0
+        self.full_scans = 0
+        self.lookups = 0
+        self.last_scan_time = 0.0
+        self.max_scan_time = 0.0
+        self._total_scan_time = 0.0
+        self.last_discovery_latency = None
+        self.max_discovery_latency = 0.0
+
+        self._scan_time = metrics.histogram('discovery.scan_ms')
+        self._latency = metrics.histogram('discovery.latency_ms')
+
+    @property
+    def game_name(self):
+        return self._game_name
+
+    @game_name.setter
+    def game_name(self, name):
+        """Change the tracked executable name.
+
+        The name cache covers every PID, not just game ones, so the next scan
+        applies the new name without a rescan. Safe to call from another
+        thread while scans are running.
+        """
+        self._game_name = (name or "").lower()
+
+    def scan(self):
+        """Return the current set of game PIDs"""
+        clock = self.clock
+        started = clock.perf_counter()
+        backend = self.backend
+        now = clock.monotonic()
+
+        if now - self._last_full_scan >= self.FULL_RESCAN_INTERVAL:
+            self._names.clear()
+            self._last_full_scan = now
+            self.full_scans += 1
+
+        pids = set(backend.list_pids())
+        names = self._names
+        game_name = self._game_name
+
+        for pid in [pid for pid in names if pid not in pids]:
+            del names[pid]
+
+        current = set()
+        new_game_pids = []
+        for pid in pids:
+            created = backend.get_process_create_time(pid)
+            entry = names.get(pid)
+            if entry is None or entry[0] != created or entry[1] is None:
+                # New, reused, or not readable last time
+                entry = names[pid] = (created, self._lookup(pid))
+            name = entry[1]
+            if name == game_name:
+                current.add(pid)
+                if pid not in self._game_pids:
+                    new_game_pids.append(pid)
+
+        changed = current != self._game_pids
+        self._game_pids = current
+        if self.scans:
+            self._record_latency(new_game_pids, names)
+        self._record_scan(clock.perf_counter() - started)
+
+        if changed:
+            self.interval = self.fast_interval
+        else:
+            self.interval = min(self.interval * 2, self.slow_interval)
+        return set(current)
+
+    def stats(self):
+        """Return scan cost and discovery latency in milliseconds"""
+        latency = self.last_discovery_latency
+        return {
+            'scans': self.scans,
+            'full_scans': self.full_scans,
+            'name_lookups': self.lookups,
+            'known_pids': len(self._names),
+            'interval_ms': self.interval * 1000.0,
+            'last_scan_ms': self.last_scan_time * 1000.0,
+            'max_scan_ms': self.max_scan_time * 1000.0,
+            'avg_scan_ms': (self._total_scan_time / self.scans * 1000.0) if self.scans else 0.0,
+            'last_discovery_latency_ms': latency * 1000.0 if latency is not None else None,
+            'max_discovery_latency_ms': self.max_discovery_latency * 1000.0,
+        }
+
+    def _lookup(self, pid):
+        """Resolve a PID's lower-cased process name"""
+        self.lookups += 1
+        name = self.backend.get_process_name(pid)
+        return name.lower() if name else None
+
+    def _record_scan(self, elapsed):
+        """Record the duration of one scan"""
+        self.scans += 1
+        self._scan_time.observe(elapsed * 1000.0)
+        self.last_scan_time = elapsed
+        self._total_scan_time += elapsed
+        if elapsed > self.max_scan_time:
+            self.max_scan_time = elapsed
+
+    def _record_latency(self, pids, names):
+        """Record how long newly found game processes had been running"""
+        now = self.clock.time()
+        for pid in pids:
+            created = names[pid][0]
+            if created is None:
+                continue
+            latency = max(0.0, now - created)
+            self._latency.observe(latency * 1000.0)
+            self.last_discovery_latency = latency
+            if latency > self.max_discovery_latency:
+                self.max_discovery_latency = latency
+
+
+# =============================================================================
+# Process Monitor
+# =============================================================================
+
+class ProcessMonitor:
+    """Runs ProcessDiscovery on a background thread.
+
+    on_change(pids) is called from that thread whenever the set of game
+    PIDs differs from the previous scan.
+
+    Whether any game is running feeds the power state. With no game the
+    loop sleeps the IDLE interval (2 s, so a launch is noticed within
+    that), and is woken early as soon as something else (a hotkey, a
+    focused window) makes the app active.
+    """
+
+    def __init__(self, discovery, on_change, power=None):
+        self.discovery = discovery
+        self.on_change = on_change
+        self.power = power or default_power
+        self.pids = set()
+        self._scanned = False
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._meter = self.power.meter('monitor')
+        self.power.add_listener(self._on_power_change)
+
+    def start(self):
+        """Start monitoring in a background thread"""
+        self._stop.clear()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        """Stop monitoring after the current scan"""
+        self._stop.set()
+        self._wake.set()
+
+    def poke(self):
+        """Scan now instead of at the end of the current sleep"""
+        self._wake.set()
+
+    def _on_power_change(self, old, new):
+        if old == IDLE:
+            self.poke()
+
+    def poll(self):
+        """Scan once and report changes. Returns how long to sleep before the next scan"""
+        self._meter.tick()
+        try:
+            current_pids = self.discovery.scan()
+
+            if not self._scanned:
+                self._scanned = True
+                self.power.update(processes=current_pids)
+            if current_pids != self.pids:
+                self.pids = current_pids
+                self.power.update(processes=current_pids)
+                self.on_change(current_pids)
+        except Exception:
+            pass
+        return self.power.interval('monitor', self.discovery.interval)
+
+    def _run(self):
+        """Scan loop (runs in thread)"""
+        clock = self.discovery.clock
+        while not self._stop.is_set():
+            clock.wait(self._wake, self.poll())
+            self._wake.clear()
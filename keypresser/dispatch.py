@@ -0,0 +1,199 @@
+"""
+Parallel per-window dispatch - one worker per game window so a hung client
+cannot delay presses to the others
+"""
+import threading
+
+from keypresser.clock import clock as default_clock
+
+
+# =============================================================================
+# Window Worker
+# =============================================================================
+
+class WindowWorker:
+    """Sends presses to a single window from its own thread.
+
+    Holds at most one pending tick. If the previous tick is still queued
+    or in flight when the next one arrives, the new tick is skipped for
+    this window only.
+    """
+
+    def __init__(self, hwnd, send_tick, budget, clock=None):
+        self.hwnd = hwnd
+        self._send_tick = send_tick
+        self.budget = budget
+        self._clock = clock or default_clock
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy_since = None
+        self._closed = False
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.timeouts = 0
+        self.late = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self._total_lateness = 0.0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, plans, deadline):
+        """Queue a tick's send plans due at deadline. Returns False if busy"""
+        with self._cond:
+            if self._closed:
+                return False
+            if self._pending is not None or self._busy_since is not None:
+                self.skipped += 1
+                return False
+            self._pending = (plans, deadline)
+            self._cond.notify()
+            return True
+
+    def is_stalled(self, now, timeout):
+        """Check whether the current send has been running longer than timeout"""
+        busy_since = self._busy_since
+        return busy_since is not None and now - busy_since > timeout
+
+    def close(self):
+        """Stop the worker once its current send (if any) returns"""
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._cond.notify()
+
+    def stats(self):
+        """Return per-window counters and lateness in milliseconds"""
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'timeouts': self.timeouts,
+            'late': self.late,
+            'last_lateness_ms': self.last_lateness * 1000.0,
+            'max_lateness_ms': self.max_lateness * 1000.0,
+            'avg_lateness_ms': (self._total_lateness / self.sent * 1000.0) if self.sent else 0.0,
+        }
+
+    def _run(self):
+        """Worker loop (runs in thread)"""
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                plans, deadline = self._pending
+                self._pending = None
+                self._busy_since = self._clock.monotonic()
+
+            lateness = self._busy_since - deadline
+            try:
+                ok = self._send_tick(self.hwnd, plans)
+            except Exception:
+                ok = False
+
+            with self._cond:
+                self._busy_since = None
+                self.sent += 1
+                if not ok:
+                    self.failed += 1
+                if lateness > self.budget:
+                    self.late += 1
+                self.last_lateness = lateness
+                self._total_lateness += lateness
+                if lateness > self.max_lateness:
+                    self.max_lateness = lateness
+
+
+# =============================================================================
+# Parallel Dispatcher
+# =============================================================================
+
+class ParallelDispatcher:
+    """Fans each tick out to per-window workers.
+
+    Workers are created when a window first appears and closed when it is
+    gone. A window whose send has been running longer than timeout is
+    reported as stalled and receives no new presses until it returns.
+    Sends starting more than budget after the tick deadline count as late.
+    """
+
+    def __init__(self, send_tick, timeout=0.25, budget=0.005, clock=None):
+        self._send_tick = send_tick
+        self.timeout = timeout
+        self.budget = budget
+        self._clock = clock or default_clock
+        self.workers = {}  # Dict of hwnd -> WindowWorker
+        self.ticks = 0
+        self.max_dispatch = 0.0
+
+    def dispatch(self, windows, plans, deadline):
+        """Submit one tick's send plans to every window without waiting"""
+        self._reconcile(windows)
+        now = self._clock.monotonic()
+        self.ticks += 1
+
+        for hwnd in windows:
+            worker = self.workers[hwnd]
+            if worker.is_stalled(now, self.timeout):
+                worker.timeouts += 1
+                continue
+            worker.submit(plans, deadline)
+
+        elapsed = self._clock.monotonic() - now
+        if elapsed > self.max_dispatch:
+            self.max_dispatch = elapsed
+
+    def dispatch_each(self, windows, targets, deadline):
+        """Submit a tick whose plans differ per window (targets: hwnd -> plans)"""
+        self._reconcile(windows)
+        now = self._clock.monotonic()
+        self.ticks += 1
+
+        for hwnd, plans in targets.items():
+            worker = self.workers.get(hwnd)
+            if worker is None:
+                continue
+            if worker.is_stalled(now, self.timeout):
+                worker.timeouts += 1
+                continue
+            worker.submit(plans, deadline)
+
+        elapsed = self._clock.monotonic() - now
+        if elapsed > self.max_dispatch:
+            self.max_dispatch = elapsed
+
+    def stalled(self):
+        """Return handles of windows whose current send exceeded the timeout"""
+        now = self._clock.monotonic()
+        return [
+            hwnd for hwnd, worker in self.workers.items()
+            if worker.is_stalled(now, self.timeout)
+        ]
+
+    def close(self):
+        """Stop all workers"""
+        for worker in self.workers.values():
+            worker.close()
+        self.workers.clear()
+
+    def stats(self):
+        """Return per-window statistics keyed by hwnd"""
+        return {
+            'ticks': self.ticks,
+            'max_dispatch_ms': self.max_dispatch * 1000.0,
+            'windows': {hwnd: worker.stats() for hwnd, worker in list(self.workers.items())},
+        }
+
+    def _reconcile(self, windows):
+        """Create workers for new windows and close those that are gone"""
+        workers = self.workers
+        if len(workers) == len(windows) and all(hwnd in workers for hwnd in windows):
+            return
+        current = set(windows)
+        for hwnd in [h for h in workers if h not in current]:
+            workers.pop(hwnd).close()
+        for hwnd in windows:
+            if hwnd not in workers:
+                workers[hwnd] = WindowWorker(hwnd, self._send_tick, self.budget, self._clock)
@@ -0,0 +1,1122 @@
+"""
+Press engine - window index, key send plans, deadline, timeline and
+recording scheduling and the persistent press worker
+"""
+import collections
+import heapq
+import itertools
+import os
+import threading
+from array import array
+
+from keypresser.clock import clock as default_clock
+from keypresser.dispatch import ParallelDispatcher
+from keypresser.journal import PressJournal, SENT, FAILED, DEFERRED, dump_path
+from keypresser.metrics import registry
+from keypresser.power import power as default_power
+from keypresser.ratecontrol import RateController
+from keypresser.recording import Recording
+
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+
+
+# =============================================================================
+# Window Index
+# =============================================================================
+
+class WindowIndex:
+    """Cached PID -> window handle index used by the press loop.
+
+    EnumWindows is only walked when the monitored PID set changes, when a
+    cached handle fails an IsWindow check, or (rate limited) while some
+    PID still has no window.
+    """
+
+    RETRY_INTERVAL = 0.5
+
+    def __init__(self, backend, metrics=None, clock=None):
+        self.backend = backend
+        self._clock = clock or default_clock
+        self._rebuild_time = (metrics or registry).histogram('window_index.rebuild_ms')
+        self._lock = threading.Lock()
+        self._pids = frozenset()
+        self._pid_to_hwnd = {}
+        self._hwnd_to_pid = {}
+        self._dirty = True
+        self._last_rebuild = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def set_pids(self, pids):
+        """Update the monitored PID set, marking the index stale on change.
+        Returns True if the set changed"""
+        pids = frozenset(pids)
+        with self._lock:
+            if pids == self._pids:
+                return False
+            self._pids = pids
+            self._dirty = True
+            return True
+
+    @property
+    def pids(self):
+        """The monitored PID set"""
+        return self._pids
+
+    def invalidate(self):
+        """Force a rebuild on the next lookup"""
+        with self._lock:
+            self._dirty = True
+
+    def get_windows(self):
+        """Return window handles for all monitored PIDs"""
+        return list(self.get_map().values())
+
+    def get_map(self):
+        """Return a PID -> window handle dict for monitored PIDs with a window"""
+        with self._lock:
+            if not self._dirty and self._is_valid():
+                self.hits += 1
+                return dict(self._pid_to_hwnd)
+
+            self.misses += 1
+            now = self._clock.monotonic()
+            if self._dirty or now - self._last_rebuild >= self.RETRY_INTERVAL:
+                self._rebuild()
+                self._last_rebuild = now
+            return {
+                pid: hwnd for pid, hwnd in self._pid_to_hwnd.items() if self._is_window(hwnd)
+            }
+
+    def pid_of(self, hwnd):
+        """Return the PID of an indexed window, or None"""
+        return self._hwnd_to_pid.get(hwnd)
+
+    def stats(self):
+        """Return cache counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'rebuilds': self.rebuilds,
+                'windows': len(self._pid_to_hwnd),
+            }
+
+    def _is_valid(self):
+        """Check that every PID has a live cached window"""
+        if len(self._pid_to_hwnd) != len(self._pids):
+            return False
+        return all(self._is_window(hwnd) for hwnd in self._pid_to_hwnd.values())
+
+    def _is_window(self, hwnd):
+        try:
+            return self.backend.is_window(hwnd)
+        except Exception:
+            return False
+
+    def _rebuild(self):
+        """Walk all top-level windows once and map them to monitored PIDs"""
+        started = self._clock.perf_counter()
+        pids = self._pids
+        pid_to_hwnd = {}
+
+        if pids:
+            backend = self.backend
+            for hwnd in backend.enum_windows():
+                pid = backend.get_window_pid(hwnd)
+                if pid in pids and pid not in pid_to_hwnd:
+                    pid_to_hwnd[pid] = hwnd
+
+        self._pid_to_hwnd = pid_to_hwnd
+        self._hwnd_to_pid = {hwnd: pid for pid, hwnd in pid_to_hwnd.items()}
+        self._dirty = False
+        self.rebuilds += 1
+        self._rebuild_time.observe((self._clock.perf_counter() - started) * 1000.0)
+
+
+def find_main_windows(backend, pids):
+    """Return a PID -> handle dict of the first visible, titled window of each PID.
+
+    One EnumWindows walk resolves every PID, instead of one walk per PID.
+    """
+    pids = frozenset(pids)
+    found = {}
+    if not pids:
+        return found
+    for hwnd in backend.enum_windows():
+        try:
+            pid = backend.get_window_pid(hwnd)
+            if (pid in pids and pid not in found
+                    and backend.is_window_visible(hwnd)
+                    and backend.get_window_text(hwnd)):
+                found[pid] = hwnd
+                if len(found) == len(pids):
+                    break
+        except Exception:
+            continue
+    return found
+
+
+# =============================================================================
+# Key Send Plan
+# =============================================================================
+
+# Keys that need the extended-key flag (bit 24) in their lParam
+EXTENDED_KEYS = frozenset({
+    0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28,  # page up/down, end, home, arrows
+    0x2C, 0x2D, 0x2E,                                # print screen, insert, delete
+    0x6F, 0x90,                                      # numpad divide, num lock
+    0xA3, 0xA5,                                      # right control, right menu
+})
+
+
+class KeySendPlan:
+    """Precompiled WM_KEYDOWN/WM_KEYUP messages for one key.
+
+    Built once per run so the press loop only replays (msg, wParam, lParam)
+    tuples instead of calling MapVirtualKey and rebuilding lParams for every
+    press. Modifiers are pressed before the key and released after it.
+    """
+
+    __slots__ = ('vk_code', 'modifiers', 'events')
+
+    def __init__(self, backend, vk_code, modifiers=()):
+        self.vk_code = vk_code
+        self.modifiers = tuple(modifiers)
+
+        scan = backend.map_virtual_key
+        events = []
+        for mod in self.modifiers:
+            events.append(self._message(WM_KEYDOWN, mod, scan(mod)))
+        events.append(self._message(WM_KEYDOWN, vk_code, scan(vk_code)))
+        events.append(self._message(WM_KEYUP, vk_code, scan(vk_code)))
+        for mod in reversed(self.modifiers):
+            events.append(self._message(WM_KEYUP, mod, scan(mod)))
+        self.events = tuple(events)
+
+    def matches(self, vk_code, modifiers=()):
+        """Check whether this plan was compiled for the given key"""
+        return self.vk_code == vk_code and self.modifiers == tuple(modifiers)
+
+    @staticmethod
+    def _message(msg, vk_code, scan_code):
+        """Build a single (msg, wParam, lParam) tuple"""
+        lparam = (scan_code << 16) | 1
+        if vk_code in EXTENDED_KEYS:
+            lparam |= 1 << 24
+        if msg == WM_KEYUP:
+            lparam |= 0xC0000000
+        return msg, vk_code, lparam
+
+
+# =============================================================================
+# Deadline Scheduler
+# =============================================================================
+
+class DeadlineScheduler:
+    """Fixed-rate scheduler driven by absolute monotonic deadlines.
+
+    Ticks are due at start + n * interval regardless of how long the work
+    between them takes. When a tick overruns by a full interval or more,
+    the policy decides what happens to the missed deadlines:
+
+    - 'skip': drop them and realign to the most recent deadline
+    - 'catch_up': fire them back to back, up to MAX_BACKLOG ticks
+    """
+
+    POLICIES = ('skip', 'catch_up')
+    MAX_BACKLOG = 10
+
+    def __init__(self, interval, policy='skip', clock=None):
+        self.interval = interval
+        self._clock = clock or default_clock
+        self.policy = policy if policy in self.POLICIES else 'skip'
+        self._deadline = 0.0
+        self.current_deadline = 0.0
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self._total_lateness = 0.0
+        self.reset()
+
+    def reset(self):
+        """Restart the schedule with the next tick due now"""
+        self._deadline = self._clock.monotonic()
+
+    def wait(self, stop_event):
+        """Sleep until the next deadline. Returns False if stop_event was set"""
+        clock = self._clock
+        remaining = self._deadline - clock.monotonic()
+        if remaining > 0 and clock.wait(stop_event, remaining):
+            return False
+        if stop_event.is_set():
+            return False
+
+        lateness = clock.monotonic() - self._deadline
+        if lateness >= self.interval:
+            self.overruns += 1
+            missed = int(lateness // self.interval)
+            if self.policy == 'catch_up':
+                missed = max(0, missed - self.MAX_BACKLOG)
+            self._deadline += missed * self.interval
+            self.skipped += missed
+            lateness -= missed * self.interval
+
+        self._record(lateness)
+        self.current_deadline = self._deadline
+        self._deadline += self.interval
+        return True
+
+    def stats(self):
+        """Return lateness statistics in milliseconds"""
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'last_lateness_ms': self.last_lateness * 1000.0,
+            'max_lateness_ms': self.max_lateness * 1000.0,
+            'avg_lateness_ms': (self._total_lateness / self.ticks * 1000.0) if self.ticks else 0.0,
+        }
+
+    def _record(self, lateness):
+        """Record lateness of the tick being fired"""
+        self.ticks += 1
+        self.last_lateness = lateness
+        self._total_lateness += lateness
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+
+
+# =============================================================================
+# Timeline Scheduler
+# =============================================================================
+
+class TimelineEntry:
+    """One key on a timeline: pressed every interval, first at offset.
+
+    pid restricts the entry to one game process's window; None sends it
+    to every window.
+    """
+
+    __slots__ = ('vk_code', 'interval', 'offset', 'plan', 'pid', 'fired', 'skipped',
+                 'max_lateness', '_total_lateness')
+
+    def __init__(self, vk_code, interval, offset=0.0, plan=None, pid=None):
+        self.vk_code = vk_code
+        self.interval = interval
+        self.offset = offset
+        self.plan = plan
+        self.pid = pid
+        self.fired = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+        self._total_lateness = 0.0
+
+    def stats(self):
+        """Return per-key counters and lateness in milliseconds"""
+        return {
+            'vk_code': self.vk_code,
+            'pid': self.pid,
+            'interval_ms': self.interval * 1000.0,
+            'fired': self.fired,
+            'skipped': self.skipped,
+            'max_lateness_ms': self.max_lateness * 1000.0,
+            'avg_lateness_ms': (self._total_lateness / self.fired * 1000.0) if self.fired else 0.0,
+        }
+
+
+class TimelineScheduler:
+    """Drives any number of keys with independent intervals from one thread.
+
+    Deadlines live in a min-heap, so each wait sleeps exactly until the
+    earliest due key and costs O(log n) per fired entry, with no polling.
+    Entries due at the same wake-up are fired together as one tick. Overruns
+    follow the same 'skip' / 'catch_up' policies as DeadlineScheduler.
+
+    due holds the plans of the entries fired by the last wait() and
+    due_entries the entries themselves. targeted is True when some entry
+    is restricted to one process.
+    """
+
+    def __init__(self, entries, policy='skip', clock=None):
+        self.entries = list(entries)
+        self._clock = clock or default_clock
+        self.policy = policy if policy in DeadlineScheduler.POLICIES else 'skip'
+        self.targeted = any(entry.pid is not None for entry in self.entries)
+        self._heap = []
+        self.due = ()
+        self.due_entries = ()
+        self.current_deadline = 0.0
+        self.last_lateness = 0.0
+        self.ticks = 0
+        self.overruns = 0
+        self.reset()
+
+    def reset(self):
+        """Restart every entry's schedule relative to now"""
+        now = self._clock.monotonic()
+        self._heap = [(now + entry.offset, seq, entry) for seq, entry in enumerate(self.entries)]
+        heapq.heapify(self._heap)
+
+    def wait(self, stop_event):
+        """Sleep until the next due key. Returns False if stop_event was set"""
+        clock = self._clock
+        heap = self._heap
+        if not heap:
+            clock.wait(stop_event)
+            return False
+
+        remaining = heap[0][0] - clock.monotonic()
+        if remaining > 0 and clock.wait(stop_event, remaining):
+            return False
+        if stop_event.is_set():
+            return False
+
+        now = clock.monotonic()
+        self.current_deadline = heap[0][0]
+        due = []
+        while heap and heap[0][0] <= now:
+            deadline, seq, entry = heapq.heappop(heap)
+            lateness = now - deadline
+            interval = entry.interval
+
+            if lateness >= interval:
+                self.overruns += 1
+                missed = int(lateness // interval)
+                if self.policy == 'catch_up':
+                    missed = max(0, missed - DeadlineScheduler.MAX_BACKLOG)
+                deadline += missed * interval
+                entry.skipped += missed
+                lateness -= missed * interval
+
+            entry.fired += 1
+            entry._total_lateness += lateness
+            if lateness > entry.max_lateness:
+                entry.max_lateness = lateness
+
+            due.append(entry)
+            heapq.heappush(heap, (deadline + interval, seq, entry))
+
+        self.ticks += 1
+        self.last_lateness = now - self.current_deadline
+        self.due_entries = tuple(due)
+        self.due = tuple(entry.plan for entry in due)
+        return True
+
+    def stats(self):
+        """Return per-key statistics"""
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'entries': [entry.stats() for entry in self.entries],
+        }
+
+
+# =============================================================================
+# Recording Scheduler
+# =============================================================================
+
+class RecordingScheduler:
+    """Replays a Recording with the same absolute-deadline timing as the
+    other schedulers.
+
+    Keys are due at start + their recorded time, so lateness never
+    accumulates over a long replay. The recording is streamed from its
+    memory map one key ahead, which keeps memory flat for any length.
+    Keys due at the same wake-up are fired together as one tick. Under
+    'skip' a key more than SKIP_AFTER late (after a stall) is dropped;
+    'catch_up' sends every key. With loop on, the replay starts over after
+    the recording's full duration. Once it ends, finished is set and wait()
+    returns False, and the engine ends the run.
+    """
+
+    SKIP_AFTER = 0.1
+
+    def __init__(self, recording, plans, loop=False, policy='skip', clock=None):
+        self.recording = recording
+        self._clock = clock or default_clock
+        self.plans = plans  # Dict of vk_code -> KeySendPlan
+        self.loop = loop and recording.duration > 0
+        self.policy = policy if policy in DeadlineScheduler.POLICIES else 'skip'
+        self.targeted = False
+        self.due = ()
+        self.due_entries = ()
+        self.current_deadline = 0.0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.ticks = 0
+        self.fired = 0
+        self.skipped = 0
+        self.passes = 0
+        self.finished = False
+        self._events = iter(recording)
+        self._next = next(self._events, None)
+        self._origin = 0.0
+        self.reset()
+
+    def reset(self):
+        """Continue the replay with the next key due now"""
+        if self._next is not None:
+            self._origin = self._clock.monotonic() - self._next[0]
+
+    def wait(self, stop_event):
+        """Sleep until the next recorded key. Returns False if stop_event was set"""
+        clock = self._clock
+        while True:
+            if self._next is None:
+                self.finished = True
+                return False
+
+            deadline = self._origin + self._next[0]
+            remaining = deadline - clock.monotonic()
+            if remaining > 0 and clock.wait(stop_event, remaining):
+                return False
+            if stop_event.is_set():
+                return False
+
+            now = clock.monotonic()
+            due = []
+            while self._next is not None and self._origin + self._next[0] <= now:
+                offset, vk_code = self._next
+                if self.policy == 'skip' and now - (self._origin + offset) > self.SKIP_AFTER:
+                    self.skipped += 1
+                else:
+                    due.append(self.plans[vk_code])
+                    self.fired += 1
+                self._advance()
+
+            if due:
+                break
+
+        self.ticks += 1
+        self.current_deadline = deadline
+        self.last_lateness = now - deadline
+        if self.last_lateness > self.max_lateness:
+            self.max_lateness = self.last_lateness
+        self.due = tuple(due)
+        return True
+
+    def close(self):
+        """Release the recording's file mapping"""
+        self._events = iter(())
+        self._next = None
+        self.recording.close()
+
+    def stats(self):
+        """Return replay progress and lateness in milliseconds"""
+        return {
+            'path': self.recording.path,
+            'ticks': self.ticks,
+            'fired': self.fired,
+            'skipped': self.skipped,
+            'passes': self.passes,
+            'finished': self.finished,
+            'duration_s': self.recording.duration,
+            'max_lateness_ms': self.max_lateness * 1000.0,
+        }
+
+    def _advance(self):
+        """Step to the next recorded key, rewinding when looping"""
+        self._next = next(self._events, None)
+        if self._next is None:
+            self.passes += 1
+            if self.loop:
+                self._origin += self.recording.duration
+                self._events = iter(self.recording)
+                self._next = next(self._events, None)
+
+
+# =============================================================================
+# Press Engine
+# =============================================================================
+
+class PressEngine:
+    """Long-lived press worker that sends the selected key to every game window.
+
+    One worker thread, started on first use, runs every press loop the
+    engine will ever have. start(), stop() and retarget() only queue a
+    command and wake it, so they return immediately, and because every
+    loop runs on that one thread a fast stop/start can never leave two
+    loops sending at once. While idle the worker blocks on its wake event.
+
+    In 'serial' dispatch mode each tick is posted to all windows as one
+    batch from the worker (see send_batch). In 'parallel' mode the tick is
+    handed to per-window workers, so a hung client only delays its own
+    presses.
+
+    retarget() swaps the key, interval or timeline of a running loop
+    without restarting it: the new schedule takes over at the next wake.
+
+    start_replay() plays back a key recording (see keypresser.recording)
+    through the same loop, in place of a fixed key or timeline.
+
+    With rate_control on, every window's sends go through a RateController
+    that throttles only the windows whose queues are failing or backing up.
+
+    Every press outcome goes into a PressJournal ring buffer (unless
+    journal_size is 0). dump_journal() writes it out. It is also dumped
+    automatically once per run after posts start failing, and if a tick
+    raises.
+
+    start() takes the time the user asked to start (e.g. when the hotkey
+    arrived); the delay from then to the first successful send is recorded
+    in press.start_latency_ms. stop() records the delay until the worker has
+    left its loop in press.stop_latency_ms. press.command_latency_ms is the
+    delay from the request until the worker picks up either command, i.e.
+    hotkey to action.
+
+    While pressing with no game window to press into, the worker re-checks
+    after NO_WINDOW_WAIT, backing off to MAX_NO_WINDOW_WAIT; with no game
+    process at all it sleeps until set_pids() reports one.
+    """
+
+    NO_WINDOW_WAIT = 0.5
+    MAX_NO_WINDOW_WAIT = 4.0
+    AUTO_DUMP_DELAY = 5.0
+    DISPATCH_MODES = ('serial', 'parallel')
+
+    def __init__(self, backend, overrun_policy='skip', dispatch_mode='serial',
+                 window_timeout_ms=250, rate_control=True, journal_size=65536,
+                 journal_dir='', metrics=None, power=None, clock=None):
+        metrics = metrics or registry
+        self._metrics = metrics
+        self.power = power or default_power
+        self.clock = clock or default_clock
+        self.backend = backend
+        self.overrun_policy = overrun_policy
+        self.dispatch_mode = dispatch_mode if dispatch_mode in self.DISPATCH_MODES else 'serial'
+        self.window_timeout = window_timeout_ms / 1000.0
+        self.window_index = WindowIndex(backend, metrics, self.clock)
+        self.rate = RateController(backend, metrics, self.clock) if rate_control else None
+        self.journal = PressJournal(journal_size) if journal_size else None
+        self.journal_dir = journal_dir
+        self._auto_dumped = False
+        self._failures_seen = 0
+        self.idle = threading.Event()
+        self.idle.set()
+        self._wake = threading.Event()
+        self._commands = collections.deque()
+        self._lock = threading.Lock()
+        # Rate control, journal and send counters; parallel workers share them
+        self._send_lock = threading.Lock()
+        self._thread = None
+        self.running = False
+        self.scheduler = None
+        self.dispatcher = None
+        self.on_finished = None  # Called from the worker when a replay ends by itself
+        self._plan = None
+        self._start_requested = None  # perf_counter() of the start awaiting its first press
+        self._no_window_wait = self.NO_WINDOW_WAIT
+        self.last_start_latency = None
+        self.last_stop_latency = None
+
+        self._sent = metrics.counter('press.sent')
+        self._failed = metrics.counter('press.post_failures')
+        self._ticks = metrics.counter('press.ticks')
+        self._idle_waits = metrics.counter('press.no_window_waits')
+        self._commands_run = metrics.counter('press.commands')
+        self._lateness = metrics.histogram('press.tick_lateness_ms')
+        self._tick_time = metrics.histogram('press.tick_duration_ms')
+        self._start_latency = metrics.histogram('press.start_latency_ms')
+        self._stop_latency = metrics.histogram('press.stop_latency_ms')
+        self._command_latency = metrics.histogram('press.command_latency_ms')
+        self._dumps = metrics.counter('journal.dumps')
+        self._batches = metrics.counter('press.batches')
+        self._batch_failures = metrics.counter('press.batch_failures')
+        self._batch_time = metrics.histogram('press.batch_ms')
+
+    def set_pids(self, pids):
+        """Update the set of game PIDs to send presses to.
+
+        A changed set is re-indexed on the worker right away rather than on
+        the first tick, so a later start does not wait for EnumWindows.
+        """
+        if self.window_index.set_pids(pids):
+            self._post(('warm',))
+
+    def set_rate_control(self, enabled):
+        """Turn per-window rate control on or off (applies from the next tick)"""
+        if enabled and self.rate is None:
+            self.rate = RateController(self.backend, self._metrics, self.clock)
+        elif not enabled:
+            self.rate = None
+
+    def get_plan(self, vk_code, modifiers=()):
+        """Return the send plan for a key, compiling it if stale"""
+        if not vk_code:
+            return None
+        plan = self._plan
+        if plan is None or not plan.matches(vk_code, modifiers):
+            try:
+                plan = KeySendPlan(self.backend, vk_code, modifiers)
+            except Exception:
+                return None
+            self._plan = plan
+        return plan
+
+    def window_titles(self):
+        """Return a PID -> window title dict for the monitored processes"""
+        titles = {}
+        for pid, hwnd in self.window_index.get_map().items():
+            try:
+                titles[pid] = self.backend.get_window_text(hwnd)
+            except Exception:
+                continue
+        return titles
+
+    def start(self, vk_code, interval_ms, requested_at=None):
+        """Start pressing one key at a fixed interval"""
+        target = self._single_target(vk_code, interval_ms)
+        if target is None:
+            return False
+        self._start(target, requested_at)
+        return True
+
+    def start_timeline(self, entries, requested_at=None):
+        """Start pressing several keys, given as (vk_code, interval_ms, offset_ms[, pid])"""
+        target = self._timeline_target(entries)
+        if target is None:
+            return False
+        self._start(target, requested_at)
+        return True
+
+    def start_replay(self, path, loop=False, requested_at=None):
+        """Start replaying a key recording file.
+
+        Raises OSError or ValueError if the file cannot be read. Returns
+        False if it holds no keys.
+        """
+        target = self._replay_target(Recording(path), loop)
+        if target is None:
+            return False
+        self._start(target, requested_at)
+        return True
+
+    def retarget(self, vk_code=None, interval_ms=100, entries=None):
+        """Change what a running loop presses, without restarting it.
+
+        Pass entries for a timeline, otherwise vk_code and interval_ms.
+        Returns False if the engine is not running or the target is invalid.
+        """
+        if not self.running:
+            return False
+        if entries:
+            target = self._timeline_target(entries)
+        else:
+            target = self._single_target(vk_code, interval_ms)
+        if target is None:
+            return False
+        self._post(('retarget', target))
+        return True
+
+    def stop(self, requested_at=None):
+        """Stop pressing once the current tick's batch has been posted"""
+        self.running = False
+        self._post(('stop', requested_at or self.clock.perf_counter()))
+
+    def wait_idle(self, timeout=None):
+        """Block until the worker has left its press loop. Returns False on timeout"""
+        return self.idle.wait(timeout)
+
+    def close(self, timeout=1.0):
+        """Stop pressing and end the worker thread"""
+        self.stop()
+        self._post(('quit',))
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def dump_journal(self, reason='manual'):
+        """Write the press journal to a timestamped file. Returns its path, or None"""
+        journal = self.journal
+        if journal is None:
+            return None
+        path = dump_path(self.journal_dir, reason)
+        try:
+            if self.journal_dir:
+                os.makedirs(self.journal_dir, exist_ok=True)
+            journal.dump(path)
+        except OSError:
+            return None
+        self._dumps.inc()
+        return path
+
+    def send_batch(self, targets):
+        """Send one tick to many windows through a single backend call.
+
+        targets is an iterable of (hwnd, plans). Rate control decides per
+        window what goes into the batch, then every window's events are
+        posted by backend.post_batch() in one tight loop. Returns the number
+        of windows whose posts failed.
+
+        In parallel mode the window workers call this at the same time. The
+        bookkeeping before and after the posts is done under _send_lock, but
+        the posts themselves are not, so a hung window only holds up its own
+        worker.
+        """
+        rate = self.rate
+        journal = self.journal
+        batch = []
+        batch_plans = []
+        with self._send_lock:
+            for hwnd, plans in targets:
+                if rate is not None:
+                    admitted = rate.admit(hwnd, plans)
+                    if not admitted:
+                        if journal is not None:
+                            self._record(hwnd, plans, DEFERRED, self.clock.perf_counter())
+                        continue
+                    plans = admitted
+                if len(plans) == 1:
+                    events = plans[0].events
+                else:
+                    events = tuple(event for plan in plans for event in plan.events)
+                batch.append((hwnd, events))
+                batch_plans.append(plans)
+        if not batch:
+            return 0
+
+        stamps = array('d', bytes(8 * len(batch)))
+        started = self.clock.perf_counter()
+        failed = self.backend.post_batch(batch, stamps)
+
+        with self._send_lock:
+            self._batches.inc()
+            self._batch_time.observe((stamps[-1] - started) * 1000.0)
+            if failed:
+                self._batch_failures.inc()
+                failed = set(failed)
+
+            sent = 0
+            previous = started
+            for index, (hwnd, _) in enumerate(batch):
+                plans = batch_plans[index]
+                ok = index not in failed
+                if ok:
+                    sent += len(plans)
+                if journal is not None:
+                    self._record(hwnd, plans, SENT if ok else FAILED, stamps[index])
+                if rate is not None:
+                    rate.record(hwnd, ok, stamps[index] - previous)
+                previous = stamps[index]
+
+            if sent:
+                self._sent.inc(sent)
+            if failed:
+                self._failed.inc(sum(len(batch_plans[index]) for index in failed))
+        if sent and self._start_requested is not None:
+            self._first_press()
+        return len(failed)
+
+    def send_tick(self, hwnd, plans):
+        """Send one tick's plans to a window, subject to rate control"""
+        return not self.send_batch(((hwnd, plans),))
+
+    def stats(self):
+        """Return window index, scheduler, dispatch, rate control and latency statistics"""
+        scheduler = self.scheduler
+        dispatcher = self.dispatcher
+        rate = self.rate
+        return {
+            'window_index': self.window_index.stats(),
+            'scheduler': scheduler.stats() if scheduler else None,
+            'dispatch': dispatcher.stats() if dispatcher else None,
+            'rate': rate.stats() if rate else None,
+            'journal': self.journal.stats() if self.journal else None,
+            'worker': {
+                'alive': self._thread is not None and self._thread.is_alive(),
+                'pressing': not self.idle.is_set(),
+                'queued_commands': len(self._commands),
+                'last_start_latency_ms': _ms(self.last_start_latency),
+                'last_stop_latency_ms': _ms(self.last_stop_latency),
+            },
+        }
+
+    def _single_target(self, vk_code, interval_ms):
+        """Return (scheduler, plans) for one key, or None"""
+        plan = self.get_plan(vk_code)
+        if plan is None:
+            return None
+        return DeadlineScheduler(interval_ms / 1000.0, self.overrun_policy, self.clock), (plan,)
+
+    def _timeline_target(self, entries):
+        """Return (scheduler, None) for a timeline, or None if it has no valid keys"""
+        plans = {}
+        timeline = []
+        for vk_code, interval_ms, offset_ms, *target in entries:
+            if vk_code not in plans:
+                try:
+                    plans[vk_code] = KeySendPlan(self.backend, vk_code)
+                except Exception:
+                    continue
+            timeline.append(TimelineEntry(
+                vk_code, interval_ms / 1000.0, offset_ms / 1000.0, plans[vk_code],
+                target[0] if target else None
+            ))
+
+        if not timeline:
+            return None
+        return TimelineScheduler(timeline, self.overrun_policy, self.clock), None
+
+    def _replay_target(self, recording, loop):
+        """Return (scheduler, None) for a recording, or None if it has no keys"""
+        plans = {}
+        for vk_code in recording.keys:
+            try:
+                plans[vk_code] = KeySendPlan(self.backend, vk_code)
+            except Exception:
+                continue
+        if not plans or len(plans) != len(recording.keys):
+            recording.close()
+            return None
+        scheduler = RecordingScheduler(recording, plans, loop, self.overrun_policy, self.clock)
+        return scheduler, None
+
+    def _start(self, target, requested_at):
+        """Queue a start command for the worker"""
+        self.running = True
+        self.idle.clear()
+        self._post(('start', target, requested_at or self.clock.perf_counter()))
+
+    def _post(self, command):
+        """Queue a command and wake the worker, starting it on first use"""
+        self._commands.append(command)
+        self._wake.set()
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+
+    def _first_press(self):
+        """Record start latency at the first successful send after a start"""
+        with self._lock:
+            requested, self._start_requested = self._start_requested, None
+        if requested is not None:
+            latency = self.clock.perf_counter() - requested
+            self.last_start_latency = latency
+            self._start_latency.observe(latency * 1000.0)
+
+    def _run(self):
+        """Worker loop (runs in thread).
+
+        scheduler is None while idle. plans is the fixed tuple of send plans
+        for every tick, or None to take the due plans from a
+        TimelineScheduler on each tick.
+        """
+        commands = self._commands
+        wake = self._wake
+        clock = self.clock
+        meter = self.power.meter('press')
+        scheduler = plans = None
+
+        try:
+            while True:
+                if scheduler is None:
+                    clock.wait(wake)
+                    meter.tick()
+                elif scheduler.wait(wake):
+                    meter.tick()
+                    try:
+                        self._tick(scheduler, plans)
+                    except Exception:
+                        # Keep the worker alive for later commands, but end
+                        # this run and keep a journal of what led up to it
+                        self.dump_journal('error')
+                        self._release(scheduler)
+                        scheduler = plans = None
+                        self.running = False
+                        self.idle.set()
+                        self.power.update(pressing=False)
+                        continue
+                    if self._failed.value != self._failures_seen:
+                        self._on_failures()
+                    continue
+                else:
+                    meter.tick()
+                    if getattr(scheduler, 'finished', False) and not commands:
+                        self._finish(scheduler)
+                        scheduler = plans = None
+
+                # Woken by a command: clear first so a command queued while
+                # draining wakes the next wait instead of being missed
+                wake.clear()
+                while commands:
+                    command = commands.popleft()
+                    self._commands_run.inc()
+                    kind = command[0]
+                    if kind == 'start':
+                        self._release(scheduler)
+                        (scheduler, plans), requested_at = command[1], command[2]
+                        self._command_latency.observe(
+                            (self.clock.perf_counter() - requested_at) * 1000.0
+                        )
+                        scheduler.reset()
+                        self.scheduler = scheduler
+                        self._prepare_dispatcher()
+                        self.idle.clear()
+                        self._auto_dumped = False
+                        self._no_window_wait = self.NO_WINDOW_WAIT
+                        with self._lock:
+                            self._start_requested = requested_at
+                        self.power.update(pressing=True)
+                    elif kind == 'retarget':
+                        if scheduler is not None:
+                            self._release(scheduler)
+                            scheduler, plans = command[1]
+                            self.scheduler = scheduler
+                        else:
+                            self._release(command[1][0])
+                    elif kind == 'stop':
+                        self._command_latency.observe(
+                            (self.clock.perf_counter() - command[1]) * 1000.0
+                        )
+                        if scheduler is not None:
+                            self._release(scheduler)
+                            scheduler = plans = None
+                            latency = self.clock.perf_counter() - command[1]
+                            self.last_stop_latency = latency
+                            self._stop_latency.observe(latency * 1000.0)
+                        with self._lock:
+                            self._start_requested = None
+                        if not commands:
+                            self.idle.set()
+                            self.power.update(pressing=False)
+                    elif kind == 'warm':
+                        if scheduler is None:
+                            self.window_index.get_map()
+                    elif kind == 'quit':
+                        self._release(scheduler)
+                        return
+        finally:
+            self.running = False
+            self.idle.set()
+            self.power.update(pressing=False)
+            with self._lock:
+                self._thread = None  # A later command starts a new worker
+            if self.dispatcher is not None:
+                self.dispatcher.close()
+                self.dispatcher = None
+
+    def _on_failures(self):
+        """Dump the journal once per run, AUTO_DUMP_DELAY after posts start failing"""
+        self._failures_seen = self._failed.value
+        if self._auto_dumped or self.journal is None:
+            return
+        self._auto_dumped = True
+        # A timer thread does the file I/O, and the delay lets the journal
+        # show the first seconds of trouble as well as the lead-up to it
+        timer = threading.Timer(self.AUTO_DUMP_DELAY, self.dump_journal, args=('failures',))
+        timer.daemon = True
+        timer.start()
+
+    def _record(self, hwnd, plans, result, ts):
+        """Journal one outcome for each plan sent to a window"""
+        journal = self.journal
+        pid = self.window_index.pid_of(hwnd)
+        for plan in plans:
+            journal.record(ts, pid, hwnd, plan.vk_code, result)
+
+    def _finish(self, scheduler):
+        """End a run whose scheduler has nothing left to press (worker thread)"""
+        self._release(scheduler)
+        self.running = False
+        with self._lock:
+            self._start_requested = None
+        self.idle.set()
+        self.power.update(pressing=False)
+        if self.on_finished is not None:
+            try:
+                self.on_finished()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _release(scheduler):
+        """Free what a scheduler holds open (a replay's file mapping)"""
+        close = getattr(scheduler, 'close', None)
+        if close is not None:
+            close()
+
+    def _prepare_dispatcher(self):
+        """Create, update or drop the parallel dispatcher for the dispatch mode"""
+        dispatcher = self.dispatcher
+        if self.dispatch_mode == 'parallel':
+            if dispatcher is None:
+                self.dispatcher = ParallelDispatcher(
+                    self.send_tick, self.window_timeout, clock=self.clock
+                )
+            else:
+                dispatcher.timeout = self.window_timeout
+        elif dispatcher is not None:
+            dispatcher.close()
+            self.dispatcher = None
+
+    def _tick(self, scheduler, plans):
+        """Send one due tick to the game windows"""
+        tick_start = self.clock.perf_counter()
+        self._ticks.inc()
+        self._lateness.observe(scheduler.last_lateness * 1000.0)
+        dispatcher = self.dispatcher
+
+        if plans is None and scheduler.targeted:
+            pid_map = self.window_index.get_map()
+            windows = list(pid_map.values())
+        else:
+            pid_map = None
+            windows = self.window_index.get_windows()
+        if not windows:
+            self._idle_waits.inc()
+            # No window to press: start latency would only measure the wait
+            self._start_requested = None
+            if self.window_index.pids:
+                # The window may still be opening; back off while it does not
+                self.clock.wait(self._wake, self._no_window_wait)
+                self._no_window_wait = min(self._no_window_wait * 2, self.MAX_NO_WINDOW_WAIT)
+            else:
+                # No game running: set_pids() wakes the worker when one starts
+                self.clock.wait(self._wake)
+            scheduler.reset()
+            return
+        self._no_window_wait = self.NO_WINDOW_WAIT
+        rate = self.rate
+        if rate is not None and len(rate.windows) > len(windows):
+            with self._send_lock:
+                rate.retain(set(windows))
+
+        if pid_map is not None:
+            targets = self._group_by_window(pid_map, scheduler.due_entries)
+            if dispatcher is not None:
+                dispatcher.dispatch_each(windows, targets, scheduler.current_deadline)
+            else:
+                self.send_batch(targets.items())
+        else:
+            due = plans if plans is not None else scheduler.due
+            if dispatcher is not None:
+                dispatcher.dispatch(windows, due, scheduler.current_deadline)
+            else:
+                self.send_batch(zip(windows, itertools.repeat(due)))
+
+        self._tick_time.observe((self.clock.perf_counter() - tick_start) * 1000.0)
+
+    @staticmethod
+    def _group_by_window(pid_map, entries):
+        """Map each window to the tuple of plans due for it this tick"""
+        targets = {}
+        for entry in entries:
+            if entry.pid is None:
+                hwnds = pid_map.values()
+            else:
+                hwnd = pid_map.get(entry.pid)
+                hwnds = (hwnd,) if hwnd else ()
+            for hwnd in hwnds:
+                targets.setdefault(hwnd, []).append(entry.plan)
+        return {hwnd: tuple(due) for hwnd, due in targets.items()}
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 3) if seconds is not None else None
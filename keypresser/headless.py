@@ -0,0 +1,444 @@
+"""
+Headless mode - the press engine, process monitor and global hotkeys
+without Qt, configured from config.ini and command-line flags
+"""
+import argparse
+import sys
+import threading
+import time
+
+from keypresser.backend import create_backend
+from keypresser.config import ConfigWatcher
+from keypresser.discovery import ProcessDiscovery, ProcessMonitor
+from keypresser.engine import PressEngine
+from keypresser.hotkeys import HotkeyListener
+from keypresser.keys import parse_key, parse_hotkey, hotkey_keys, vk_to_display_name
+from keypresser.metrics import registry, MetricsServer, MetricsFileWriter, ProcessUsage
+from keypresser.power import power
+from keypresser.profiles import ProfileTable, press_target
+from keypresser.recording import KeyboardCapture, RecordingWriter
+
+
+# =============================================================================
+# Headless Presser
+# =============================================================================
+
+class HeadlessPresser:
+    """Console counterpart of GameKeyPresserApp.
+
+    Hotkey callbacks, process changes and config reloads arrive on
+    background threads. They are serialised with a lock instead of a GUI
+    event loop.
+    """
+
+    def __init__(self, backend, watcher, overrides=None, out=None, replay=False,
+                 dump_journal=False):
+        self.watcher = watcher
+        self.replay = replay
+        self.dump_journal = dump_journal
+        self.overrides = overrides or {}
+        self.settings = settings = watcher.settings.replace(**self.overrides)
+        self.out = out
+        self.engine = PressEngine(
+            backend, settings.overrun_policy, settings.dispatch_mode,
+            settings.window_timeout_ms, settings.rate_control,
+            settings.journal_size, settings.journal_dir
+        )
+        self.engine.get_plan(settings.key_vk)
+        self.engine.on_finished = self._on_replay_finished
+        self.discovery = ProcessDiscovery(backend, settings.game_name)
+        self.monitor = ProcessMonitor(self.discovery, self._on_processes)
+        self.hotkeys = HotkeyListener()
+        self.profiles = ProfileTable(settings.profiles)
+        self._assignments = []
+        self.usage = ProcessUsage()
+        self.metrics_exporters = []
+        self.memory_monitor = None
+        self.is_pressing = False
+        self.pids = set()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start_pressing(self, requested_at=None):
+        """Start pressing. Windows that appear later are picked up by the engine"""
+        with self._lock:
+            if self.is_pressing:
+                return False
+            if self.replay:
+                started = self._start_replay(requested_at)
+            else:
+                vk_code, interval, entries = self._target()
+                if entries:
+                    started = self.engine.start_timeline(entries, requested_at)
+                else:
+                    started = self.engine.start(vk_code, interval, requested_at)
+            self.is_pressing = started
+
+        if started:
+            self.log(f"Started: {self._describe()}")
+            if self._assignments:
+                self.log(f"Profiles: {self._describe_profiles()}")
+        return started
+
+    def stop_pressing(self, requested_at=None):
+        """Stop pressing"""
+        with self._lock:
+            if not self.is_pressing:
+                return
+            self.engine.stop(requested_at)
+            self.is_pressing = False
+        self.log("Stopped")
+
+    def _on_replay_finished(self):
+        """Engine callback when a non-looping replay ends (runs in press worker)"""
+        with self._lock:
+            if not self.is_pressing or self.engine.running:
+                return
+            self.is_pressing = False
+        self.log("Replay finished")
+
+    def run(self, autostart=False, duration=None, report_interval=0.0):
+        """Run until interrupted (Ctrl+C) or for duration seconds"""
+        settings = self.settings
+        registry.register_collector('engine', self.engine.stats)
+        registry.register_collector('discovery', self.discovery.stats)
+        registry.register_collector('process', self.usage.snapshot)
+        registry.register_collector('config', self.watcher.stats)
+        registry.register_collector('power', power.stats)
+        self._start_metrics()
+
+        # The callbacks start and stop the engine right on the hotkey thread
+        self._start_hotkey = self.hotkeys.add(
+            parse_hotkey(settings.start_hotkey), self.start_pressing
+        )
+        self._stop_hotkey = self.hotkeys.add(
+            parse_hotkey(settings.stop_hotkey), self.stop_pressing
+        )
+        self.hotkeys.start()
+        self.monitor.start()
+        self.watcher.start(self._on_config_changed)
+
+        self.hotkeys.ready.wait(1.0)
+        if self.hotkeys.registered:
+            self.log(f"Hotkeys: {settings.start_hotkey.upper()} start, "
+                     f"{settings.stop_hotkey.upper()} stop")
+        else:
+            self.log("Global hotkeys unavailable")
+        self.log(f"Waiting for {settings.game_name} - {self._describe()}")
+
+        if autostart:
+            self.start_pressing()
+
+        deadline = time.monotonic() + duration if duration else None
+        next_report = time.monotonic() + report_interval if report_interval else None
+        try:
+            # Short waits keep Ctrl+C responsive on Windows; they only
+            # stretch to a couple of seconds while there is nothing to do
+            meter = power.meter('console')
+            while not self._done.wait(power.interval('console', 0.5)):
+                meter.tick()
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                if next_report is not None and now >= next_report:
+                    self.report()
+                    next_report = now + report_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Stop pressing, monitoring, hotkeys and exporters"""
+        self.stop_pressing()
+        self.engine.close()
+        if self.dump_journal:
+            path = self.engine.dump_journal('exit')
+            self.log(f"Press journal saved to {path}" if path
+                     else "Press journal could not be saved")
+        self.watcher.stop()
+        self.monitor.stop()
+        self.hotkeys.stop()
+        for exporter in self.metrics_exporters:
+            try:
+                exporter.stop()
+            except Exception:
+                pass
+        self._stop_memory_monitor()
+        self.report()
+        self._done.set()
+
+    def report(self):
+        """Log memory, CPU and press counters"""
+        usage = self.usage.snapshot()
+        rss = f"{usage['rss_mb']:.1f} MB" if usage['rss_mb'] is not None else "n/a"
+        latency = registry.histogram('press.start_latency_ms')
+        avg_latency = latency.total / latency.count if latency.count else 0.0
+        idle = power.stats()
+        self.log(
+            f"rss={rss} cpu={usage['cpu_percent']:.2f}% threads={usage['threads']} "
+            f"processes={len(self.pids)} pressing={'yes' if self.is_pressing else 'no'} "
+            f"sent={registry.counter('press.sent').value} "
+            f"deferred={registry.counter('rate.deferred').value} "
+            f"dropped={registry.counter('rate.dropped').value} "
+            f"start_latency={avg_latency:.2f}/{latency.max:.2f} ms (avg/max) "
+            f"power={idle['state']} wakeups={idle['total_wakeups_per_minute']}/min"
+        )
+
+    def log(self, text):
+        """Write a timestamped line to the output stream (if any)"""
+        if self.out is not None:
+            print(f"[{time.strftime('%H:%M:%S')}] {text}", file=self.out, flush=True)
+
+    def _on_config_changed(self, old, new):
+        """Config watcher callback (runs in watcher thread)"""
+        settings = new.replace(**self.overrides)
+        with self._lock:
+            changed = settings.changed(self.settings)
+            if not changed:
+                return
+            self.settings = settings
+            engine = self.engine
+            engine.overrun_policy = settings.overrun_policy
+            engine.dispatch_mode = settings.dispatch_mode
+            engine.window_timeout = settings.window_timeout_ms / 1000.0
+            engine.set_rate_control(settings.rate_control)
+            engine.journal_dir = settings.journal_dir
+
+            if 'start_hotkey' in changed:
+                self.hotkeys.update(self._start_hotkey, parse_hotkey(settings.start_hotkey))
+            if 'stop_hotkey' in changed:
+                self.hotkeys.update(self._stop_hotkey, parse_hotkey(settings.stop_hotkey))
+            if 'game_name' in changed:
+                self.discovery.game_name = settings.game_name
+            if 'profiles' in changed:
+                self.profiles.set_title_profiles(settings.profiles)
+            if self.is_pressing and not self.replay and changed & {
+                    'key_vk', 'interval', 'timeline', 'profiles', 'overrun_policy'}:
+                self.engine.retarget(*self._target())
+
+        self.log(f"Config reloaded ({', '.join(sorted(changed))}) - {self._describe()}")
+
+    def _start_replay(self, requested_at):
+        """Replay the [settings] recording file"""
+        settings = self.settings
+        try:
+            return self.engine.start_replay(settings.recording, settings.replay_loop, requested_at)
+        except (OSError, ValueError) as exc:
+            self.log(f"Cannot replay: {exc}")
+            return False
+
+    def _target(self):
+        """Return (vk_code, interval_ms, timeline entries) for the engine"""
+        settings = self.settings
+        self._assignments = self._resolve_profiles()
+        return press_target(settings.key_vk, settings.interval, settings.timeline,
+                            self._assignments)
+
+    def _resolve_profiles(self):
+        """Return per-client (pid, vk_code, interval_ms), or [] without profiles"""
+        if not self.profiles:
+            return []
+        settings = self.settings
+        return self.profiles.resolve(
+            self.pids, self.engine.window_titles(), settings.key_vk, settings.interval
+        )
+
+    def _on_processes(self, pids):
+        """Process monitor callback (runs in monitor thread)"""
+        self.pids = pids
+        self.engine.set_pids(pids)
+        self.profiles.retain(pids)
+        self.log(f"Found: {len(pids)} ({', '.join(str(pid) for pid in sorted(pids)) or '-'})")
+
+        with self._lock:
+            if (self.is_pressing and not self.replay and self.profiles
+                    and self._resolve_profiles() != self._assignments):
+                self.engine.retarget(*self._target())
+                self.log(f"Profiles: {self._describe_profiles()}")
+
+    def _describe_profiles(self):
+        return ", ".join(
+            f"{pid}={vk_to_display_name(vk_code)}/{interval} ms"
+            for pid, vk_code, interval in self._assignments
+        ) or "-"
+
+    def _describe(self):
+        settings = self.settings
+        if self.replay:
+            return f"replay of {settings.recording}" + (" (looped)" if settings.replay_loop else "")
+        parts = []
+        if settings.key_vk:
+            parts.append(f"{vk_to_display_name(settings.key_vk)} every {settings.interval} ms")
+        for vk_code, interval, offset in settings.timeline:
+            parts.append(f"{vk_to_display_name(vk_code)} every {interval} ms"
+                         + (f" (+{offset} ms)" if offset else ""))
+        return ", ".join(parts) or "no key set"
+
+    def _start_metrics(self):
+        """Start the exporters configured in [metrics]"""
+        settings = self.settings
+        if settings.metrics_port:
+            exporter = MetricsServer(registry, settings.metrics_port)
+            try:
+                exporter.start()
+                self.metrics_exporters.append(exporter)
+            except OSError:
+                pass
+
+        if settings.metrics_file:
+            exporter = MetricsFileWriter(registry, settings.metrics_file, settings.metrics_interval)
+            exporter.start()
+            self.metrics_exporters.append(exporter)
+
+        if settings.memory_interval:
+            from keypresser.memory import MemoryMonitor
+
+            monitor = self.memory_monitor = MemoryMonitor(settings.memory_interval)
+            monitor.add_gauge('processes', lambda: len(self.pids))
+            monitor.start()
+            registry.register_collector('memory', monitor.stats)
+            self.log(f"Memory sampled every {settings.memory_interval:g} s "
+                     f"into {settings.memory_file}")
+
+    def _stop_memory_monitor(self):
+        """Take a last memory sample, write the report and log the growth"""
+        monitor = self.memory_monitor
+        if monitor is None:
+            return
+        monitor.sample()
+        monitor.stop()
+        try:
+            monitor.dump(self.settings.memory_file)
+        except OSError as exc:
+            self.log(f"Memory report could not be saved: {exc}")
+        for line in monitor.summary():
+            self.log(f"memory {line}")
+
+
+# =============================================================================
+# Command Line
+# =============================================================================
+
+def parse_args(argv=None):
+    """Parse headless command-line flags (config.ini supplies the defaults)"""
+    parser = argparse.ArgumentParser(
+        prog="dd2-keypresser --headless",
+        description="Run the key presser without the GUI.",
+    )
+    parser.add_argument('--headless', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--config', help="Path to config.ini")
+    parser.add_argument('--key', help="Key to press, e.g. 1, e, f5 (default: [settings] key)")
+    parser.add_argument('--interval', type=int, help="Press interval in ms (default: [settings] interval)")
+    parser.add_argument('--game', help="Game executable name (default: [settings] game_name)")
+    parser.add_argument('--start', action='store_true',
+                        help="Start pressing immediately instead of waiting for the start hotkey")
+    parser.add_argument('--dispatch', choices=PressEngine.DISPATCH_MODES, help="Dispatch mode")
+    parser.add_argument('--overrun-policy', choices=('skip', 'catch_up'), help="Overrun policy")
+    parser.add_argument('--duration', type=float, help="Exit after this many seconds")
+    parser.add_argument('--report', type=float, default=0.0, metavar='SECONDS',
+                        help="Log memory, CPU and press counts every SECONDS")
+    parser.add_argument('--memory', type=float, metavar='SECONDS',
+                        help="Sample memory every SECONDS and write [memory] file on exit")
+    parser.add_argument('--record', action='store_true',
+                        help="Record keys pressed anywhere to the recording file until Ctrl+C")
+    parser.add_argument('--replay', action='store_true',
+                        help="Press the keys of the recording file instead of --key")
+    parser.add_argument('--recording', metavar='FILE',
+                        help="Recording file (default: [settings] recording)")
+    parser.add_argument('--loop', action='store_true', help="Repeat the replay until stopped")
+    parser.add_argument('--dump-journal', action='store_true',
+                        help="Write the press journal to a file when exiting")
+    parser.add_argument('--log', help="Append output to this file instead of the console")
+    parser.add_argument('--backend', default='win32', help="Platform backend (win32 or sim)")
+    parser.add_argument('--sim-windows', type=int, default=1,
+                        help="Fake game windows to launch with --backend sim")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Headless entry point. Returns the process exit code"""
+    args = parse_args(argv)
+    watcher = ConfigWatcher(args.config)
+    # Flags override config.ini, including after a reload
+    overrides = {
+        'key_vk': parse_key(args.key) if args.key else None,
+        'interval': max(args.interval, 10) if args.interval else None,
+        'game_name': args.game,
+        'dispatch_mode': args.dispatch,
+        'overrun_policy': args.overrun_policy,
+        'recording': args.recording,
+        'replay_loop': True if args.loop else None,
+        'memory_interval': args.memory,
+    }
+    settings = watcher.settings.replace(**overrides)
+
+    if not args.log:
+        return _main(args, watcher, overrides, settings, sys.stdout or sys.stderr)
+    out = open(args.log, 'a', encoding='utf-8')
+    try:
+        return _main(args, watcher, overrides, settings, out)
+    finally:
+        out.close()
+
+
+def _main(args, watcher, overrides, settings, out):
+    """Record, or run the presser, writing to out. Returns the process exit code"""
+    if args.record:
+        return record_keys(settings, args.duration, out)
+    if args.key and not settings.key_vk:
+        print(f"Unknown key: {args.key}", file=out or sys.stderr)
+        return 2
+    if not settings.key_vk and not settings.timeline and not args.replay:
+        print("No key to press: pass --key or --replay, or set [settings] key / [timeline]",
+              file=out or sys.stderr)
+        return 2
+
+    try:
+        backend = create_backend(args.backend)
+    except (ValueError, ImportError) as exc:
+        print(f"Backend unavailable: {exc}", file=out or sys.stderr)
+        return 2
+
+    if backend.name == 'sim':
+        for _ in range(args.sim_windows):
+            backend.launch(settings.game_name)
+
+    presser = HeadlessPresser(backend, watcher, overrides, out, args.replay, args.dump_journal)
+    presser.run(args.start, args.duration, args.report)
+    return 0
+
+
+def record_keys(settings, duration, out):
+    """Record keys to settings.recording until Ctrl+C or duration seconds"""
+    try:
+        writer = RecordingWriter(settings.recording)
+    except OSError as exc:
+        print(f"Cannot write {settings.recording}: {exc}", file=out or sys.stderr)
+        return 2
+
+    ignore = hotkey_keys(settings.start_hotkey) | hotkey_keys(settings.stop_hotkey)
+    capture = KeyboardCapture(writer.add, ignore)
+    capture.start()
+    capture.ready.wait(1.0)
+    if capture.error is not None:
+        writer.close()
+        print(f"Keyboard capture unavailable: {capture.error}", file=out or sys.stderr)
+        return 2
+
+    print(f"Recording keys to {settings.recording} - Ctrl+C to finish", file=out, flush=True)
+    deadline = time.monotonic() + duration if duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.stop()
+        writer.close()
+    print(f"Recorded {writer.count} keys", file=out, flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
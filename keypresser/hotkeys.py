@@ -0,0 +1,176 @@
+"""
+Global hotkeys - RegisterHotKey plus a Win32 message loop on a background
+thread, with no GUI toolkit required. Supports modifier combinations and
+multi-step chords
+"""
+import ctypes
+import threading
+import time
+
+from keypresser.keys import MOD_NOREPEAT
+from keypresser.metrics import registry
+
+WM_HOTKEY = 0x0312
+WM_TIMER = 0x0113
+WM_QUIT = 0x0012
+WM_APP_REBIND = 0x8001
+
+CHORD_ID_BASE = 0x1000  # Ids of the temporarily registered chord steps
+
+
+# =============================================================================
+# Hotkey Listener
+# =============================================================================
+
+class HotkeyListener:
+    """Runs callbacks when registered global hotkeys are pressed.
+
+    A hotkey is a tuple of (modifiers, vk_code) steps from parse_hotkey().
+    The first step of every hotkey is registered all the time. When the
+    first step of a chord is pressed, its possible next steps are
+    registered until one is pressed or CHORD_TIMEOUT passes, so keys are
+    only taken from other programs while a chord is in progress.
+
+    Hotkeys are registered from the listener thread, because WM_HOTKEY is
+    delivered to the message queue of the thread that registered it.
+    Callbacks run on that thread with the perf_counter() time the hotkey
+    arrived, so they must be quick: post to the press engine's command
+    queue, or hand off to the caller's own thread. For the same reason
+    update() posts a message to the loop, which re-registers the hotkeys
+    itself.
+    """
+
+    CHORD_TIMEOUT = 1.0
+
+    def __init__(self, metrics=None):
+        metrics = metrics or registry
+        self._bindings = []  # (steps, callback); id is index + 1
+        self._registered = {}  # Registration id -> [callback or None, {step: node}]
+        self._chord_timer = None
+        self._thread_id = None
+        self.ready = threading.Event()
+        self.registered = False
+        self.error = None
+
+        self._presses = metrics.counter('hotkey.presses')
+        self._chord_timeouts = metrics.counter('hotkey.chord_timeouts')
+
+    def add(self, hotkey, callback):
+        """Bind a hotkey to callback(pressed_at). Must be called before start().
+        Returns its id"""
+        self._bindings.append((hotkey, callback))
+        return len(self._bindings)
+
+    def update(self, hotkey_id, hotkey):
+        """Change the keys of a bound hotkey, also while the loop is running"""
+        index = hotkey_id - 1
+        callback = self._bindings[index][1]
+        self._bindings[index] = (hotkey, callback)
+        if self._thread_id:
+            try:
+                ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_APP_REBIND, 0, 0)
+            except Exception:
+                pass
+
+    def start(self):
+        """Register the hotkeys and start the message loop thread"""
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        """Unregister the hotkeys by ending the message loop"""
+        if self._thread_id:
+            try:
+                ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            except Exception:
+                pass
+
+    def _run(self):
+        """Message loop (runs in thread)"""
+        try:
+            user32 = ctypes.windll.user32
+            import ctypes.wintypes as wintypes
+
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            self._register_all(user32)
+        except Exception as exc:
+            self.error = exc
+            return
+        finally:
+            self.ready.set()
+
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                if msg.message == WM_HOTKEY:
+                    self._on_hotkey(user32, msg.wParam, time.perf_counter())
+                elif msg.message == WM_TIMER and msg.wParam == self._chord_timer:
+                    self._end_chord(user32)
+                    self._chord_timeouts.inc()
+                elif msg.message == WM_APP_REBIND:
+                    self._unregister_all(user32)
+                    self._register_all(user32)
+        finally:
+            self._unregister_all(user32)
+
+    def _on_hotkey(self, user32, hotkey_id, pressed_at):
+        """Run a completed hotkey, or arm the next steps of a chord"""
+        node = self._registered.get(hotkey_id)
+        if node is None:
+            return
+        self._presses.inc()
+        self._end_chord(user32)
+
+        callback, following = node
+        if callback is not None:
+            try:
+                callback(pressed_at)
+            except Exception:
+                pass
+        elif following:
+            self._register_steps(user32, following, CHORD_ID_BASE)
+            self._chord_timer = user32.SetTimer(
+                None, 0, int(self.CHORD_TIMEOUT * 1000), None
+            ) or None
+
+    def _register_all(self, user32):
+        """Build the step tree from the bindings and register the first steps.
+
+        A hotkey that is also the start of a longer chord fires at once, so
+        the chord can never complete.
+        """
+        tree = {}
+        for steps, callback in self._bindings:
+            if not steps:
+                continue
+            nodes = tree
+            for step in steps[:-1]:
+                nodes = nodes.setdefault(step, [None, {}])[1]
+            nodes.setdefault(steps[-1], [None, {}])[0] = callback
+        self.registered = self._register_steps(user32, tree, 1)
+
+    def _register_steps(self, user32, nodes, first_id):
+        """Register each step in nodes. Returns True if any succeeded"""
+        any_registered = False
+        for hotkey_id, ((modifiers, vk_code), node) in enumerate(nodes.items(), first_id):
+            # A step that is already registered (e.g. a chord step that is
+            # also a hotkey of its own) fails here and keeps its first meaning
+            if user32.RegisterHotKey(None, hotkey_id, modifiers | MOD_NOREPEAT, vk_code):
+                self._registered[hotkey_id] = node
+                any_registered = True
+        return any_registered
+
+    def _end_chord(self, user32):
+        """Unregister the steps of a chord in progress"""
+        if self._chord_timer is not None:
+            user32.KillTimer(None, self._chord_timer)
+            self._chord_timer = None
+        for hotkey_id in [hotkey_id for hotkey_id in self._registered
+                          if hotkey_id >= CHORD_ID_BASE]:
+            user32.UnregisterHotKey(None, hotkey_id)
+            del self._registered[hotkey_id]
+
+    def _unregister_all(self, user32):
+        self._end_chord(user32)
+        for hotkey_id in list(self._registered):
+            user32.UnregisterHotKey(None, hotkey_id)
+        self._registered.clear()
@@ -0,0 +1,229 @@
+"""
+Press journal - a fixed-size ring buffer of every press the engine sends,
+dumped to a file for post-mortem analysis, plus a gap/burst summarizer
+
+Usage:
+    python -m keypresser.journal journal-20240101-120000.dd2j
+"""
+import argparse
+import itertools
+import os
+import struct
+import sys
+import time
+from array import array
+
+MAGIC = b'DD2JRNL\x00'
+VERSION = 1
+
+# Header: magic, version, reserved, records, records lost to wrap-around,
+# wall clock minus perf_counter at dump time
+HEADER = struct.Struct('<8sHHIQd')
+
+SENT = 0
+FAILED = 1
+DEFERRED = 2
+
+# Column name, array typecode - written in this order after the header,
+# little-endian like the header
+COLUMNS = (('ts', 'd'), ('pid', 'I'), ('hwnd', 'Q'), ('vk', 'B'), ('result', 'B'))
+
+BIG_ENDIAN = sys.byteorder != 'little'
+
+
+# =============================================================================
+# Press Journal
+# =============================================================================
+
+class PressJournal:
+    """Preallocated ring buffer of (timestamp, pid, hwnd, vk, result) records.
+
+    Columns are fixed-size arrays allocated once, so record() only stores
+    into existing slots and never grows anything. Once full, the oldest
+    records are overwritten. Slots are claimed from an itertools counter,
+    which is atomic, so parallel dispatch workers can record concurrently.
+    """
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.ts = array('d', bytes(8 * capacity))
+        self.pid = array('I', [0]) * capacity
+        self.hwnd = array('Q', [0]) * capacity
+        self.vk = array('B', bytes(capacity))
+        self.result = array('B', bytes(capacity))
+        self._seq = itertools.count()
+
+    @property
+    def count(self):
+        """Records ever written, read from the slot counter without advancing
+        it, so it never goes backwards however the writers interleave"""
+        return int(repr(self._seq)[6:-1])  # 'count(N)'
+
+    def record(self, ts, pid, hwnd, vk_code, result):
+        """Store one press outcome (ts is time.perf_counter())"""
+        seq = next(self._seq)
+        index = seq % self.capacity
+        self.ts[index] = ts
+        self.pid[index] = pid or 0
+        self.hwnd[index] = hwnd
+        self.vk[index] = vk_code
+        self.result[index] = result
+
+    def snapshot(self):
+        """Return the held records oldest first, as a dict of column arrays"""
+        count = self.count
+        held = min(count, self.capacity)
+        start = count % self.capacity if count > self.capacity else 0
+        columns = {}
+        for name, _ in COLUMNS:
+            column = getattr(self, name)
+            columns[name] = column[start:held] + column[:start] if start else column[:held]
+        return columns
+
+    def dump(self, path):
+        """Write the held records to path. Returns the number written"""
+        count = self.count
+        columns = self.snapshot()
+        written = len(columns['ts'])
+        wall_offset = time.time() - time.perf_counter()
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, written, count - written, wall_offset))
+            for name, _ in COLUMNS:
+                column = columns[name]
+                if BIG_ENDIAN:
+                    column.byteswap()  # A copy from snapshot()
+                column.tofile(f)
+        return written
+
+    def stats(self):
+        return {'capacity': self.capacity, 'recorded': self.count}
+
+
+def dump_path(directory, reason='manual'):
+    """Timestamped journal file name in directory"""
+    name = f"journal-{time.strftime('%Y%m%d-%H%M%S')}-{reason}.dd2j"
+    return os.path.join(directory or '.', name)
+
+
+def load_journal(path):
+    """Read a dumped journal. Returns (header dict, dict of column arrays)"""
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER.size)
+        if len(raw) < HEADER.size:
+            raise ValueError(f"{path} is not a press journal")
+        magic, version, _, records, lost, wall_offset = HEADER.unpack(raw)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a press journal")
+
+        columns = {}
+        for name, typecode in COLUMNS:
+            column = array(typecode)
+            column.fromfile(f, records)
+            if BIG_ENDIAN:
+                column.byteswap()
+            columns[name] = column
+
+    header = {'records': records, 'lost': lost, 'wall_offset': wall_offset}
+    return header, columns
+
+
+# =============================================================================
+# Summary
+# =============================================================================
+
+def summarize(columns, gap_factor=2.0, burst_factor=0.5):
+    """Per-window press statistics with gaps and bursts.
+
+    Intervals are measured between successful sends of the same key to the
+    same window. A gap is an interval above gap_factor times that key's
+    median interval, a burst one below burst_factor times it.
+    """
+    sends = {}  # (pid, hwnd) -> {vk: [timestamps]}
+    outcomes = {}  # (pid, hwnd) -> [sent, failed, deferred]
+    for ts, pid, hwnd, vk_code, result in zip(
+            columns['ts'], columns['pid'], columns['hwnd'], columns['vk'], columns['result']):
+        window = (pid, hwnd)
+        counts = outcomes.get(window)
+        if counts is None:
+            counts = outcomes[window] = [0, 0, 0]
+        counts[result if result < len(counts) else FAILED] += 1
+        if result == SENT:
+            sends.setdefault(window, {}).setdefault(vk_code, []).append(ts)
+
+    windows = []
+    for window, counts in sorted(outcomes.items()):
+        keys = []
+        for vk_code, stamps in sorted(sends.get(window, {}).items()):
+            intervals = [b - a for a, b in zip(stamps, stamps[1:])]
+            if not intervals:
+                keys.append({'vk': vk_code, 'presses': len(stamps)})
+                continue
+            median = sorted(intervals)[len(intervals) // 2]
+            gaps = [(a, b - a) for a, b in zip(stamps, stamps[1:]) if b - a > median * gap_factor]
+            bursts = sum(1 for interval in intervals if interval < median * burst_factor)
+            keys.append({
+                'vk': vk_code,
+                'presses': len(stamps),
+                'median_ms': median * 1000.0,
+                'max_ms': max(intervals) * 1000.0,
+                'gaps': gaps,
+                'bursts': bursts,
+            })
+        windows.append({
+            'pid': window[0],
+            'hwnd': window[1],
+            'sent': counts[SENT],
+            'failed': counts[FAILED],
+            'deferred': counts[DEFERRED],
+            'keys': keys,
+        })
+    return windows
+
+
+def print_summary(path, header, windows, max_gaps=5, out=None):
+    """Print a summary from summarize()"""
+    out = out or sys.stdout
+    print(f"{path}: {header['records']} presses"
+          + (f" ({header['lost']} older ones overwritten)" if header['lost'] else ""), file=out)
+
+    for window in windows:
+        print(f"\nPID {window['pid']}  hwnd {window['hwnd']:#x}  sent {window['sent']}  "
+              f"failed {window['failed']}  deferred {window['deferred']}", file=out)
+        for key in window['keys']:
+            if 'median_ms' not in key:
+                print(f"  vk {key['vk']:#04x}: {key['presses']} press", file=out)
+                continue
+            print(f"  vk {key['vk']:#04x}: {key['presses']} presses  "
+                  f"median {key['median_ms']:.1f} ms  max {key['max_ms']:.1f} ms  "
+                  f"gaps {len(key['gaps'])}  bursts {key['bursts']}", file=out)
+            longest = sorted(key['gaps'], key=lambda gap: gap[1], reverse=True)[:max_gaps]
+            for started, length in sorted(longest):
+                stamp = time.strftime('%H:%M:%S', time.localtime(started + header['wall_offset']))
+                print(f"    gap of {length * 1000.0:.0f} ms after {stamp}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m keypresser.journal",
+        description="Summarize gaps and bursts per window in a dumped press journal.",
+    )
+    parser.add_argument('path', help="journal file (.dd2j)")
+    parser.add_argument('--gap-factor', type=float, default=2.0,
+                        help="report intervals longer than this many median intervals")
+    parser.add_argument('--burst-factor', type=float, default=0.5,
+                        help="count intervals shorter than this many median intervals")
+    parser.add_argument('--max-gaps', type=int, default=5, help="longest gaps to list per key")
+    args = parser.parse_args(argv)
+
+    try:
+        header, columns = load_journal(args.path)
+    except (OSError, ValueError, EOFError) as exc:
+        print(f"Cannot read {args.path}: {exc}", file=sys.stderr)
+        return 2
+    windows = summarize(columns, args.gap_factor, args.burst_factor)
+    print_summary(args.path, header, windows, args.max_gaps)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
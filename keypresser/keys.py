@@ -0,0 +1,97 @@
+"""
+Virtual key codes, key name lookup and hotkey parsing
+"""
+
+
+# =============================================================================
+# Virtual Key Codes
+# =============================================================================
+
+VK_CODE = {
+    'backspace': 0x08, 'tab': 0x09, 'clear': 0x0C, 'enter': 0x0D,
+    'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12, 'pause': 0x13,
+    'caps_lock': 0x14, 'esc': 0x1B, 'space': 0x20,
+    'page_up': 0x21, 'page_down': 0x22, 'end': 0x23, 'home': 0x24,
+    'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
+    'print_screen': 0x2C, 'insert': 0x2D, 'delete': 0x2E,
+    '0': 0x30, '1': 0x31, '2': 0x32, '3': 0x33, '4': 0x34,
+    '5': 0x35, '6': 0x36, '7': 0x37, '8': 0x38, '9': 0x39,
+    'a': 0x41, 'b': 0x42, 'c': 0x43, 'd': 0x44, 'e': 0x45,
+    'f': 0x46, 'g': 0x47, 'h': 0x48, 'i': 0x49, 'j': 0x4A,
+    'k': 0x4B, 'l': 0x4C, 'm': 0x4D, 'n': 0x4E, 'o': 0x4F,
+    'p': 0x50, 'q': 0x51, 'r': 0x52, 's': 0x53, 't': 0x54,
+    'u': 0x55, 'v': 0x56, 'w': 0x57, 'x': 0x58, 'y': 0x59, 'z': 0x5A,
+    'numpad_0': 0x60, 'numpad_1': 0x61, 'numpad_2': 0x62,
+    'numpad_3': 0x63, 'numpad_4': 0x64, 'numpad_5': 0x65,
+    'numpad_6': 0x66, 'numpad_7': 0x67, 'numpad_8': 0x68, 'numpad_9': 0x69,
+    'multiply': 0x6A, 'add': 0x6B, 'separator': 0x6C,
+    'subtract': 0x6D, 'decimal': 0x6E, 'divide': 0x6F,
+    'f1': 0x70, 'f2': 0x71, 'f3': 0x72, 'f4': 0x73, 'f5': 0x74,
+    'f6': 0x75, 'f7': 0x76, 'f8': 0x77, 'f9': 0x78, 'f10': 0x79,
+    'f11': 0x7A, 'f12': 0x7B,
+    'num_lock': 0x90, 'scroll_lock': 0x91,
+    'left_shift': 0xA0, 'right_shift': 0xA1,
+    'left_control': 0xA2, 'right_control': 0xA3,
+    'left_menu': 0xA4, 'right_menu': 0xA5,
+}
+
+VK_TO_NAME = {v: k.upper() for k, v in VK_CODE.items()}
+
+
+def parse_key(name):
+    """Return the VK code for a key name (case-insensitive), or None"""
+    return VK_CODE.get((name or "").strip().lower())
+
+
+def vk_to_display_name(vk_code):
+    """Get display name for a VK code"""
+    if vk_code in VK_TO_NAME:
+        return VK_TO_NAME[vk_code]
+    if 0x30 <= vk_code <= 0x39 or 0x41 <= vk_code <= 0x5A:
+        return chr(vk_code)
+    return f"KEY_{vk_code}"
+
+
+# =============================================================================
+# Hotkeys
+# =============================================================================
+
+# RegisterHotKey modifier flags
+MOD_ALT = 0x0001
+MOD_CONTROL = 0x0002
+MOD_SHIFT = 0x0004
+MOD_WIN = 0x0008
+MOD_NOREPEAT = 0x4000
+
+MODIFIERS = {
+    'ctrl': MOD_CONTROL, 'control': MOD_CONTROL,
+    'alt': MOD_ALT,
+    'shift': MOD_SHIFT,
+    'win': MOD_WIN,
+}
+
+
+def parse_hotkey(text):
+    """Parse a hotkey such as "F8", "ctrl+shift+F8" or the chord "ctrl+k, s".
+
+    Returns a tuple of (modifiers, vk_code) steps, one per comma-separated
+    part of a chord, or None if any part is not a valid key combination.
+    """
+    steps = []
+    for part in (text or "").split(','):
+        *names, key = [name.strip().lower() for name in part.split('+')]
+        modifiers = 0
+        for name in names:
+            if name not in MODIFIERS:
+                return None
+            modifiers |= MODIFIERS[name]
+        vk_code = parse_key(key)
+        if not vk_code:
+            return None
+        steps.append((modifiers, vk_code))
+    return tuple(steps)
+
+
+def hotkey_keys(text):
+    """Set of the virtual-key codes a hotkey uses (not counting modifiers)"""
+    return frozenset(vk_code for _, vk_code in parse_hotkey(text) or ())
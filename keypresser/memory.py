@@ -0,0 +1,153 @@
+"""
+Memory instrumentation - opt-in sampling of RSS, tracemalloc, thread and
+object counts over a long session, plus the allocations that grew most
+"""
+import collections
+import json
+import threading
+import time
+import tracemalloc
+
+from keypresser.metrics import ProcessUsage
+
+
+# =============================================================================
+# Memory Monitor
+# =============================================================================
+
+class MemoryMonitor:
+    """Samples memory use every interval seconds.
+
+    A sample holds RSS, the memory traced by tracemalloc, the live thread
+    count, and any gauges added with add_gauge() (e.g. widget and timer
+    counts). The last HISTORY samples are kept, so a day-long session
+    shows its trend at a fixed cost. Each sample also compares a
+    tracemalloc snapshot with the one taken at start and keeps the TOP
+    source lines that grew the most.
+
+    tracemalloc slows down allocation-heavy code, so the monitor only runs
+    when asked for. start() samples from its own thread. Gauges that must
+    be read on a particular thread (Qt widgets) can instead be sampled by
+    calling begin() once and then sample() on that thread.
+    """
+
+    HISTORY = 1440  # A day at one sample per minute
+    TOP = 10
+
+    def __init__(self, interval=60.0, frames=1):
+        self.interval = interval
+        self.frames = frames
+        self.samples = collections.deque(maxlen=self.HISTORY)
+        self.growth = []  # (location, size_kb_diff, count_diff) at the last sample
+        self._gauges = {}
+        self._baseline = None
+        self._started = None
+        self._traced_here = False
+        self._usage = ProcessUsage()
+        self._stop = threading.Event()
+
+    def add_gauge(self, name, read):
+        """Record read() in every sample under name"""
+        self._gauges[name] = read
+
+    def begin(self):
+        """Start tracing and take the baseline snapshot and first sample"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._traced_here = True
+        self._baseline = self._snapshot()
+        self._started = time.monotonic()
+        self.sample()
+
+    def start(self):
+        """Begin, then sample every interval seconds in a background thread"""
+        self.begin()
+        self._stop.clear()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        """Stop sampling and tracing"""
+        self._stop.set()
+        if self._traced_here:
+            tracemalloc.stop()
+            self._traced_here = False
+
+    def sample(self):
+        """Take one sample now. Returns it"""
+        current, peak = tracemalloc.get_traced_memory()
+        rss = self._usage.snapshot()['rss_mb']
+        sample = {
+            'elapsed_s': round(time.monotonic() - self._started, 1),
+            'rss_mb': rss,
+            'traced_mb': round(current / 1048576.0, 2),
+            'traced_peak_mb': round(peak / 1048576.0, 2),
+            'threads': threading.active_count(),
+        }
+        for name, read in self._gauges.items():
+            try:
+                sample[name] = read()
+            except Exception:
+                sample[name] = None
+        self.samples.append(sample)
+
+        if self._baseline is not None and tracemalloc.is_tracing():
+            diffs = self._snapshot().compare_to(self._baseline, 'lineno')
+            self.growth = [
+                (f"{diff.traceback[0].filename}:{diff.traceback[0].lineno}",
+                 round(diff.size_diff / 1024.0, 1), diff.count_diff)
+                for diff in diffs[:self.TOP]
+            ]
+        return sample
+
+    def stats(self):
+        """First and latest sample and the top allocation growth"""
+        samples = self.samples
+        return {
+            'samples': len(samples),
+            'first': samples[0] if samples else None,
+            'latest': samples[-1] if samples else None,
+            'growth': [
+                {'location': location, 'size_kb': size, 'count': count}
+                for location, size, count in self.growth
+            ],
+        }
+
+    def dump(self, path):
+        """Write every kept sample and the top growth to a JSON file"""
+        report = self.stats()
+        report['history'] = list(self.samples)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+
+    def summary(self):
+        """Lines describing the change since the first sample"""
+        if not self.samples:
+            return []
+        first, latest = self.samples[0], self.samples[-1]
+        lines = []
+        for name, value in latest.items():
+            before = first.get(name)
+            if name == 'elapsed_s' or not isinstance(value, (int, float)) \
+                    or not isinstance(before, (int, float)):
+                continue
+            lines.append(f"{name}: {before:g} -> {value:g}")
+        for location, size, count in self.growth[:5]:
+            lines.append(f"  {size:+.1f} KB in {count:+d} blocks at {location}")
+        return lines
+
+    def _snapshot(self):
+        """tracemalloc snapshot without the monitor's own allocations"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def _run(self):
+        """Sample loop (runs in thread)"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                pass
@@ -0,0 +1,303 @@
+"""
+Metrics - low-overhead counters, gauges and histograms for the press engine,
+process monitor and overlay tracker, readable as JSON over a localhost HTTP
+endpoint or from a periodically flushed file
+"""
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+
+
+# Default histogram bucket upper bounds, in milliseconds
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+# =============================================================================
+# Metric Types
+# =============================================================================
+
+class Counter:
+    """Monotonic counter.
+
+    Updates are not locked, to keep the hot path cheap. Concurrent
+    increments from several threads can rarely lose an update.
+    """
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """Last-value metric"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Fixed-bucket histogram. observe() is a bisect plus three additions"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        """Approximate percentile: upper bound of the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100.0
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def snapshot(self):
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'sum': round(self.total, 4),
+            'avg': round(self.total / self.count, 4) if self.count else 0.0,
+            'max': round(self.max, 4),
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'buckets': buckets,
+        }
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+
+class MetricsRegistry:
+    """Named metrics plus collector callbacks for component stats()"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.collectors = {}
+
+    def counter(self, name):
+        """Return the counter with this name, creating it if needed"""
+        return self._get(self.counters, name, Counter)
+
+    def gauge(self, name):
+        """Return the gauge with this name, creating it if needed"""
+        return self._get(self.gauges, name, Gauge)
+
+    def histogram(self, name, bounds=DEFAULT_BUCKETS):
+        """Return the histogram with this name, creating it if needed"""
+        return self._get(self.histograms, name, lambda: Histogram(bounds))
+
+    def register_collector(self, name, func):
+        """Include func() in every snapshot under name"""
+        with self._lock:
+            self.collectors[name] = func
+
+    def snapshot(self):
+        """Return all metrics as a JSON-serialisable dict"""
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = dict(self.histograms)
+            collectors = dict(self.collectors)
+
+        collected = {}
+        for name, func in collectors.items():
+            try:
+                collected[name] = func()
+            except Exception as exc:
+                collected[name] = {'error': str(exc)}
+
+        return {
+            'timestamp': time.time(),
+            'uptime_s': round(time.time() - self.started, 1),
+            'counters': {name: metric.snapshot() for name, metric in sorted(counters.items())},
+            'gauges': {name: metric.snapshot() for name, metric in sorted(gauges.items())},
+            'histograms': {name: metric.snapshot() for name, metric in sorted(histograms.items())},
+            'stats': collected,
+        }
+
+    def to_json(self):
+        """Return a snapshot encoded as JSON"""
+        return json.dumps(self.snapshot(), indent=2, default=str)
+
+    def _get(self, table, name, factory):
+        metric = table.get(name)
+        if metric is None:
+            with self._lock:
+                metric = table.get(name)
+                if metric is None:
+                    metric = table[name] = factory()
+        return metric
+
+
+registry = MetricsRegistry()
+
+
+# =============================================================================
+# Process Usage
+# =============================================================================
+
+class ProcessUsage:
+    """Resident memory and CPU use of this process, for comparing run modes.
+
+    cpu_percent covers the time since the previous snapshot, so read it from
+    one place (an exporter or a periodic report) to get a steady figure.
+    """
+
+    def __init__(self):
+        self._last = (time.monotonic(), self._cpu_seconds())
+
+    def snapshot(self):
+        now = time.monotonic()
+        cpu = self._cpu_seconds()
+        last_time, last_cpu = self._last
+        self._last = (now, cpu)
+        elapsed = now - last_time
+        rss = self._rss_bytes()
+        return {
+            'rss_mb': round(rss / 1048576.0, 1) if rss is not None else None,
+            'cpu_percent': round((cpu - last_cpu) / elapsed * 100.0, 2) if elapsed > 0 else 0.0,
+            'cpu_seconds': round(cpu, 3),
+            'threads': threading.active_count(),
+            'qt_loaded': 'PyQt5.QtCore' in sys.modules,
+        }
+
+    @staticmethod
+    def _cpu_seconds():
+        times = os.times()
+        return times.user + times.system
+
+    @staticmethod
+    def _rss_bytes():
+        try:
+            import psutil
+            return psutil.Process().memory_info().rss
+        except ImportError:
+            pass
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            return None
+
+
+# =============================================================================
+# Exporters
+# =============================================================================
+
+class MetricsServer:
+    """Serves registry snapshots as JSON on http://127.0.0.1:<port>/metrics"""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        self.metrics = metrics
+        self.address = (host, port)
+        self._server = None
+
+    def start(self):
+        """Start serving in a background thread"""
+        # Imported here so the press engine doesn't pay for http.server at startup
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.to_json().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(self.address, Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self._server.server_address[1] if self._server else self.address[1]
+
+    def stop(self):
+        """Stop the server"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class MetricsFileWriter:
+    """Periodically writes registry snapshots to a JSON file"""
+
+    def __init__(self, metrics, path, interval=10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start flushing in a background thread"""
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        """Stop flushing after writing one final snapshot"""
+        self._stop.set()
+        self.flush()
+
+    def flush(self):
+        """Write the current snapshot, replacing the file atomically"""
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.metrics.to_json())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _run(self):
+        """Flush loop (runs in thread)"""
+        while not self._stop.wait(self.interval):
+            self.flush()
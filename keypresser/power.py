@@ -0,0 +1,148 @@
+"""
+Idle state machine - one shared activity level that sets how often the
+background loops wake up, plus a wakeups-per-minute meter for each loop
+"""
+import threading
+from array import array
+
+from keypresser.clock import clock as default_clock
+
+
+ACTIVE = 'active'    # Pressing, or a game window is in the foreground
+STANDBY = 'standby'  # A game client is running but there is nothing to do
+IDLE = 'idle'        # No game client is running
+
+
+# =============================================================================
+# Wakeup Meter
+# =============================================================================
+
+class WakeupMeter:
+    """Counts wakeups over the last minute in 60 preallocated one-second
+    buckets, so counting costs one array store and never allocates"""
+
+    __slots__ = ('_seconds', '_counts', 'total', '_clock')
+
+    def __init__(self, clock=None):
+        self._clock = clock or default_clock
+        self._seconds = array('q', [-1]) * 60
+        self._counts = array('L', [0]) * 60
+        self.total = 0
+
+    def tick(self):
+        second = int(self._clock.monotonic())
+        index = second % 60
+        if self._seconds[index] != second:
+            self._seconds[index] = second
+            self._counts[index] = 0
+        self._counts[index] += 1
+        self.total += 1
+
+    def per_minute(self):
+        """Wakeups in the last 60 seconds"""
+        oldest = int(self._clock.monotonic()) - 59
+        return sum(count for second, count in zip(self._seconds, self._counts)
+                   if second >= oldest)
+
+
+# =============================================================================
+# Power State
+# =============================================================================
+
+class PowerState:
+    """Activity level shared by the press engine, process monitor, overlay
+    tracker and config watcher.
+
+    Each component reports what it knows (a game process is running,
+    presses are being sent, a game window has focus), and the state is
+    derived from that:
+
+    - ACTIVE: pressing, or a game window is in the foreground
+    - STANDBY: a game client is running but nothing needs doing
+    - IDLE: no game client is running
+
+    Loops ask interval(loop) how long to sleep. The values are upper bounds
+    on how late a loop notices a change while in that state, so the app
+    always comes back within that latency. Listeners are called on every
+    state change, from the thread that caused it.
+    """
+
+    # Longest sleep per loop and state, in seconds (None: the loop's own default).
+    # The process monitor stays at 2 s when idle: nothing can wake it early
+    # when a game starts, so this is how long a launch takes to be noticed
+    INTERVALS = {
+        'monitor': {ACTIVE: None, STANDBY: None, IDLE: 2.0},
+        'config': {ACTIVE: 1.0, STANDBY: 2.0, IDLE: 5.0},
+        'console': {ACTIVE: 0.5, STANDBY: 1.0, IDLE: 2.0},
+    }
+
+    def __init__(self, clock=None):
+        self._clock = clock or default_clock
+        self._lock = threading.Lock()
+        self._processes = False
+        self._pressing = False
+        self._foreground = False
+        self.state = IDLE
+        self.changes = 0
+        self._listeners = []
+        self._meters = {}
+
+    def update(self, processes=None, pressing=None, foreground=None):
+        """Report component activity (None leaves a flag unchanged)"""
+        with self._lock:
+            if processes is not None:
+                self._processes = bool(processes)
+            if pressing is not None:
+                self._pressing = bool(pressing)
+            if foreground is not None:
+                self._foreground = bool(foreground)
+
+            if self._pressing or self._foreground:
+                state = ACTIVE
+            elif self._processes:
+                state = STANDBY
+            else:
+                state = IDLE
+            if state == self.state:
+                return
+            old, self.state = self.state, state
+            self.changes += 1
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(old, state)
+            except Exception:
+                pass
+
+    def add_listener(self, listener):
+        """Call listener(old, new) on every state change"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def interval(self, loop, default=None):
+        """How long a loop may sleep in the current state"""
+        value = self.INTERVALS.get(loop, {}).get(self.state)
+        return default if value is None else value
+
+    def meter(self, loop):
+        """Return the wakeup meter for a loop, creating it if needed"""
+        meter = self._meters.get(loop)
+        if meter is None:
+            with self._lock:
+                meter = self._meters.setdefault(loop, WakeupMeter(self._clock))
+        return meter
+
+    def stats(self):
+        """Return the state and wakeups per minute for each loop"""
+        meters = dict(self._meters)
+        per_minute = {loop: meter.per_minute() for loop, meter in sorted(meters.items())}
+        return {
+            'state': self.state,
+            'changes': self.changes,
+            'wakeups_per_minute': per_minute,
+            'total_wakeups_per_minute': sum(per_minute.values()),
+        }
+
+
+power = PowerState()
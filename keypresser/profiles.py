@@ -0,0 +1,158 @@
+"""
+Per-client profiles - a key and interval for each game process, matched by
+PID (assigned at runtime) or by window title (from config.ini)
+"""
+import threading
+
+from keypresser.keys import parse_key
+
+
+# =============================================================================
+# Profiles
+# =============================================================================
+
+class Profile:
+    """Key and interval for one game client"""
+
+    __slots__ = ('vk_code', 'interval', 'title')
+
+    def __init__(self, vk_code, interval, title=None):
+        self.vk_code = vk_code
+        self.interval = max(int(interval), 10)
+        self.title = title.lower() if title else None
+
+    def matches_title(self, title):
+        return bool(self.title and title and self.title in title.lower())
+
+    def _key(self):
+        return self.vk_code, self.interval, self.title
+
+    def __eq__(self, other):
+        return isinstance(other, Profile) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Profile(vk={self.vk_code:#x}, interval={self.interval}, title={self.title!r})"
+
+
+def parse_profile(value, title=None):
+    """Parse 'key, interval_ms' into a Profile, or None if invalid"""
+    parts = [part.strip() for part in (value or "").split(',')]
+    vk_code = parse_key(parts[0])
+    if not vk_code:
+        return None
+    try:
+        interval = int(parts[1]) if len(parts) > 1 and parts[1] else 100
+    except ValueError:
+        return None
+    return Profile(vk_code, interval, title)
+
+
+def load_profiles(config):
+    """Parse the [profiles] section: window title substring = key, interval_ms"""
+    profiles = []
+    if not config.has_section('profiles'):
+        return profiles
+
+    for title, value in config.items('profiles'):
+        profile = parse_profile(value, title.strip())
+        if profile is not None:
+            profiles.append(profile)
+
+    return profiles
+
+
+# =============================================================================
+# Profile Table
+# =============================================================================
+
+class ProfileTable:
+    """Profiles for the running game clients.
+
+    A profile assigned to a PID (from the process list) wins over a title
+    profile from config.ini. Clients without a profile use the default key
+    and interval. PID assignments last until that process exits.
+    """
+
+    def __init__(self, title_profiles=()):
+        self._lock = threading.Lock()
+        self._by_pid = {}  # Dict of PID -> Profile
+        self.title_profiles = tuple(title_profiles)
+
+    def __bool__(self):
+        return bool(self._by_pid or self.title_profiles)
+
+    def set_title_profiles(self, profiles):
+        """Replace the title profiles (e.g. after a config reload)"""
+        self.title_profiles = tuple(profiles)
+
+    def assign(self, pid, profile):
+        """Give one process its own profile"""
+        with self._lock:
+            self._by_pid[pid] = profile
+
+    def unassign(self, pid):
+        """Return a process to title matching / the default"""
+        with self._lock:
+            self._by_pid.pop(pid, None)
+
+    def retain(self, pids):
+        """Drop assignments for processes that are gone"""
+        with self._lock:
+            for pid in [pid for pid in self._by_pid if pid not in pids]:
+                del self._by_pid[pid]
+
+    def assigned(self, pid):
+        """Return the PID-assigned profile, or None"""
+        return self._by_pid.get(pid)
+
+    def get(self, pid, title=None):
+        """Return the profile for a process, or None for the default"""
+        profile = self._by_pid.get(pid)
+        if profile is not None:
+            return profile
+        for profile in self.title_profiles:
+            if profile.matches_title(title):
+                return profile
+        return None
+
+    def resolve(self, pids, titles, default_vk, default_interval):
+        """Return sorted (pid, vk_code, interval_ms) for every client with a key"""
+        resolved = []
+        for pid in sorted(pids):
+            profile = self.get(pid, titles.get(pid))
+            if profile is not None:
+                resolved.append((pid, profile.vk_code, profile.interval))
+            elif default_vk:
+                resolved.append((pid, default_vk, default_interval))
+        return resolved
+
+
+def press_target(key_vk, interval, timeline, assignments=None):
+    """Return (vk_code, interval_ms, timeline entries) for PressEngine.
+
+    Without per-client assignments this is the single key (or the shared
+    timeline plus the key). With them every client gets its own timeline
+    entry, so clients run on their own deadlines. Clients sharing an interval
+    are staggered evenly across it instead of firing in lockstep.
+    """
+    if not assignments:
+        if timeline:
+            entries = list(timeline)
+            if key_vk:
+                entries.insert(0, (key_vk, interval, 0))
+            return None, 0, entries
+        return key_vk, interval, None
+
+    by_interval = {}
+    for pid, vk_code, client_interval in assignments:
+        by_interval.setdefault(client_interval, []).append((pid, vk_code))
+
+    entries = [(vk_code, entry_interval, offset, None) for vk_code, entry_interval, offset in timeline]
+    for client_interval, clients in sorted(by_interval.items()):
+        step = client_interval / len(clients)
+        for index, (pid, vk_code) in enumerate(clients):
+            entries.append((vk_code, client_interval, index * step, pid))
+    return None, 0, entries
@@ -0,0 +1,193 @@
+"""
+Adaptive per-window rate control - throttles a game client whose message
+queue is failing or backing up, without slowing the others
+"""
+import threading
+
+from keypresser.clock import clock as default_clock
+from keypresser.metrics import registry
+
+
+# =============================================================================
+# Window Rate
+# =============================================================================
+
+class WindowRate:
+    """Token bucket state for one window.
+
+    Every tick adds scale tokens (capped at one) and a press needs a whole
+    token, so a window at scale 0.25 gets every fourth tick. scale is 1.0
+    while the window is healthy.
+    """
+
+    __slots__ = ('scale', 'tokens', 'streak', 'pending', 'hung', 'next_hung_check',
+                 'sent', 'deferred', 'dropped', 'failures', 'slow', 'backoffs', 'recoveries')
+
+    def __init__(self):
+        self.scale = 1.0
+        self.tokens = 1.0
+        self.streak = 0
+        self.pending = ()  # Plans held back from throttled ticks
+        self.hung = False
+        self.next_hung_check = 0.0
+        self.sent = 0
+        self.deferred = 0
+        self.dropped = 0
+        self.failures = 0
+        self.slow = 0
+        self.backoffs = 0
+        self.recoveries = 0
+
+    def stats(self):
+        return {
+            'scale': self.scale,
+            'hung': self.hung,
+            'sent': self.sent,
+            'deferred': self.deferred,
+            'dropped': self.dropped,
+            'failures': self.failures,
+            'slow_sends': self.slow,
+            'backoffs': self.backoffs,
+            'recoveries': self.recoveries,
+        }
+
+
+# =============================================================================
+# Rate Controller
+# =============================================================================
+
+class RateController:
+    """Per-window token buckets with multiplicative backoff.
+
+    A window backs off (its rate halves, down to MIN_SCALE) when a post
+    fails, when a tick's sends take longer than SLOW_SEND (its queue is
+    backing up) or while Windows reports it as hung (checked every
+    HUNG_CHECK_INTERVAL). The rate doubles again after RECOVER_AFTER clean
+    sends in a row, back to the full rate.
+
+    Presses from throttled ticks are deferred: they are held and sent with
+    the next admitted tick. A press that comes due again while an earlier
+    one is still held is dropped, so a recovering client gets at most one
+    press per key rather than a burst.
+    """
+
+    MIN_SCALE = 1.0 / 32
+    RECOVER_AFTER = 4
+    SLOW_SEND = 0.010
+    HUNG_CHECK_INTERVAL = 0.5
+
+    def __init__(self, backend, metrics=None, clock=None):
+        metrics = metrics or registry
+        self.backend = backend
+        self._clock = clock or default_clock
+        self.windows = {}  # Dict of hwnd -> WindowRate
+        self._lock = threading.Lock()
+        self._deferred = metrics.counter('rate.deferred')
+        self._dropped = metrics.counter('rate.dropped')
+        self._backoffs = metrics.counter('rate.backoffs')
+        self._recoveries = metrics.counter('rate.recoveries')
+
+    def admit(self, hwnd, plans):
+        """Return the plans to send to a window this tick (empty if throttled)"""
+        state = self.windows.get(hwnd)
+        if state is None:
+            with self._lock:
+                state = self.windows.setdefault(hwnd, WindowRate())
+
+        now = self._clock.monotonic()
+        if now >= state.next_hung_check:
+            state.next_hung_check = now + self.HUNG_CHECK_INTERVAL
+            was_hung = state.hung
+            state.hung = self._is_hung(hwnd)
+            if state.hung:
+                self._backoff(state)
+            elif was_hung:
+                # Pumping messages again: skip the slow part of the recovery
+                state.scale = max(state.scale, 0.5)
+
+        if state.scale >= 1.0 and not state.pending and not state.hung:
+            return plans
+
+        state.tokens = min(1.0, state.tokens + state.scale)
+        if state.tokens < 1.0 or state.hung:
+            self._hold(state, plans)
+            return ()
+
+        state.tokens -= 1.0
+        if state.pending:
+            held = state.pending
+            new = tuple(plan for plan in plans if plan not in held)
+            dropped = len(plans) - len(new)
+            if dropped:
+                state.dropped += dropped
+                self._dropped.inc(dropped)
+            plans = held + new
+            state.pending = ()
+        return plans
+
+    def record(self, hwnd, ok, elapsed):
+        """Report the outcome of an admitted tick's sends to a window"""
+        state = self.windows.get(hwnd)
+        if state is None:
+            return
+        state.sent += 1
+        if not ok:
+            state.failures += 1
+            self._backoff(state)
+        elif elapsed > self.SLOW_SEND:
+            state.slow += 1
+            self._backoff(state)
+        elif state.scale < 1.0:
+            state.streak += 1
+            if state.streak >= self.RECOVER_AFTER:
+                state.streak = 0
+                state.scale = min(1.0, state.scale * 2)
+                state.recoveries += 1
+                self._recoveries.inc()
+
+    def retain(self, hwnds):
+        """Forget windows that are gone"""
+        with self._lock:
+            for hwnd in [h for h in self.windows if h not in hwnds]:
+                del self.windows[hwnd]
+
+    def throttled(self):
+        """Return handles of windows currently below full rate"""
+        return [hwnd for hwnd, state in list(self.windows.items()) if state.scale < 1.0]
+
+    def stats(self):
+        """Return deferred/dropped totals and per-window state keyed by hwnd"""
+        windows = list(self.windows.items())
+        return {
+            'deferred': sum(state.deferred for _, state in windows),
+            'dropped': sum(state.dropped for _, state in windows),
+            'throttled': sum(1 for _, state in windows if state.scale < 1.0),
+            'windows': {hwnd: state.stats() for hwnd, state in windows},
+        }
+
+    def _hold(self, state, plans):
+        """Defer a throttled tick's plans, dropping ones already held"""
+        held = state.pending
+        new = tuple(plan for plan in plans if plan not in held)
+        dropped = len(plans) - len(new)
+        if new:
+            state.pending = held + new
+            state.deferred += len(new)
+            self._deferred.inc(len(new))
+        if dropped:
+            state.dropped += dropped
+            self._dropped.inc(dropped)
+
+    def _backoff(self, state):
+        state.streak = 0
+        if state.scale > self.MIN_SCALE:
+            state.scale = max(self.MIN_SCALE, state.scale / 2)
+            state.tokens = 0.0
+            state.backoffs += 1
+            self._backoffs.inc()
+
+    def _is_hung(self, hwnd):
+        try:
+            return self.backend.is_window_hung(hwnd)
+        except Exception:
+            return False
@@ -0,0 +1,294 @@
+"""
+Key recordings - a compact binary file of keys with relative timestamps,
+a streaming writer, a memory-mapped reader and a low-level keyboard capture
+"""
+import ctypes
+import mmap
+import struct
+import threading
+import time
+
+MAGIC = b'DD2KREC\x00'
+VERSION = 1
+
+# Header: magic, version, record size, reserved
+HEADER = struct.Struct('<8sHHI')
+# Record: microseconds since the previous record, virtual-key code.
+# vk 0 is a pause that only carries time (long gaps, the tail of a recording)
+RECORD = struct.Struct('<IB')
+MAX_DELTA_US = 0xFFFFFFFF
+
+WH_KEYBOARD_LL = 13
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+WM_QUIT = 0x0012
+
+
+# =============================================================================
+# Writer
+# =============================================================================
+
+class RecordingWriter:
+    """Appends keys to a recording file.
+
+    Records go into a preallocated buffer that is written out whenever it
+    fills, so memory stays the same however long the recording runs. The
+    first key is at time zero; close() stores the time after the last key
+    so a looped replay keeps the recorded gap before starting over.
+    """
+
+    CHUNK = 4096  # Records per buffered write
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        self._buffer = bytearray(self.CHUNK * RECORD.size)
+        self._used = 0
+        self._last = None
+        self.count = 0
+
+    def add(self, vk_code, timestamp=None):
+        """Append a key pressed at timestamp (perf_counter seconds, default now)"""
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        delta = 0 if self._last is None else self._delta(timestamp)
+        self._last = timestamp
+        self._append(delta, vk_code & 0xFF)
+        self.count += 1
+
+    def close(self, timestamp=None):
+        """Write the trailing pause and any buffered records, then close the file"""
+        if self._file is None:
+            return
+        if self._last is not None:
+            delta = self._delta(time.perf_counter() if timestamp is None else timestamp)
+            if delta:
+                self._append(delta, 0)
+        self._flush()
+        self._file.close()
+        self._file = None
+
+    def _delta(self, timestamp):
+        """Microseconds since the last record, splitting gaps too long for one record"""
+        delta = max(0, int(round((timestamp - self._last) * 1000000)))
+        while delta > MAX_DELTA_US:
+            self._append(MAX_DELTA_US, 0)
+            delta -= MAX_DELTA_US
+        return delta
+
+    def _append(self, delta, vk_code):
+        RECORD.pack_into(self._buffer, self._used * RECORD.size, delta, vk_code)
+        self._used += 1
+        if self._used == self.CHUNK:
+            self._flush()
+
+    def _flush(self):
+        if self._used:
+            self._file.write(memoryview(self._buffer)[:self._used * RECORD.size])
+            self._used = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =============================================================================
+# Reader
+# =============================================================================
+
+class Recording:
+    """Read-only view of a recording file through mmap.
+
+    Iterating yields (seconds from the first key, vk_code) one chunk of
+    records at a time, so even multi-hour recordings are never loaded in
+    full. Raises ValueError if the file is not a recording.
+    """
+
+    CHUNK = 4096  # Records decoded per slice of the map
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        except OSError:
+            self._file.close()
+            raise
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a key recording")
+        magic, version, record_size, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a key recording")
+
+        self.records = (len(self._map) - HEADER.size) // RECORD.size
+        self._summary = None
+
+    def __len__(self):
+        return self.records
+
+    def __iter__(self):
+        elapsed = 0
+        for delta, vk_code in self._iter_records():
+            elapsed += delta
+            if vk_code:
+                yield elapsed / 1000000.0, vk_code
+
+    @property
+    def duration(self):
+        """Length in seconds, including the pause after the last key"""
+        return self._summarize()[0]
+
+    @property
+    def keys(self):
+        """Set of virtual-key codes used"""
+        return self._summarize()[1]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _summarize(self):
+        """One streaming pass for the duration and key set"""
+        if self._summary is None:
+            total = 0
+            keys = set()
+            for delta, vk_code in self._iter_records():
+                total += delta
+                if vk_code:
+                    keys.add(vk_code)
+            self._summary = (total / 1000000.0, frozenset(keys))
+        return self._summary
+
+    def _iter_records(self):
+        """Yield raw (delta_us, vk_code) records, copying one chunk at a time"""
+        step = self.CHUNK * RECORD.size
+        end = HEADER.size + self.records * RECORD.size
+        for start in range(HEADER.size, end, step):
+            yield from RECORD.iter_unpack(self._map[start:min(start + step, end)])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =============================================================================
+# Keyboard Capture
+# =============================================================================
+
+class KeyboardCapture:
+    """Reports every key pressed anywhere, through a WH_KEYBOARD_LL hook.
+
+    The hook runs on its own thread with a message loop, like
+    HotkeyListener. on_key(vk_code, timestamp) is called once per key
+    press; auto-repeat while a key is held is ignored, as are the keys in
+    ignore (e.g. the start/stop hotkeys). Keys are never swallowed.
+    """
+
+    def __init__(self, on_key, ignore=()):
+        self.on_key = on_key
+        self.ignore = frozenset(ignore)
+        self._thread = None
+        self._thread_id = None
+        self._proc = None  # Keeps the ctypes callback alive
+        self.ready = threading.Event()
+        self.error = None
+
+    def start(self):
+        """Install the hook and start the message loop thread"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Remove the hook and wait for the loop thread to end"""
+        self.ready.wait(timeout)
+        if self._thread_id:
+            try:
+                ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Message loop (runs in thread)"""
+        try:
+            import ctypes.wintypes as wintypes
+
+            user32 = ctypes.WinDLL('user32', use_last_error=True)
+            kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+            lresult = ctypes.c_ssize_t
+
+            class KBDLLHOOKSTRUCT(ctypes.Structure):
+                _fields_ = [
+                    ('vkCode', wintypes.DWORD),
+                    ('scanCode', wintypes.DWORD),
+                    ('flags', wintypes.DWORD),
+                    ('time', wintypes.DWORD),
+                    ('dwExtraInfo', ctypes.c_size_t),
+                ]
+
+            HOOKPROC = ctypes.WINFUNCTYPE(lresult, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+            user32.SetWindowsHookExW.argtypes = (
+                ctypes.c_int, HOOKPROC, wintypes.HINSTANCE, wintypes.DWORD
+            )
+            user32.SetWindowsHookExW.restype = wintypes.HHOOK
+            user32.CallNextHookEx.argtypes = (
+                wintypes.HHOOK, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM
+            )
+            user32.CallNextHookEx.restype = lresult
+            user32.UnhookWindowsHookEx.argtypes = (wintypes.HHOOK,)
+            kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+
+            held = set()
+            on_key = self.on_key
+            ignore = self.ignore
+
+            def hook(code, wparam, lparam):
+                if code == 0:
+                    vk_code = ctypes.cast(lparam, ctypes.POINTER(KBDLLHOOKSTRUCT)).contents.vkCode
+                    if wparam in (WM_KEYDOWN, WM_SYSKEYDOWN):
+                        if vk_code not in held:
+                            held.add(vk_code)
+                            if vk_code not in ignore:
+                                try:
+                                    on_key(vk_code, time.perf_counter())
+                                except Exception:
+                                    pass
+                    elif wparam in (WM_KEYUP, WM_SYSKEYUP):
+                        held.discard(vk_code)
+                return user32.CallNextHookEx(None, code, wparam, lparam)
+
+            self._proc = HOOKPROC(hook)
+            self._thread_id = kernel32.GetCurrentThreadId()
+            handle = user32.SetWindowsHookExW(
+                WH_KEYBOARD_LL, self._proc, kernel32.GetModuleHandleW(None), 0
+            )
+            if not handle:
+                raise ctypes.WinError(ctypes.get_last_error())
+        except Exception as exc:
+            self.error = exc
+            return
+        finally:
+            self.ready.set()
+
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                pass
+        finally:
+            user32.UnhookWindowsHookEx(handle)
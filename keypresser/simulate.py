@@ -0,0 +1,345 @@
+"""
+Soak simulation - a whole multiboxing session (client launches, crashes,
+restarts, unrelated processes) played against the simulated backend on a
+virtual clock, so a 24-hour run takes seconds, with every client's
+delivered presses checked against the schedule
+
+Usage:
+    python -m keypresser.simulate --hours 24 --clients 4
+    python -m keypresser.simulate --script session.txt
+
+Script lines are "<h:mm:ss> <action> <client> [seconds]", where action is
+launch (seconds: delay until its window appears) or crash. Blank lines and
+# comments are ignored.
+
+Focus changes are not simulated: the engine presses the same whether or
+not a game window has focus, and only the GUI's overlays follow it.
+"""
+import argparse
+import math
+import random
+import sys
+import time
+
+from keypresser.backend import SimulatedBackend
+from keypresser.clock import VirtualClock
+from keypresser.discovery import ProcessDiscovery, ProcessMonitor
+from keypresser.engine import PressEngine, WindowIndex
+from keypresser.keys import parse_key, vk_to_display_name
+from keypresser.metrics import MetricsRegistry
+from keypresser.power import PowerState
+
+GAME = 'DunDefGame.exe'
+ACTIONS = ('launch', 'crash')
+
+
+# =============================================================================
+# Simulation
+# =============================================================================
+
+class ClientLife:
+    """One run of a game client, from launch to crash (or the end)"""
+
+    __slots__ = ('client', 'pid', 'hwnd', 'launched', 'window_at', 'ended')
+
+    def __init__(self, client, pid, launched, window_at):
+        self.client = client
+        self.pid = pid
+        self.hwnd = None
+        self.launched = launched
+        self.window_at = window_at
+        self.ended = None
+
+
+class Simulation:
+    """A scripted session against the real press engine, process monitor and
+    window index, with the simulated backend and a VirtualClock.
+
+    The engine's worker thread runs the whole session: every wait it makes
+    runs the scripted events and monitor scans due before it, so simulated
+    time only advances while the engine would be sleeping.
+
+    Each client's presses must come within allowance() of its window's
+    lifetime divided by the interval. The allowance covers the delays the
+    engine is allowed: noticing a new process (one monitor scan), finding
+    its window (WindowIndex retries) and the no-window back-off.
+    """
+
+    def __init__(self, hours=24.0, interval_ms=1000, vk_code=0x31):
+        self.duration = hours * 3600.0
+        self.interval = interval_ms / 1000.0
+        self.vk_code = vk_code
+        self.clock = VirtualClock()
+        self.backend = SimulatedBackend(record=False, clock=self.clock)
+        self.metrics = MetricsRegistry()
+        self.power = PowerState(self.clock)
+        self.engine = PressEngine(
+            self.backend, rate_control=True, journal_size=0,
+            metrics=self.metrics, power=self.power, clock=self.clock
+        )
+        self.discovery = ProcessDiscovery(
+            self.backend, GAME, metrics=self.metrics, clock=self.clock
+        )
+        self.monitor = ProcessMonitor(self.discovery, self.engine.set_pids, power=self.power)
+        self.lives = []
+        self._current = {}  # Client number -> its running ClientLife
+        self.events = 0
+        self._finished = False
+
+    # -------------------------------------------------------------------------
+    # Script
+    # -------------------------------------------------------------------------
+
+    def launch(self, at, client, window_delay=0.0):
+        """Start a client at time at; its window appears window_delay later"""
+        self._schedule(at, lambda: self._launch(client, window_delay))
+
+    def crash(self, at, client):
+        """Kill a client (and its window) at time at"""
+        self._schedule(at, lambda: self._crash(client))
+
+    def noise(self, at, name, lifetime):
+        """Run an unrelated process with a window for lifetime seconds"""
+        def start():
+            pid = self.backend.launch(name)
+            self.clock.call_later(lifetime, lambda: self.backend.kill(pid))
+        self._schedule(at, start)
+
+    def _schedule(self, at, action):
+        if at < self.duration:
+            self.events += 1
+            self.clock.call_at(at, action)
+
+    def _launch(self, client, window_delay):
+        if client in self._current:
+            return
+        now = self.clock.now
+        pid = self.backend.launch(GAME, with_window=False)
+        life = ClientLife(client, pid, now, now + window_delay)
+        self.lives.append(life)
+        self._current[client] = life
+
+        def open_window():
+            if life.ended is None:
+                life.hwnd = self.backend.create_window(pid, f"Dungeon Defenders 2 #{client}")
+        self.clock.call_later(window_delay, open_window)
+
+    def _crash(self, client):
+        life = self._current.pop(client, None)
+        if life is not None:
+            life.ended = self.clock.now
+            self.backend.kill(life.pid)
+
+    # -------------------------------------------------------------------------
+    # Run
+    # -------------------------------------------------------------------------
+
+    def run(self):
+        """Play the session. Returns a SimulationReport"""
+        clock = self.clock
+
+        def scan():
+            clock.call_later(self.monitor.poll(), scan)
+
+        def finish():
+            self._finished = True
+            self.engine.close()
+
+        clock.call_at(0.0, scan)
+        clock.call_at(self.duration, finish)
+
+        started = time.perf_counter()
+        if not self.engine.start(self.vk_code, self.interval * 1000.0):
+            raise RuntimeError("engine did not start")
+        self.engine.wait_idle()
+        elapsed = time.perf_counter() - started
+        if not self._finished:
+            raise RuntimeError(f"simulation stopped early at {_hms(clock.now)}")
+        return SimulationReport(self, elapsed)
+
+    def expected(self, life):
+        """Presses a client life should get: its window's lifetime in intervals"""
+        if life.hwnd is None:
+            return 0
+        end = life.ended if life.ended is not None else self.duration
+        return max(0, int((end - life.window_at) / self.interval))
+
+    def allowance(self):
+        """Presses a client life may miss while the engine catches up with it"""
+        delay = (self.discovery.slow_interval + WindowIndex.RETRY_INTERVAL
+                 + PressEngine.MAX_NO_WINDOW_WAIT)
+        return math.ceil(delay / self.interval) + 1
+
+
+# =============================================================================
+# Report
+# =============================================================================
+
+class SimulationReport:
+    """Per-client press totals and checks from a finished Simulation"""
+
+    def __init__(self, simulation, elapsed):
+        self.simulation = simulation
+        self.elapsed = elapsed
+        backend = simulation.backend
+        allowance = simulation.allowance()
+
+        self.clients = {}  # Client number -> dict of totals
+        for life in simulation.lives:
+            expected = simulation.expected(life)
+            delivered = backend.key_downs.get(life.hwnd, 0) if life.hwnd else 0
+            totals = self.clients.setdefault(life.client, {
+                'lives': 0, 'expected': 0, 'delivered': 0, 'worst_shortfall': 0, 'ok': True,
+            })
+            totals['lives'] += 1
+            totals['expected'] += expected
+            totals['delivered'] += delivered
+            shortfall = expected - delivered
+            totals['worst_shortfall'] = max(totals['worst_shortfall'], shortfall)
+            if shortfall > allowance or delivered > expected + 1:
+                totals['ok'] = False
+
+        rate = simulation.engine.rate
+        live_windows = len(backend.windows)
+        known_pids = simulation.discovery.stats()['known_pids']
+        self.checks = [
+            ('presses per client life', all(totals['ok'] for totals in self.clients.values()),
+             f"within -{allowance}/+1 of the schedule"),
+            ('rate control state', rate is None or len(rate.windows) <= live_windows + 1,
+             f"{len(rate.windows) if rate else 0} windows tracked, {live_windows} open"),
+            ('process name cache', known_pids <= len(backend.processes),
+             f"{known_pids} cached, {len(backend.processes)} running"),
+        ]
+
+    @property
+    def ok(self):
+        return all(ok for _, ok, _ in self.checks)
+
+    def print(self, out=None):
+        out = out or sys.stdout
+        simulation = self.simulation
+        metrics = simulation.metrics
+        speedup = simulation.duration / self.elapsed if self.elapsed else float('inf')
+        print(f"Simulated {_hms(simulation.duration)} in {self.elapsed:.1f} s ({speedup:,.0f}x), "
+              f"{vk_to_display_name(simulation.vk_code)} every "
+              f"{simulation.interval * 1000.0:.0f} ms, {simulation.events} scripted events",
+              file=out)
+        print(f"Ticks {metrics.counter('press.ticks').value}  "
+              f"sent {metrics.counter('press.sent').value}  "
+              f"post failures {metrics.counter('press.post_failures').value}  "
+              f"no-window waits {metrics.counter('press.no_window_waits').value}  "
+              f"scans {simulation.discovery.scans}", file=out)
+
+        print(f"\n{'client':>6} {'lives':>5} {'expected':>9} {'delivered':>9} {'worst miss':>10}",
+              file=out)
+        for client, totals in sorted(self.clients.items()):
+            print(f"{client:>6} {totals['lives']:>5} {totals['expected']:>9} "
+                  f"{totals['delivered']:>9} {totals['worst_shortfall']:>10}"
+                  + ("" if totals['ok'] else "  FAIL"), file=out)
+
+        print(file=out)
+        for name, ok, detail in self.checks:
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}", file=out)
+
+
+# =============================================================================
+# Scenarios
+# =============================================================================
+
+def random_session(simulation, clients=4, seed=1, crash_hours=3.0):
+    """Script a session: staggered launches with loading screens, crashes
+    about every crash_hours per client followed by a restart, and
+    unrelated processes coming and going"""
+    rng = random.Random(seed)
+    duration = simulation.duration
+
+    for client in range(1, clients + 1):
+        at = 5.0 + (client - 1) * 30.0
+        simulation.launch(at, client, rng.uniform(0.0, 20.0))
+        while True:
+            at += rng.expovariate(1.0 / (crash_hours * 3600.0))
+            if at >= duration:
+                break
+            simulation.crash(at, client)
+            at += rng.uniform(5.0, 120.0)
+            simulation.launch(at, client, rng.uniform(0.0, 20.0))
+
+    at = 0.0
+    while at < duration:
+        at += rng.uniform(120.0, 1200.0)
+        simulation.noise(at, rng.choice(('explorer.exe', 'chrome.exe', 'discord.exe')),
+                         rng.uniform(30.0, 3600.0))
+
+
+def load_script(simulation, path):
+    """Script a session from a file (see the module docstring)"""
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            try:
+                at = _seconds(parts[0])
+                action, client = parts[1].lower(), int(parts[2])
+                delay = float(parts[3]) if len(parts) > 3 else 0.0
+            except (IndexError, ValueError):
+                raise ValueError(f"{path}:{number}: expected '<h:mm:ss> <action> <client>'")
+            if action not in ACTIONS:
+                raise ValueError(f"{path}:{number}: unknown action {action!r}")
+            if action == 'launch':
+                simulation.launch(at, client, delay)
+            else:
+                simulation.crash(at, client)
+
+
+def _seconds(text):
+    """Parse h:mm:ss, mm:ss or plain seconds"""
+    seconds = 0.0
+    for part in text.split(':'):
+        seconds = seconds * 60.0 + float(part)
+    return seconds
+
+
+def _hms(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m keypresser.simulate",
+        description="Run a long multiboxing session on a virtual clock and check the presses.",
+    )
+    parser.add_argument('--hours', type=float, default=24.0, help="simulated session length")
+    parser.add_argument('--clients', type=int, default=4, help="game clients (random session)")
+    parser.add_argument('--interval', type=int, default=1000, help="press interval in ms")
+    parser.add_argument('--key', default='1', help="key to press")
+    parser.add_argument('--seed', type=int, default=1, help="random session seed")
+    parser.add_argument('--crash-hours', type=float, default=3.0,
+                        help="mean time between crashes per client (random session)")
+    parser.add_argument('--script', help="play this script instead of a random session")
+    args = parser.parse_args(argv)
+
+    vk_code = parse_key(args.key)
+    if not vk_code:
+        print(f"Unknown key: {args.key}", file=sys.stderr)
+        return 2
+
+    simulation = Simulation(args.hours, max(args.interval, 10), vk_code)
+    if args.script:
+        try:
+            load_script(simulation, args.script)
+        except (OSError, ValueError) as exc:
+            print(f"Cannot read {args.script}: {exc}", file=sys.stderr)
+            return 2
+    else:
+        random_session(simulation, args.clients, args.seed, args.crash_hours)
+
+    report = simulation.run()
+    report.print()
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Startup profiling - per-phase and per-import timings for --startup-profile
+"""
+import builtins
+import os
+import sys
+import threading
+import time
+
+
+# =============================================================================
+# Startup Profiler
+# =============================================================================
+
+class StartupProfiler:
+    """Records how long each startup phase and each module import takes.
+
+    When disabled every method is a no-op, so call sites don't need to
+    check whether profiling is on.
+    """
+
+    TOP_IMPORTS = 20
+    REPORT_FILE = "startup-profile.txt"
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._original_import = None
+        self._reported = False
+        self.phases = []   # (name, seconds since previous mark, seconds since start)
+        self.imports = []  # (depth, module name, seconds incl. nested imports)
+
+    def install_import_hook(self):
+        """Time every import that isn't already in sys.modules"""
+        if not self.enabled or self._original_import:
+            return
+        original = self._original_import = builtins.__import__
+        modules = sys.modules
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in modules or threading.current_thread() is not threading.main_thread():
+                return original(name, globals, locals, fromlist, level)
+            depth = self._depth
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth = depth
+                self.imports.append((depth, name, time.perf_counter() - start))
+
+        builtins.__import__ = timed_import
+
+    def remove_import_hook(self):
+        """Restore the original import function"""
+        if self._original_import:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, phase):
+        """Record the end of a startup phase"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            self.phases.append((phase, now - self._last, now - self.started))
+            self._last = now
+
+    def report(self):
+        """Print the profile (or write it to a file when there is no console)"""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        self.remove_import_hook()
+
+        lines = ["Startup profile", "", "Phases:"]
+        for name, elapsed, total in self.phases:
+            lines.append(f"  {name:<28} {elapsed * 1000:9.1f} ms   (t={total * 1000:8.1f} ms)")
+
+        top_level = [item for item in self.imports if item[0] == 0]
+        lines += ["", f"Top-level imports ({sum(t for _, _, t in top_level) * 1000:.1f} ms total):"]
+        for _, name, elapsed in sorted(top_level, key=lambda item: -item[2])[:self.TOP_IMPORTS]:
+            lines.append(f"  {name:<28} {elapsed * 1000:9.1f} ms")
+
+        lines += ["", "Slowest imports (incl. nested):"]
+        for depth, name, elapsed in sorted(self.imports, key=lambda item: -item[2])[:self.TOP_IMPORTS]:
+            label = '  ' * min(depth, 4) + name
+            lines.append(f"  {label:<36} {elapsed * 1000:9.1f} ms")
+
+        text = "\n".join(lines)
+        stream = sys.stdout or sys.stderr
+        if stream is not None:
+            print(text, file=stream, flush=True)
+        else:
+            with open(os.path.abspath(self.REPORT_FILE), 'w', encoding='utf-8') as f:
+                f.write(text + "\n")